@@ -1,17 +1,64 @@
+import importlib
 import os
 
 import dash  # Framework zum Erstellen von Webanwendungen
-from dash import dcc, html, Input, Output, State  # Komponenten und Rückrufe für Dash-Anwendungen
+from dash import dcc, html, Input, Output, State, ClientsideFunction  # Komponenten und Rückrufe für Dash-Anwendungen
 import plotly.graph_objects as go
-from views.vergleichsfunktion_tab import VergleichsfunktionTab
+from analytics.trendlines import TRENDLINE_MODES
+from views.vergleichsfunktion_tab import MAX_SELECTIONS, VergleichsfunktionTab
 from scripts.sqlite_connector import SQLiteConnector
-from views.overview_tab import OverviewTab
-from views.key_influencers_tab import KeyInfluencersTab
-from views.performance_insights_tab import PerformanceInsightsTab
+from scripts.store_changes import check_store_changes
+from scripts.store_leaderboard import check_store_leaderboard
+from scripts.store_recommendations import check_store_recommendations
+from scripts.store_rollups import ROLLUPS, check_store_rollups
+from scripts.store_search import check_store_search
+from scripts.store_statistics import check_store_statistics
 from views.recommendations_tab import RecommendationsTab
-from views.regional_comparison_tab import RegionalComparisonTab
-from views.store_operations_tab import StoreOperationsTab
-from views.customer_insights_tab import CustomerInsightsTab
+
+# Die übrigen Views werden erst beim ersten Aufruf ihrer Seite importiert (siehe setup_callbacks).
+
+# Prüfungen der abgeleiteten Tabellen, Trigger und Indizes (angelegt von scripts/DB_Load.py bzw. scripts/migrate.py)
+DATABASE_CHECKS = {
+    "StoreDataChanges": check_store_changes,
+    "StoreRecommendations": check_store_recommendations,
+    "StoreDataMoments": check_store_statistics,
+    "StoreSearch": check_store_search,
+    "Rollups": check_store_rollups,
+    "Leaderboard-Indizes": check_store_leaderboard,
+}
+
+# Streudiagramme mit Trendlinie: Graph-ID -> (View-Modul, View-Klasse, Methode). Neben jedem Diagramm wählt ein
+# Dropdown (trendline-<Graph-ID>) die Art der Trendlinie (OLS, robust oder LOWESS, siehe analytics/trendlines.py).
+SCATTER_FIGURES = {
+    "scatter-marketing-revenue": ("views.performance_insights_tab", "PerformanceInsightsTab",
+                                  "create_scatter_marketing_revenue"),
+    "scatter-promotions-revenue": ("views.performance_insights_tab", "PerformanceInsightsTab",
+                                   "create_scatter_promotions_revenue"),
+    "scatter-footfall-revenue": ("views.customer_insights_tab", "CustomerInsightsTab",
+                                 "create_scatter_footfall_revenue"),
+    "scatter-productvariety-footfall": ("views.customer_insights_tab", "CustomerInsightsTab",
+                                        "create_scatter_productvariety_vs_footfall"),
+    "scatter-marketing-footfall": ("views.customer_insights_tab", "CustomerInsightsTab",
+                                   "create_scatter_marketing_footfall"),
+    "scatter-promotions-footfall": ("views.customer_insights_tab", "CustomerInsightsTab",
+                                    "create_scatter_promotions_footfall"),
+    "scatter-competitor-revenue": ("views.regional_comparison_tab", "RegionalComparisonTab",
+                                   "create_scatter_competitor_revenue"),
+    "scatter-productvariety-revenue": ("views.store_operations_tab", "StoreOperationsTab",
+                                       "create_scatter_productvariety_revenue"),
+    "scatter-productvariety-efficiency": ("views.store_operations_tab", "StoreOperationsTab",
+                                          "create_scatter_productvariety_efficiency"),
+    "scatter-footfall-efficiency": ("views.store_operations_tab", "StoreOperationsTab",
+                                    "create_scatter_customerfootfall_efficiency"),
+}
+
+# Standard-Trendlinie der Streudiagramme
+DEFAULT_TRENDLINE = "ols"
+
+# Seiten des Dashboards in Reihenfolge der Sidebar. Button-ID, URL und View-ID werden daraus abgeleitet:
+# btn-<name> -> /<name> -> page-<name> (JPG)
+PAGES = ["overview", "key-influencers", "vergleichsfunktion", "performance-insights", "customer-insights",
+         "regional-comparison", "store-operations", "recommendations"]
 
 
 class Dashboard:
@@ -19,11 +66,45 @@ class Dashboard:
 
     def __init__(self, db_path):
         self.db_connector = SQLiteConnector(db_path)
+        self.check_database()
         self.vergleichsfunktion_tab = VergleichsfunktionTab(self.db_connector)
         self.app = dash.Dash(__name__, suppress_callback_exceptions=True)
         self.setup_layout()
         self.setup_callbacks()
 
+    def check_database(self):
+        """
+        Prüft (nur lesend), ob alle abgeleiteten Tabellen, Trigger und Indizes aktuell sind, und gibt andernfalls
+        eine Warnung aus. Das Dashboard schreibt nie in die Datenbank, damit es auch mit schreibgeschützten
+        Datenbanken betrieben werden kann; fehlende Teile legt scripts/migrate.py an. Bis dahin werden
+        Statistiken, Rollups, Suche und Empfehlungen aus dem Snapshot berechnet (siehe SQLiteConnector.outdated),
+        fehlende Ranglisten-Indizes machen die Top-/Flop-Listen nur langsamer.
+        """
+        conn = self.db_connector.connect()
+        try:
+            missing = [name for name, check in DATABASE_CHECKS.items() if not check(conn)]
+        finally:
+            conn.close()
+        self.db_connector.outdated = set(missing)
+        if missing:
+            print(f" Warnung: Die Datenbank '{self.db_connector.db_path}' ist nicht aktuell ({', '.join(missing)}); "
+                  f"die fehlenden Teile werden aus dem Snapshot berechnet. "
+                  f"Bitte 'python scripts/migrate.py --db \"{self.db_connector.db_path}\"' ausführen.")
+        return missing
+
+    def fetch_store_rollup(self, table):
+        """
+        Liefert die Rollup-Tabelle table (siehe scripts/store_rollups.py). Fehlen die Rollups in der Datenbank oder
+        sind sie veraltet, wird die Tabelle einmal pro Datenversion aus dem Snapshot berechnet.
+        """
+        if "Rollups" not in self.db_connector.outdated:
+            return self.db_connector.fetch_store_rollup(table)
+        from analytics.cache import cached_per_version
+        from analytics.rollups import compute_rollup
+
+        df = self.db_connector.fetch_store_data()
+        return cached_per_version(df, f"rollup-{table}", lambda: compute_rollup(df, ROLLUPS[table]))
+
     def setup_layout(self):
         """ Setup Aufbau des Dashboards mit einer einklappbaren Navbar und separaten Views/Tabs. (JPG) """
         self.app.layout = html.Div([
@@ -125,6 +206,10 @@ class Dashboard:
 
                 html.Div([
                     html.H2("Key Influencers"),
+                    dcc.Dropdown(id="key-influencers-segment", value="all", clearable=False,  # "all": alle Stores
+                                 placeholder="Segment (Standort x Kategorie)", style={"marginBottom": "10px"}),
+                    dcc.Dropdown(id="key-influencers-engine", value="linear", clearable=False,
+                                 placeholder="Verfahren", style={"marginBottom": "20px"}),
                     dcc.Graph(id="feature-importance"),
                     dcc.Graph(id="employee-efficiency-importance"),
                     dcc.Graph(id="customer-footfall-importance"),
@@ -137,17 +222,17 @@ class Dashboard:
                 html.Div([
                     html.H2("Performance Insights"),
                     dcc.Graph(id="box-plot-category"),
-                    dcc.Graph(id="scatter-marketing-revenue"),
-                    dcc.Graph(id="scatter-promotions-revenue"),
+                    self.create_scatter("scatter-marketing-revenue"),
+                    self.create_scatter("scatter-promotions-revenue"),
                 ], id="page-performance-insights", style={"display": "none"}),
 
                 html.Div([
                     html.H2("Customer Insights"),
                     dcc.Graph(id="barchart_category_footfall"),
-                    dcc.Graph(id="scatter-footfall-revenue"),
-                    dcc.Graph(id="scatter-productvariety-footfall"),
-                    dcc.Graph(id="scatter-marketing-footfall"),
-                    dcc.Graph(id="scatter-promotions-footfall"),
+                    self.create_scatter("scatter-footfall-revenue"),
+                    self.create_scatter("scatter-productvariety-footfall"),
+                    self.create_scatter("scatter-marketing-footfall"),
+                    self.create_scatter("scatter-promotions-footfall"),
                     dcc.Graph(id="barchart-promotions-footfall"),
                 ], id="page-customer-insights", style={"display": "none"}),
 
@@ -155,18 +240,24 @@ class Dashboard:
                     html.H2("Regional Comparison"),
                     dcc.Graph(id="map-visualization"),
                     dcc.Graph(id="grouped-bar-chart"),
-                    dcc.Graph(id="scatter-competitor-revenue"),
+                    self.create_scatter("scatter-competitor-revenue"),
                     dcc.Graph(id="grouped-bar-chart-footfall"),
                 ], id="page-regional-comparison", style={"display": "none"}),
 
                 html.Div([
                     html.H2("Store Operations"),
-                    dcc.Graph(id="scatter-productvariety-revenue"),
-                    dcc.Graph(id="scatter-productvariety-efficiency"),
+                    self.create_scatter("scatter-productvariety-revenue"),
+                    self.create_scatter("scatter-productvariety-efficiency"),
                     dcc.Graph(id="bubble-productvariety-revenue-efficiency"),
                     dcc.Graph(id="bubble-chart-operations"),
-                    dcc.Graph(id="scatter-footfall-efficiency"),
+                    dcc.Graph(id="pareto-frontier"),
+                    self.create_scatter("scatter-footfall-efficiency"),
                     dcc.Graph(id="histogram-efficiency"),
+
+                    # Die Segmentierung wird im Hintergrund berechnet und per Intervall abgefragt
+                    dcc.Interval(id="store-segments-poll", interval=1000, disabled=True),
+                    dcc.Graph(id="store-segments-bubble-chart"),
+                    dcc.Graph(id="store-segments-kpi-table"),
                 ], id="page-store-operations", style={"display": "none"}),
 
                 html.Div([
@@ -176,89 +267,258 @@ class Dashboard:
             ], id="page-content", style={"margin-left": "220px", "padding": "20px"})
         ])
 
+    @staticmethod
+    def create_scatter(figure_id):
+        """Streudiagramm figure_id mit einem Dropdown für die Art der Trendlinie (siehe SCATTER_FIGURES)."""
+        return html.Div([
+            dcc.Dropdown(id=f"trendline-{figure_id}", value=DEFAULT_TRENDLINE, clearable=False,
+                         options=[{"label": f"Trendline: {label}", "value": mode}
+                                  for mode, label in TRENDLINE_MODES.items()],
+                         style={"width": "220px", "marginLeft": "auto"}),
+            dcc.Graph(id=figure_id),
+        ])
+
+    @staticmethod
+    def trendline_states(*figure_ids):
+        """States der Trendlinien-Dropdowns der Streudiagramme figure_ids (in dieser Reihenfolge)."""
+        return [State(f"trendline-{figure_id}", "value") for figure_id in figure_ids]
+
+    @staticmethod
+    def get_page(pathname):
+        """Bestimmt die aktive Seite anhand der URL (default zur Homepage)."""
+        page = (pathname or "/").lstrip("/")
+        return page if page in PAGES else "overview"
+
+    def is_page_pending(self, pathname, page, current):
+        """Prüft, ob die Seite aktiv ist und ihr Inhalt noch nicht berechnet wurde."""
+        return self.get_page(pathname) == page and not current
+
     def setup_callbacks(self):
         """Setup der callbacks fürs Dashboard."""
 
+        # Jede View wird erst berechnet, wenn sie zum ersten Mal aufgerufen wird. Die View-Module werden erst
+        # dann importiert, sodass schwere Abhängigkeiten (z. B. scikit-learn für das Gradient Boosting) den Start
+        # des Dashboards nicht verzögern.
+
         @self.app.callback(
-            [Output("overview-section", "children"),
-             Output("feature-importance", "figure"),
+            Output("overview-section", "children"),
+            Input("url", "pathname"),
+            State("overview-section", "children")
+        )
+        def render_overview(pathname, current):
+            """Erzeugt den Overview-Tab."""
+            if not self.is_page_pending(pathname, "overview", current):
+                raise dash.exceptions.PreventUpdate
+            from analytics.rollups import LOCATION_CATEGORY
+            from views.overview_tab import OverviewTab
+
+            rollup = self.fetch_store_rollup(LOCATION_CATEGORY)
+            return OverviewTab.create_overview_section(rollup, self.db_connector)
+
+        @self.app.callback(
+            Output("overview-leaderboards", "children"),
+            [Input("leaderboard-size", "value"),
+             Input("leaderboard-location", "value"),
+             Input("leaderboard-category", "value")],
+            prevent_initial_call=True  # Die Standard-Ranglisten sind bereits im Layout enthalten
+        )
+        def update_leaderboards(n, location, category):
+            """Aktualisiert die Top- und Flop-Listen für die gewählte Anzahl, den Standort und die Kategorie."""
+            from views.overview_tab import MAX_LEADERBOARD_SIZE, OverviewTab
+
+            if not n or n < 1:
+                raise dash.exceptions.PreventUpdate  # Ungültige bzw. leere Eingabe
+            return OverviewTab.create_leaderboards(self.db_connector, min(int(n), MAX_LEADERBOARD_SIZE),
+                                                   location, category)
+
+        @self.app.callback(
+            [Output("feature-importance", "figure"),
              Output("correlation-heatmap", "figure"),
              Output("employee-efficiency-importance", "figure"),
              Output("customer-footfall-importance", "figure"),
-             Output("barchart_category_footfall", "figure"),
+             Output("key-influencers-segment", "options"),
+             Output("key-influencers-engine", "options")],
+            Input("url", "pathname"),
+            State("feature-importance", "figure")
+        )
+        def render_key_influencers(pathname, current):
+            """Erzeugt die Diagramme des KeyInfluencers-Tabs."""
+            if not self.is_page_pending(pathname, "key-influencers", current):
+                raise dash.exceptions.PreventUpdate
+            from views.key_influencers_tab import KeyInfluencersTab, ENGINE_OPTIONS
+
+            df = self.db_connector.fetch_store_data()
+            statistics = self.db_connector.fetch_store_statistics()
+            return (KeyInfluencersTab.create_feature_importance_figure(df, statistics),
+                    KeyInfluencersTab.create_correlation_heatmap(df, statistics),
+                    KeyInfluencersTab.create_employee_efficiency_importance_figure(df, statistics),
+                    KeyInfluencersTab.create_customer_footfall_importance_figure(df, statistics),
+                    KeyInfluencersTab.get_segment_options(df),
+                    ENGINE_OPTIONS)
+
+        @self.app.callback(
+            [Output("feature-importance", "figure", allow_duplicate=True),
+             Output("employee-efficiency-importance", "figure", allow_duplicate=True),
+             Output("customer-footfall-importance", "figure", allow_duplicate=True)],
+            [Input("key-influencers-segment", "value"),
+             Input("key-influencers-engine", "value")],
+            prevent_initial_call=True
+        )
+        def update_key_influencers_selection(segment, engine):
+            """Zeigt die Key-Influencer-Modelle für das ausgewählte Segment und Verfahren an."""
+            from views.key_influencers_tab import KeyInfluencersTab
+
+            df = self.db_connector.fetch_store_data()
+            statistics = self.db_connector.fetch_store_statistics()
+            return (KeyInfluencersTab.create_feature_importance_figure(df, statistics, segment, engine),
+                    KeyInfluencersTab.create_employee_efficiency_importance_figure(df, statistics, segment, engine),
+                    KeyInfluencersTab.create_customer_footfall_importance_figure(df, statistics, segment, engine))
+
+        @self.app.callback(
+            [Output("box-plot-category", "figure"),
+             Output("scatter-marketing-revenue", "figure"),
+             Output("scatter-promotions-revenue", "figure")],
+            Input("url", "pathname"),
+            [State("box-plot-category", "figure")]
+            + self.trendline_states("scatter-marketing-revenue", "scatter-promotions-revenue")
+        )
+        def render_performance_insights(pathname, current, marketing_trendline, promotions_trendline):
+            """Erzeugt die Diagramme des PerformanceInsights-Tabs."""
+            if not self.is_page_pending(pathname, "performance-insights", current):
+                raise dash.exceptions.PreventUpdate
+            from views.performance_insights_tab import PerformanceInsightsTab
+
+            df = self.db_connector.fetch_store_data()
+            return (PerformanceInsightsTab.create_box_plot_category(df),
+                    PerformanceInsightsTab.create_scatter_marketing_revenue(df, trendline=marketing_trendline),
+                    PerformanceInsightsTab.create_scatter_promotions_revenue(df, trendline=promotions_trendline))
+
+        @self.app.callback(
+            [Output("barchart_category_footfall", "figure"),
              Output("scatter-footfall-revenue", "figure"),
              Output("scatter-productvariety-footfall", "figure"),
              Output("scatter-marketing-footfall", "figure"),
              Output("scatter-promotions-footfall", "figure"),
-             Output("barchart-promotions-footfall", "figure"),
-             Output("scatter-marketing-revenue", "figure"),
-             Output("scatter-promotions-revenue", "figure"),
-             Output("scatter-competitor-revenue", "figure"),
-             Output("grouped-bar-chart-footfall", "figure"),
-             Output("box-plot-category", "figure"),
-             Output("map-visualization", "figure"),
+             Output("barchart-promotions-footfall", "figure")],
+            Input("url", "pathname"),
+            [State("barchart_category_footfall", "figure")]
+            + self.trendline_states("scatter-footfall-revenue", "scatter-productvariety-footfall",
+                                    "scatter-marketing-footfall", "scatter-promotions-footfall")
+        )
+        def render_customer_insights(pathname, current, footfall_trendline, productvariety_trendline,
+                                     marketing_trendline, promotions_trendline):
+            """Erzeugt die Diagramme des CustomerInsights-Tabs."""
+            if not self.is_page_pending(pathname, "customer-insights", current):
+                raise dash.exceptions.PreventUpdate
+            from analytics.rollups import LOCATION_CATEGORY, PROMOTIONS
+            from views.customer_insights_tab import CustomerInsightsTab
+
+            df = self.db_connector.fetch_store_data()
+            return (CustomerInsightsTab.create_barchart_category_footfall(
+                        self.fetch_store_rollup(LOCATION_CATEGORY)),
+                    CustomerInsightsTab.create_scatter_footfall_revenue(df, trendline=footfall_trendline),
+                    CustomerInsightsTab.create_scatter_productvariety_vs_footfall(
+                        df, trendline=productvariety_trendline),
+                    CustomerInsightsTab.create_scatter_marketing_footfall(df, trendline=marketing_trendline),
+                    CustomerInsightsTab.create_scatter_promotions_footfall(df, trendline=promotions_trendline),
+                    CustomerInsightsTab.create_bar_chart_promotions_vs_footfall(
+                        self.fetch_store_rollup(PROMOTIONS)))
+
+        @self.app.callback(
+            [Output("map-visualization", "figure"),
              Output("grouped-bar-chart", "figure"),
-             Output("scatter-productvariety-revenue", "figure"),
+             Output("scatter-competitor-revenue", "figure"),
+             Output("grouped-bar-chart-footfall", "figure")],
+            Input("url", "pathname"),
+            [State("map-visualization", "figure")] + self.trendline_states("scatter-competitor-revenue")
+        )
+        def render_regional_comparison(pathname, current, competitor_trendline):
+            """Erzeugt die Diagramme des RegionalComparison-Tabs."""
+            if not self.is_page_pending(pathname, "regional-comparison", current):
+                raise dash.exceptions.PreventUpdate
+            from analytics.rollups import LOCATION_CATEGORY
+            from views.regional_comparison_tab import RegionalComparisonTab
+
+            df = self.db_connector.fetch_store_data()
+            rollup = self.fetch_store_rollup(LOCATION_CATEGORY)
+            return (RegionalComparisonTab.create_map_visualization(rollup),
+                    RegionalComparisonTab.create_grouped_bar_chart(rollup),
+                    RegionalComparisonTab.create_scatter_competitor_revenue(df, trendline=competitor_trendline),
+                    RegionalComparisonTab.create_grouped_barchart_footfall(rollup))
+
+        @self.app.callback(
+            [Output("scatter-productvariety-revenue", "figure"),
              Output("scatter-productvariety-efficiency", "figure"),
              Output("bubble-productvariety-revenue-efficiency", "figure"),
              Output("bubble-chart-operations", "figure"),
+             Output("pareto-frontier", "figure"),
              Output("scatter-footfall-efficiency", "figure"),
-             Output("histogram-efficiency", "figure"),
-             Output("recommendations-section", "children")],
-            Input("feature-importance", "id")
+             Output("histogram-efficiency", "figure")],
+            Input("url", "pathname"),
+            [State("scatter-productvariety-revenue", "figure")]
+            + self.trendline_states("scatter-productvariety-revenue", "scatter-productvariety-efficiency",
+                                    "scatter-footfall-efficiency")
+        )
+        def render_store_operations(pathname, current, revenue_trendline, efficiency_trendline, footfall_trendline):
+            """Erzeugt die Diagramme des StoreOperations-Tabs."""
+            if not self.is_page_pending(pathname, "store-operations", current):
+                raise dash.exceptions.PreventUpdate
+            from views.store_operations_tab import StoreOperationsTab
+
+            df = self.db_connector.fetch_store_data()
+            return (StoreOperationsTab.create_scatter_productvariety_revenue(df, trendline=revenue_trendline),
+                    StoreOperationsTab.create_scatter_productvariety_efficiency(df, trendline=efficiency_trendline),
+                    StoreOperationsTab.create_bubble_chart_with_best_point(df),
+                    StoreOperationsTab.create_bubble_chart_operations(df),
+                    StoreOperationsTab.create_pareto_frontier(df),
+                    StoreOperationsTab.create_scatter_customerfootfall_efficiency(df, trendline=footfall_trendline),
+                    StoreOperationsTab.create_histogram_efficiency(df))
+
+        for figure_id, builder in SCATTER_FIGURES.items():
+            self.register_trendline_callback(figure_id, *builder)
+
+        @self.app.callback(
+            [Output("store-segments-bubble-chart", "figure"),
+             Output("store-segments-kpi-table", "figure"),
+             Output("store-segments-poll", "disabled")],
+            [Input("url", "pathname"),
+             Input("store-segments-poll", "n_intervals")],
+            State("store-segments-bubble-chart", "figure")
         )
-        def update_dashboard(_):
-            """Erzeugt das Dashboard im Gesamten."""
-            df = self.db_connector.fetch_data("SELECT * FROM StoreData")
-
-            # Funktionen/Diagramme des Overview-Tabs
-            overview = OverviewTab.create_overview_section(df)
-
-            # Funktionen/Diagramme des KeyInfluencers-Tabs
-            feature_importance_fig = KeyInfluencersTab.create_feature_importance_figure(df)
-            heatmap_fig = KeyInfluencersTab.create_correlation_heatmap(df)
-            employee_efficiency_importance_fig = KeyInfluencersTab.create_employee_efficiency_importance_figure(df)
-            customer_footfall_importance_fig = KeyInfluencersTab.create_customer_footfall_importance_figure(df)
-
-            # Funktionen/Diagramme des PerformanceInsights-Tabs
-            scatter_marketing_fig = PerformanceInsightsTab.create_scatter_marketing_revenue(df)
-            box_plot_category_fig = PerformanceInsightsTab.create_box_plot_category(df)
-            scatter_promotions_revenue_fig = PerformanceInsightsTab.create_scatter_promotions_revenue(df)
-
-            # Funktionen/Diagramme des CustomerInsights-Tabs
-            barchart_category_footfall_fig = CustomerInsightsTab.create_barchart_category_footfall(df)
-            scatter_footfall_fig = CustomerInsightsTab.create_scatter_footfall_revenue(df)
-            scatter_productvariety_footfall_fig = CustomerInsightsTab.create_scatter_productvariety_vs_footfall(df)
-            scatter_marketing_footfall_fig = CustomerInsightsTab.create_scatter_marketing_footfall(df)
-            scatter_promotions_footfall_fig = CustomerInsightsTab.create_scatter_promotions_footfall(df)
-            barchart_promotions_footfall_fig = CustomerInsightsTab.create_bar_chart_promotions_vs_footfall(df)
-
-            # Funktionen/Diagramme des RegionalComparison-Tabs
-            map_fig = RegionalComparisonTab.create_map_visualization(df)
-            grouped_bar_fig = RegionalComparisonTab.create_grouped_bar_chart(df)
-            scatter_competitor_fig = RegionalComparisonTab.create_scatter_competitor_revenue(df)
-            grouped_barchart_footfall_fig = RegionalComparisonTab.create_grouped_barchart_footfall(df)
-
-            # Funktionen/Diagramme des StoreOperations-Tabs
-            scatter_productvariety_revenue_fig = StoreOperationsTab.create_scatter_productvariety_revenue(df)
-            scatter_productvariety_efficiency_fig = StoreOperationsTab.create_scatter_productvariety_efficiency(df)
-            bubble_productvariety_revenue_efficiency_fig = StoreOperationsTab.create_bubble_chart_with_best_point(df)
-            bubble_chart_fig = StoreOperationsTab.create_bubble_chart_operations(df)
-            scatter_footfall_efficiency_fig = StoreOperationsTab.create_scatter_customerfootfall_efficiency(df)
-            histogram_fig = StoreOperationsTab.create_histogram_efficiency(df)
-
-            # Funktionen/Diagramme des Recommendations-Tabs
-            recommendations = RecommendationsTab.create_recommendations_section(df)
-
-            return (overview, feature_importance_fig, heatmap_fig, employee_efficiency_importance_fig,
-                    customer_footfall_importance_fig, barchart_category_footfall_fig, scatter_footfall_fig,
-                    scatter_productvariety_footfall_fig, scatter_marketing_footfall_fig,
-                    scatter_promotions_footfall_fig, barchart_promotions_footfall_fig,
-                    scatter_marketing_fig, scatter_promotions_revenue_fig, scatter_competitor_fig,
-                    grouped_barchart_footfall_fig, box_plot_category_fig,
-                    map_fig, grouped_bar_fig, scatter_productvariety_revenue_fig, scatter_productvariety_efficiency_fig,
-                    bubble_productvariety_revenue_efficiency_fig, bubble_chart_fig, scatter_footfall_efficiency_fig,
-                    histogram_fig, recommendations)
+        def render_store_segments(pathname, n_intervals, current):
+            """
+            Zeigt die Segmentierung der Stores an. Solange sie im Hintergrund berechnet wird, bleibt das
+            Intervall aktiv und der Callback fragt jede Sekunde erneut nach.
+            """
+            if not self.is_page_pending(pathname, "store-operations", current):
+                raise dash.exceptions.PreventUpdate
+            from analytics.segmentation import get_segmentation
+            from views.store_operations_tab import StoreOperationsTab
+
+            df = self.db_connector.fetch_store_data()
+            try:
+                segmentation = get_segmentation(df)
+            except Exception as e:
+                message = go.Figure(layout={"title": f"Store segmentation failed: {e}"})
+                return message, message, True
+            if segmentation is None:
+                return dash.no_update, dash.no_update, False
+            return (StoreOperationsTab.create_segment_bubble_chart(df, segmentation),
+                    StoreOperationsTab.create_segment_kpi_table(df, segmentation),
+                    True)
+
+        @self.app.callback(
+            Output("recommendations-section", "children"),
+            Input("url", "pathname"),
+            State("recommendations-section", "children")
+        )
+        def render_recommendations(pathname, current):
+            """Erzeugt den Recommendations-Tab."""
+            if not self.is_page_pending(pathname, "recommendations", current):
+                raise dash.exceptions.PreventUpdate
+
+            df = self.db_connector.fetch_store_data()
+            return RecommendationsTab.create_recommendations_section(df, self.db_connector)
 
         # Setup der callbacks fürs Vergleichsfunktion in Dashboard. (DM)
         @self.app.callback(
@@ -266,187 +526,135 @@ class Dashboard:
              Output("comparison-bar-chart", "figure"),
              Output("comparison-pie-chart", "figure")],
             Input("compare-button", "n_clicks"),
-            [State("compare-first", "value"),
-             State("compare-second", "value"),
+            [State("compare-selections", "value"),
              State("compare-metrics", "value")]
         )
-        def update_comparison(n_clicks, first, second, metrics):
-            """Erzeugt Vergleichsmetriken und Diagramme (DM)"""
-            if not first or not second or not metrics:
-                return "Please select two stores/regions and at least one metric.", go.Figure(), go.Figure()
+        def update_comparison(n_clicks, selections, metrics):
+            """Erzeugt Vergleichsmetriken und Diagramme für 2 bis MAX_SELECTIONS Auswahlen (DM)"""
+            if not selections or len(selections) < 2 or not metrics:
+                return ("Please select at least two stores/regions/categories and at least one metric.",
+                        go.Figure(), go.Figure())
+            if len(selections) > MAX_SELECTIONS:
+                return f"Please select at most {MAX_SELECTIONS} stores/regions/categories.", go.Figure(), go.Figure()
 
-            df = self.db_connector.fetch_data("SELECT * FROM StoreData")
+            df = self.db_connector.fetch_store_data()
 
-            comparison_metrics = self.vergleichsfunktion_tab.generate_comparison_metrics(df, first, second, metrics)
-            bar_chart = self.vergleichsfunktion_tab.create_comparison_bar_chart(df, first, second, metrics)
-            pie_chart = self.vergleichsfunktion_tab.create_comparison_pie_chart(df, first, second)
+            # Alle drei Ausgaben lesen aus demselben Stats-Index (ein gruppierter Durchlauf pro Datenversion)
+            comparison_metrics = self.vergleichsfunktion_tab.generate_comparison_metrics(df, selections, metrics)
+            bar_chart = self.vergleichsfunktion_tab.create_comparison_bar_chart(df, selections, metrics)
+            pie_chart = self.vergleichsfunktion_tab.create_comparison_pie_chart(df, selections)
 
             return comparison_metrics, bar_chart, pie_chart
 
-        """ Navigation und View-Handling basierend auf der URL (JPG) """
-
-        # Callback zur Hervorhebung des aktiven Tabs in der Sidebar (JPG)
+        # Die Stores der Dropdowns werden nicht ins Layout eingebettet, sondern pro Eingabe über den
+        # Suchindex StoreSearch abgefragt (nur die ersten Treffer und die aktuelle Auswahl)
         @self.app.callback(
-            [Output("btn-overview", "style"),
-             Output("btn-key-influencers", "style"),
-             Output("btn-vergleichsfunktion", "style"),
-             Output("btn-performance-insights", "style"),
-             Output("btn-customer-insights", "style"),
-             Output("btn-regional-comparison", "style"),
-             Output("btn-store-operations", "style"),
-             Output("btn-recommendations", "style")],
-            Input("url", "pathname")
+            Output("compare-selections", "options"),
+            Input("compare-selections", "search_value"),
+            State("compare-selections", "value")
         )
-        def update_active_tab(pathname):
-            default_style = {
-                "width": "100%", "height": "60px", "fontSize": "18px",
-                "margin": "5px 0", "display": "flex", "alignItems": "center",
-                "borderRadius": "12px", "backgroundColor": "#f0f0f0",
-                "fontWeight": "normal", "color": "black"
-            }
-            active_style = default_style.copy()
-            active_style["backgroundColor"] = "#007bff"  # Blaues Highlight
-            active_style["color"] = "white"
-            active_style["fontWeight"] = "bold"
-
-            styles = [default_style] * 8
-            if pathname in ["/overview", "/", None]:
-                styles[0] = active_style
-            elif pathname == "/key-influencers":
-                styles[1] = active_style
-            elif pathname == "/vergleichsfunktion":
-                styles[2] = active_style
-            elif pathname == "/performance-insights":
-                styles[3] = active_style
-            elif pathname == "/customer-insights":
-                styles[4] = active_style
-            elif pathname == "/regional-comparison":
-                styles[5] = active_style
-            elif pathname == "/store-operations":
-                styles[6] = active_style
-            elif pathname == "/recommendations":
-                styles[7] = active_style
-
-            return styles
+        def search_comparison_options(search_value, selections):
+            """Liefert die Optionen des Vergleichs-Dropdowns passend zur Eingabe."""
+            return self.vergleichsfunktion_tab.search_comparison_options(search_value, selections or [])
 
-        # Callback, damit nur die aktive View, basierend auf der URL, angezeigt wird (JPG)
         @self.app.callback(
-            Output("page-overview", "style"),
-            Output("page-key-influencers", "style"),
-            Output("page-vergleichsfunktion", "style"),
-            Output("page-performance-insights", "style"),
-            Output("page-customer-insights", "style"),
-            Output("page-regional-comparison", "style"),
-            Output("page-store-operations", "style"),
-            Output("page-recommendations", "style"),
-            Input("url", "pathname")
+            Output("peer-store", "options"),
+            Input("peer-store", "search_value"),
+            State("peer-store", "value")
         )
-        def display_page(pathname):
-            hidden = {"display": "none"}
-            visible = {"display": "block"}
-            # Initialisiere alle Views als versteckt.
-            styles = [hidden] * 8
-            if pathname in ["/overview", "/", None]:
-                styles[0] = visible
-            elif pathname == "/key-influencers":
-                styles[1] = visible
-            elif pathname == "/vergleichsfunktion":
-                styles[2] = visible
-            elif pathname == "/performance-insights":
-                styles[3] = visible
-            elif pathname == "/customer-insights":
-                styles[4] = visible
-            elif pathname == "/regional-comparison":
-                styles[5] = visible
-            elif pathname == "/store-operations":
-                styles[6] = visible
-            elif pathname == "/recommendations":
-                styles[7] = visible
-            else:
-                styles[0] = visible  # default zur Homepage
-            return styles
+        def search_peer_store_options(search_value, store):
+            """Liefert die Store-Optionen des Peer-Group-Dropdowns passend zur Eingabe."""
+            return self.vergleichsfunktion_tab.search_store_options(search_value, [store] if store else [])
 
         @self.app.callback(
-            Output("recommendations-section", "children", allow_duplicate=True),
-            Input("url", "pathname"),
-            prevent_initial_call=True
+            [Output("peer-output", "children"),
+             Output("peer-comparison-chart", "figure")],
+            Input("peer-button", "n_clicks"),
+            [State("peer-store", "value"),
+             State("peer-count", "value")]
         )
-        def update_recommendations(pathname):
-            if pathname != "/recommendations":
-                raise dash.exceptions.PreventUpdate  # Kein Update außerhalb des Tabs
+        def update_peer_comparison(n_clicks, store, k):
+            """Sucht die ähnlichsten Stores (Peer Group) und vergleicht den Store mit deren Durchschnitt."""
+            if not store or not k:
+                return "Please select a store and the number of peers.", go.Figure()
 
-            df = self.db_connector.fetch_data("SELECT * FROM StoreData")
-            if df.empty:
-                return html.P(" Keine Daten verfügbar.")
+            df = self.db_connector.fetch_store_data()
+            return self.vergleichsfunktion_tab.create_peer_comparison(df, int(store), int(k))
+
+        """ Navigation und View-Handling basierend auf der URL (JPG) """
+
+        # Navigation, Tab-Hervorhebung und Sidebar-Toggle sind reiner UI-Zustand und laufen deshalb
+        # clientseitig im Browser (siehe assets/navigation.js), ohne Request an den Server.
+
+        # Callback zur Hervorhebung des aktiven Tabs in der Sidebar (JPG)
+        self.app.clientside_callback(
+            ClientsideFunction(namespace="navigation", function_name="updateActiveTab"),
+            [Output(f"btn-{page}", "style") for page in PAGES],
+            Input("url", "pathname")
+        )
 
-            return RecommendationsTab.create_recommendations_section(df)
+        # Callback, damit nur die aktive View, basierend auf der URL, angezeigt wird (JPG)
+        self.app.clientside_callback(
+            ClientsideFunction(namespace="navigation", function_name="displayPage"),
+            [Output(f"page-{page}", "style") for page in PAGES],
+            Input("url", "pathname")
+        )
 
         # Callback zum Togglen der Sidebar mit dem Button (JPG)
-        @self.app.callback(
+        self.app.clientside_callback(
+            ClientsideFunction(namespace="navigation", function_name="toggleSidebar"),
             Output("sidebar", "style"),
             Output("page-content", "style"),
             Input("toggle-navbar", "n_clicks"),
             State("sidebar", "style"),
             State("page-content", "style")
         )
-        def toggle_sidebar(n_clicks, current_sidebar_style, current_content_style):
-            if n_clicks is None:
-                raise dash.exceptions.PreventUpdate
-            # Togglen der sidebar: wenn ungerade Anzahl an Klicks, Verstecken; wenn gerade Anzahl, Zeigen.
-            if n_clicks % 2 == 1:
-                new_sidebar_style = current_sidebar_style.copy() if current_sidebar_style else {}
-                new_sidebar_style["display"] = "none"
-                new_content_style = current_content_style.copy() if current_content_style else {}
-                new_content_style["margin-left"] = "20px"
-                return new_sidebar_style, new_content_style
-            else:
-                new_sidebar_style = current_sidebar_style.copy() if current_sidebar_style else {}
-                new_sidebar_style["display"] = "flex"
-                new_content_style = current_content_style.copy() if current_content_style else {}
-                new_content_style["margin-left"] = "220px"
-                return new_sidebar_style, new_content_style
 
         # Callback zum Updaten der URL, je nachdem welcher Button geklickt wird (JPG)
-        @self.app.callback(
+        self.app.clientside_callback(
+            ClientsideFunction(namespace="navigation", function_name="navigate"),
             Output("url", "pathname"),
-            [Input("btn-overview", "n_clicks"),
-             Input("btn-key-influencers", "n_clicks"),
-             Input("btn-vergleichsfunktion", "n_clicks"),
-             Input("btn-performance-insights", "n_clicks"),
-             Input("btn-customer-insights", "n_clicks"),
-             Input("btn-regional-comparison", "n_clicks"),
-             Input("btn-store-operations", "n_clicks"),
-             Input("btn-recommendations", "n_clicks")]
+            [Input(f"btn-{page}", "n_clicks") for page in PAGES]
         )
-        # Navigierungsfunktion (JPG)
-        def navigate(n_overview, n_key_influencers, n_vergleich, n_perf, n_cust, n_reg, n_store, n_rec):
-            ctx = dash.callback_context
-            if not ctx.triggered:
-                return "/overview"
-            button_id = ctx.triggered[0]['prop_id'].split('.')[0]
-            if button_id == "btn-overview":
-                return "/overview"
-            elif button_id == "btn-key-influencers":
-                return "/key-influencers"
-            elif button_id == "btn-vergleichsfunktion":
-                return "/vergleichsfunktion"
-            elif button_id == "btn-performance-insights":
-                return "/performance-insights"
-            elif button_id == "btn-customer-insights":
-                return "/customer-insights"
-            elif button_id == "btn-regional-comparison":
-                return "/regional-comparison"
-            elif button_id == "btn-store-operations":
-                return "/store-operations"
-            elif button_id == "btn-recommendations":
-                return "/recommendations"
-            return "/overview"
 
         RecommendationsTab.register_callbacks(self.app, self.db_connector)
 
-    def run(self):
-        """Startet den Dash-Server."""
-        self.app.run_server(debug=True)
+    def register_trendline_callback(self, figure_id, module, view, method):
+        """
+        Registriert den Callback, der das Streudiagramm figure_id mit der im Dropdown gewählten Trendlinie neu
+        erzeugt. Die View wird wie bei den Seiten erst beim ersten Aufruf importiert.
+        """
+        @self.app.callback(
+            Output(figure_id, "figure", allow_duplicate=True),
+            Input(f"trendline-{figure_id}", "value"),
+            prevent_initial_call=True  # Die Standard-Trendlinie erzeugt bereits der Callback der Seite
+        )
+        def update_trendline(mode):
+            """Erzeugt das Streudiagramm mit der gewählten Trendlinie."""
+            if mode not in TRENDLINE_MODES:
+                raise dash.exceptions.PreventUpdate
+            builder = getattr(getattr(importlib.import_module(module), view), method)
+            return builder(self.db_connector.fetch_store_data(), trendline=mode)
+
+    def preload(self):
+        """
+        Lädt die Daten vorab in einen eingefrorenen, schreibgeschützten Snapshot. Im Produktivbetrieb
+        (siehe wsgi.py) geschieht das einmalig im Master-Prozess, bevor die Worker geforkt werden,
+        sodass sich alle Worker den Snapshot teilen, statt ihn jeweils selbst zu laden.
+
+        Neben StoreData und den Statistiken werden auch die Rollups und die Empfehlungen aller Stores (aus dem
+        Snapshot, siehe RecommendationsTab.get_stale_recommendations) eingefroren, damit sie zum Snapshot passen.
+        Live aus der Datenbank gelesen werden danach nur noch die Top-/Flop-Listen und die Store-Suche: Nach
+        Änderungen an StoreData können sie bis zum nächsten Neustart von den übrigen Seiten abweichen.
+        """
+        self.db_connector.freeze()
+        for table in ROLLUPS:
+            self.db_connector.make_read_only(self.fetch_store_rollup(table))
+        RecommendationsTab.get_stale_recommendations(self.db_connector)
+
+    def run(self, debug=True):
+        """Startet den Dash-Entwicklungsserver. Für den Produktivbetrieb siehe wsgi.py."""
+        self.app.run_server(debug=debug)
 
 
 if __name__ == "__main__":  # JE
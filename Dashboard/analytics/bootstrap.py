@@ -0,0 +1,81 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from analytics.regression_engine import RegressionEngine, compute_grouped_moments, influence_percentages
+
+# Höchstzahl der Blöcke: Bei mehr Zeilen werden die Zeilen zufällig auf Blöcke verteilt und ganze Blöcke
+# gezogen. Bis zu dieser Größe entspricht der Bootstrap exakt dem Ziehen einzelner Zeilen.
+MAX_BLOCKS = 4096
+
+# Anzahl der Bootstrap-Stichproben pro Arbeitspaket
+CHUNK_SIZE = 250
+
+# Ab dieser Anzahl an Blöcken lohnt sich der Prozess-Pool (darunter wird im aktuellen Prozess gerechnet)
+PARALLEL_MIN_BLOCKS = 2048
+
+# Startmethode der Pool-Prozesse: Der Pool wird innerhalb eines Requests erzeugt, also in einem Worker mit
+# mehreren Threads (gunicorn). fork würde dort auch gesperrte Locks anderer Threads kopieren; forkserver
+# (bzw. spawn, wo es forkserver nicht gibt, z. B. unter Windows) startet die Prozesse stattdessen sauber.
+START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+
+def bootstrap_chunk(block_moments, columns, shift, models, seed, size):
+    """
+    Berechnet size Bootstrap-Stichproben: Jede Stichprobe zieht die Blöcke mit Zurücklegen
+    (Multinomial-Gewichte), ihre Kreuzprodukt-Matrix ist die gewichtete Summe der Block-Matrizen.
+    Alle Stichproben werden als Batch mit der RegressionEngine geschätzt.
+
+    Liefert {Modellname: Einflüsse in % (size x Features)}.
+    """
+    rng = np.random.default_rng(seed)
+    n_blocks = len(block_moments)
+    weights = rng.multinomial(n_blocks, np.full(n_blocks, 1.0 / n_blocks), size=size).astype(float)
+    moments = np.tensordot(weights, block_moments, axes=1)
+
+    results = RegressionEngine(moments, columns, shift).fit_many(models)
+    return {name: influence_percentages(result["coefficients"]) for name, result in results.items()}
+
+
+def bootstrap_influences(df, models, resamples=1000, confidence=0.95, n_jobs=None, seed=0):
+    """
+    Bootstrap-Konfidenzintervalle (Perzentil-Methode) für die Einflüsse in % aller Modelle
+    {Name: {"target": ..., "features": [...]}}.
+
+    Die Rohdaten werden nur einmal gelesen, um die Kreuzprodukt-Matrizen der Blöcke zu berechnen. Danach
+    kostet jede Stichprobe nur noch eine gewichtete Summe dieser Matrizen und kleine Gleichungssysteme,
+    unabhängig von der Anzahl der Zeilen. Die Stichproben werden in Paketen berechnet, bei großen Daten
+    verteilt auf einen Prozess-Pool (n_jobs, Standard: Anzahl der CPUs).
+
+    Liefert {Modellname: {"lower": ..., "upper": ...}} mit den Intervallgrenzen je Feature.
+    """
+    columns = list(dict.fromkeys(
+        column for model in models.values() for column in model["features"] + [model["target"]]))
+    values = df[columns].dropna().to_numpy(dtype=float)
+    shift = values.mean(axis=0)
+
+    seed_sequence = np.random.SeedSequence(seed)
+    n_blocks = min(len(values), MAX_BLOCKS)
+    blocks = np.random.default_rng(seed_sequence.spawn(1)[0]).permutation(len(values)) % n_blocks
+    block_moments = compute_grouped_moments(values, blocks, n_blocks, shift)
+
+    sizes = [min(CHUNK_SIZE, resamples - start) for start in range(0, resamples, CHUNK_SIZE)]
+    seeds = seed_sequence.spawn(len(sizes))
+    n_jobs = min(n_jobs or os.cpu_count() or 1, len(sizes))
+
+    arguments = [(block_moments, columns, shift, models, chunk_seed, size) for chunk_seed, size in zip(seeds, sizes)]
+    if n_jobs > 1 and n_blocks >= PARALLEL_MIN_BLOCKS:
+        with ProcessPoolExecutor(max_workers=n_jobs, mp_context=multiprocessing.get_context(START_METHOD)) as executor:
+            chunks = list(executor.map(bootstrap_chunk, *zip(*arguments)))
+    else:
+        chunks = [bootstrap_chunk(*chunk_arguments) for chunk_arguments in arguments]
+
+    alpha = (1 - confidence) / 2
+    intervals = {}
+    for name in models:
+        samples = np.concatenate([chunk[name] for chunk in chunks])
+        lower, upper = np.nanpercentile(samples, [100 * alpha, 100 * (1 - alpha)], axis=0)
+        intervals[name] = {"lower": lower, "upper": upper}
+    return intervals
@@ -0,0 +1,38 @@
+import threading
+
+# Zwischenspeicher für abgeleitete Daten (Modelle, Kennzahlen, Layouts): key -> (Datenversion, Wert)
+_cache = {}
+_lock = threading.Lock()
+
+
+def get_data_version(df):
+    """
+    Liefert die Datenversion eines DataFrames, wie sie von SQLiteConnector.fetch_store_data() gesetzt wird.
+    Zusätzlich fließt die Zeilenanzahl ein, damit gefilterte Teil-DataFrames (die die attrs erben)
+    nicht mit dem vollständigen Snapshot verwechselt werden.
+    """
+    version = df.attrs.get("data_version")
+    if version is None:
+        return None
+    return version, len(df)
+
+
+def cached_per_version(df, key, builder):
+    """
+    Berechnet builder() höchstens einmal pro Datenversion von df und gibt danach das zwischengespeicherte
+    Ergebnis zurück. Pro key wird nur die aktuellste Version gehalten. DataFrames ohne Datenversion
+    (z. B. selbst erzeugte) werden nicht zwischengespeichert.
+    """
+    version = get_data_version(df)
+    if version is None:
+        return builder()
+
+    with _lock:
+        entry = _cache.get(key)
+    if entry is not None and entry[0] == version:
+        return entry[1]
+
+    value = builder()
+    with _lock:
+        _cache[key] = (version, value)
+    return value
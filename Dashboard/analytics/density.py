@@ -0,0 +1,123 @@
+import os
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+from analytics.cache import cached_per_version
+
+# Ab dieser Anzahl an Zeilen werden Streudiagramme serverseitig zu einer 2D-Dichte (Heatmap) aggregiert,
+# statt jeden Store als Punkt an den Browser zu senden
+DENSITY_THRESHOLD = int(os.environ.get("DASHBOARD_DENSITY_THRESHOLD", 50000))
+
+# Anzahl der Bins je Achse im Dichte-Modus (die Größe der Antwort hängt nur hiervon ab)
+DENSITY_BINS = 100
+
+# Ab dieser Anzahl an Zeilen werden die Punkte mit WebGL (scattergl) statt als SVG-Elemente gezeichnet
+WEBGL_THRESHOLD = int(os.environ.get("DASHBOARD_WEBGL_THRESHOLD", 10000))
+
+# Höchstzahl der Punkte, die im WebGL-Modus an den Browser gesendet werden (0 = keine Ausdünnung)
+DECIMATION_MAX_POINTS = int(os.environ.get("DASHBOARD_DECIMATION_MAX_POINTS", 10000))
+
+
+def compute_density(df, x, y, bins=DENSITY_BINS):
+    """
+    Zählt die Zeilen je Zelle eines bins x bins Rasters über (x, y) in einem Durchlauf (np.histogram2d).
+    Liefert die Zellmitten beider Achsen und die Anzahl je Zelle (leere Zellen als NaN), pro Datenversion
+    zwischengespeichert.
+    """
+    def build():
+        data = df[[x, y]].dropna().to_numpy(dtype=float)
+        counts, x_edges, y_edges = np.histogram2d(data[:, 0], data[:, 1], bins=bins)
+        counts[counts == 0] = np.nan  # Leere Zellen bleiben transparent
+        return (x_edges[:-1] + x_edges[1:]) / 2, (y_edges[:-1] + y_edges[1:]) / 2, counts.T
+
+    return cached_per_version(df, f"density-{x}-{y}-{bins}", build)
+
+
+def create_density_figure(df, x, y, title=None, labels=None):
+    """Erzeugt eine Heatmap der Anzahl der Stores je Zelle als Ersatz für ein Streudiagramm mit vielen Punkten."""
+    labels = labels or {}
+    x_label, y_label = labels.get(x, x), labels.get(y, y)
+    x_centers, y_centers, counts = compute_density(df, x, y)
+
+    fig = go.Figure(go.Heatmap(
+        x=x_centers,
+        y=y_centers,
+        z=counts,
+        colorscale="Blues",
+        colorbar={"title": "Stores"},
+        hovertemplate=f"{x_label}: %{{x}}<br>{y_label}: %{{y}}<br>Stores: %{{z}}<extra></extra>",
+    ))
+    fig.update_layout(
+        title=f"{title} (Dichte, {len(df):,} Stores)" if title else None,
+        xaxis_title=x_label,
+        yaxis_title=y_label,
+        legend={"title": {"text": ""}},
+    )
+    return fig
+
+
+def decimate(df, max_points, group=None, extremes=(), keep=None):
+    """
+    Dünnt df auf etwa max_points Zeilen aus: geschichtete Zufallsstichprobe je Wert der Spalte group,
+    proportional zur Gruppengröße. Immer erhalten bleiben je Gruppe die Zeilen mit Minimum und Maximum der
+    Spalten extremes sowie die Zeilen keep (Index-Labels, z. B. markierte Best Points), sodass Wertebereiche,
+    Ausreißer und Markierungen unverändert sichtbar sind. Die Reihenfolge der Zeilen bleibt erhalten.
+
+    Das Ergebnis ist deterministisch und wird pro Datenversion zwischengespeichert.
+    """
+    if max_points <= 0 or len(df) <= max_points:
+        return df
+    keep = [] if keep is None else list(keep)
+
+    def build():
+        n = len(df)
+        codes = pd.factorize(df[group])[0] + 1 if group is not None else np.zeros(n, dtype=int)
+        selected = np.zeros(n, dtype=bool)
+
+        positions = df.index.get_indexer(keep)
+        selected[positions[positions >= 0]] = True
+        for column in extremes:
+            values = pd.Series(df[column].to_numpy(), index=np.arange(n)).dropna()
+            extreme = values.groupby(codes[values.index.to_numpy()]).agg(["idxmin", "idxmax"])
+            selected[extreme.to_numpy(dtype=int).ravel()] = True
+
+        # Restliches Budget proportional auf die Gruppen verteilen und je Gruppe zufällig auffüllen
+        rest = np.flatnonzero(~selected)
+        budget = max(max_points - int(selected.sum()), 0)
+        counts = np.bincount(codes[rest], minlength=codes.max() + 1)
+        quotas = np.floor(counts * budget / max(len(rest), 1)).astype(int)
+
+        order = rest[np.lexsort((np.random.default_rng(0).random(len(rest)), codes[rest]))]
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        ranks = np.arange(len(order)) - starts[codes[order]]
+        selected[order[ranks < quotas[codes[order]]]] = True
+        return np.flatnonzero(selected)
+
+    key = f"decimate-{max_points}-{group}-{list(extremes)}-{keep}"
+    return df.iloc[cached_per_version(df, key, build)]
+
+
+def create_scatter(df, x, y, density_threshold=None, keep=None, **kwargs):
+    """
+    Wie px.scatter(df, x=x, y=y, **kwargs), passt die Darstellung aber an die Anzahl der Zeilen an:
+
+    - ab WEBGL_THRESHOLD Zeilen werden die Punkte mit WebGL gezeichnet und auf DECIMATION_MAX_POINTS
+      ausgedünnt (siehe decimate(); Extremwerte je Farbgruppe und die Zeilen keep bleiben erhalten),
+    - ab density_threshold Zeilen (Standard: DENSITY_THRESHOLD) wird in den Dichte-Modus geschaltet: Die
+      Punkte werden serverseitig auf ein festes Raster aggregiert, sodass die Größe der Antwort durch die
+      Anzahl der Bins statt der Zeilen begrenzt ist. Farbe, Größe und Hover-Daten der Punkte entfallen dann.
+
+    Trendlinien (add_trendlines) werden in allen Fällen aus allen Zeilen berechnet.
+    """
+    threshold = DENSITY_THRESHOLD if density_threshold is None else density_threshold
+    if len(df) > threshold:
+        return create_density_figure(df, x, y, kwargs.get("title"), kwargs.get("labels"))
+    if len(df) < WEBGL_THRESHOLD:
+        return px.scatter(df, x=x, y=y, **kwargs)
+
+    extremes = [column for column in (x, y, kwargs.get("size")) if column is not None]
+    points = decimate(df, DECIMATION_MAX_POINTS, kwargs.get("color"), extremes, keep)
+    return px.scatter(points, x=x, y=y, render_mode="webgl", **kwargs)
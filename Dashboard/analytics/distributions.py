@@ -0,0 +1,158 @@
+import os
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+from analytics.cache import cached_per_version
+from analytics.quantile_sketch import KLLSketch
+
+# Höchstzahl der Balken eines Histogramms (die Größe der Antwort hängt nur hiervon ab)
+MAX_HISTOGRAM_BINS = 100
+
+# Höchstzahl der Ausreißer je Box, die als Punkte an den Browser gesendet werden (die extremsten)
+MAX_OUTLIERS = 100
+
+# Ab dieser Anzahl an Zeilen werden die Quartile aus Quantil-Sketches (KLL) statt exakt berechnet
+SKETCH_THRESHOLD = int(os.environ.get("DASHBOARD_SKETCH_THRESHOLD", 1000000))
+
+# Anzahl der Zeilen, die pro Block in die Sketches übernommen werden
+SKETCH_CHUNK_SIZE = 100000
+
+
+def compute_histogram(df, column, max_bins=MAX_HISTOGRAM_BINS):
+    """
+    Berechnet die Bins eines Histogramms über column auf dem Server (np.histogram, Bin-Breite nach
+    numpy "auto", höchstens max_bins Bins). Liefert (Bin-Grenzen, Anzahl je Bin), pro Datenversion
+    zwischengespeichert.
+    """
+    def build():
+        values = df[column].dropna().to_numpy(dtype=float)
+        edges = np.histogram_bin_edges(values, bins="auto")
+        if len(edges) - 1 > max_bins:
+            edges = np.histogram_bin_edges(values, bins=max_bins)
+        return np.histogram(values, bins=edges)[::-1]
+
+    return cached_per_version(df, f"histogram-{column}-{max_bins}", build)
+
+
+def create_histogram(df, x, title=None, labels=None):
+    """
+    Erzeugt ein Histogramm wie px.histogram(df, x=x), sendet aber nur die vorab berechneten Bins
+    (compute_histogram) statt aller Werte an den Browser.
+    """
+    labels = labels or {}
+    x_label = labels.get(x, x)
+    edges, counts = compute_histogram(df, x)
+
+    fig = go.Figure(go.Bar(
+        x=(edges[:-1] + edges[1:]) / 2,
+        y=counts,
+        width=np.diff(edges),
+        customdata=np.column_stack([edges[:-1], edges[1:]]),
+        hovertemplate=f"{x_label}: %{{customdata[0]:.4g}} - %{{customdata[1]:.4g}}<br>count: %{{y}}<extra></extra>",
+    ))
+    fig.update_layout(title=title, xaxis_title=x_label, yaxis_title="count", bargap=0)
+    return fig
+
+
+def compute_quartiles(values):
+    """Quartile (Q1, Median, Q3) eines Arrays: exakt bzw. ab SKETCH_THRESHOLD Werten blockweise per KLL-Sketch."""
+    if len(values) < SKETCH_THRESHOLD:
+        return np.quantile(values, [0.25, 0.5, 0.75])
+    sketch = KLLSketch()
+    for start in range(0, len(values), SKETCH_CHUNK_SIZE):
+        sketch.update(values[start:start + SKETCH_CHUNK_SIZE])
+    return sketch.quantiles([0.25, 0.5, 0.75])
+
+
+def compute_box_statistics(df, value, group, hover_column=None):
+    """
+    Berechnet die Kennzahlen eines Boxplots von value je Wert von group auf dem Server, wie sie
+    px.box darstellt: Quartile, Whisker (äußerste Werte innerhalb von 1,5 x IQR) und Ausreißer.
+    Von den Ausreißern werden je Gruppe nur die MAX_OUTLIERS extremsten behalten.
+
+    Liefert (statistics, outliers): statistics ist ein DataFrame mit einer Zeile je Gruppe (Spalten
+    q1, median, q3, lowerfence, upperfence, count), outliers die ausgewählten Zeilen von df
+    (value, group und hover_column). Pro Datenversion zwischengespeichert.
+    """
+    def build():
+        columns = [group, value] + ([hover_column] if hover_column else [])
+        data = df[columns].dropna(subset=[group, value])
+        rows = []
+        outliers = []
+        all_values = data[value].to_numpy(dtype=float)
+        for name, positions in data.groupby(group, sort=False).indices.items():
+            array = all_values[positions]
+            q1, median, q3 = compute_quartiles(array)
+            low, high = q1 - 1.5 * (q3 - q1), q3 + 1.5 * (q3 - q1)
+            inside = array[(array >= low) & (array <= high)]
+            rows.append({group: name, "q1": q1, "median": median, "q3": q3, "count": len(array),
+                         "lowerfence": inside.min() if len(inside) else q1,
+                         "upperfence": inside.max() if len(inside) else q3})
+
+            distance = np.abs(array - median)
+            outside = np.flatnonzero((array < low) | (array > high))
+            extreme = outside[np.argsort(-distance[outside], kind="stable")[:MAX_OUTLIERS]]
+            outliers.append(data.iloc[positions[np.sort(extreme)]])
+
+        statistics = pd.DataFrame(rows, columns=[group, "q1", "median", "q3", "lowerfence", "upperfence", "count"])
+        outliers = pd.concat(outliers) if outliers else pd.DataFrame(columns=columns)
+        return statistics.set_index(group), outliers
+
+    return cached_per_version(df, f"box-{value}-{group}-{hover_column}", build)
+
+
+def create_box(df, x, y, title=None, labels=None, hover_column=None, category_order=None):
+    """
+    Erzeugt einen Boxplot von y je Wert von x (mit einer Farbe je Box) wie px.box(df, x=x, y=y, color=x),
+    sendet aber nur die vorab berechneten Kennzahlen (compute_box_statistics) und höchstens MAX_OUTLIERS
+    Ausreißer je Box an den Browser. Die Boxen werden in der Reihenfolge category_order angezeigt.
+    """
+    labels = labels or {}
+    x_label, y_label = labels.get(x, x), labels.get(y, y)
+    statistics, outliers = compute_box_statistics(df, y, x, hover_column)
+    order = [name for name in (statistics.index if category_order is None else category_order)
+             if name in statistics.index]
+    palette = px.colors.qualitative.Plotly
+
+    fig = go.Figure()
+    for k, name in enumerate(order):
+        row = statistics.loc[name]
+        color = palette[k % len(palette)]
+        fig.add_trace(go.Box(
+            x=[name],
+            q1=[row["q1"]],
+            median=[row["median"]],
+            q3=[row["q3"]],
+            lowerfence=[row["lowerfence"]],
+            upperfence=[row["upperfence"]],
+            name=str(name),
+            legendgroup=str(name),
+            marker_color=color,
+            boxpoints=False,
+        ))
+
+        points = outliers[outliers[x] == name]
+        if points.empty:
+            continue
+        hover = f"{x_label}: {name}<br>{y_label}: %{{y}}"
+        if hover_column:
+            hover += f"<br>{labels.get(hover_column, hover_column)}: %{{customdata}}"
+        fig.add_trace(go.Scatter(
+            x=[name] * len(points),
+            y=points[y].to_numpy(),
+            customdata=points[hover_column].to_numpy() if hover_column else None,
+            mode="markers",
+            name=str(name),
+            legendgroup=str(name),
+            showlegend=False,
+            marker={"color": color, "size": 4},
+            hovertemplate=hover + "<extra></extra>",
+        ))
+
+    fig.update_layout(title=title, xaxis_title=x_label, yaxis_title=y_label, legend_title_text=x_label,
+                      boxmode="overlay")
+    fig.update_xaxes(categoryorder="array", categoryarray=order)
+    return fig
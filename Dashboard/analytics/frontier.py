@@ -0,0 +1,55 @@
+import numpy as np
+
+from analytics.cache import cached_per_version
+
+
+def select_best_points(df, group, score_columns):
+    """
+    Liefert je Wert von group die Zeile mit dem höchsten Score (Produkt der Spalten score_columns) in einem
+    gruppierten Durchlauf (groupby + idxmax), ohne den DataFrame zu kopieren. Pro Datenversion zwischengespeichert.
+    """
+    def build():
+        score = df[score_columns].prod(axis=1, skipna=False).dropna()
+        return score.groupby(df.loc[score.index, group], sort=False).idxmax()
+
+    index = cached_per_version(df, f"best-points-{group}-{list(score_columns)}", build)
+    return df.loc[index]
+
+
+def pareto_frontier(df, x, y, group):
+    """
+    Bestimmt je Wert von group die Pareto-Front (Skyline) der Zeilen bezüglich x und y: alle Zeilen, die von
+    keiner anderen Zeile derselben Gruppe in beiden Werten erreicht und in einem übertroffen werden.
+
+    Ein Sortierlauf über alle Gruppen (nach Gruppe und x absteigend) und ein laufendes Maximum von y
+    genügen, also O(n log n). Liefert die Zeilen der Front, je Gruppe nach x aufsteigend sortiert.
+    Pro Datenversion zwischengespeichert.
+    """
+    def skyline(codes, xs, ys, order):
+        """Zeilen (in order), deren y das laufende Maximum der Gruppe übertrifft."""
+        sorted_codes, sorted_y = codes[order], ys[order]
+        starts = np.r_[True, sorted_codes[1:] != sorted_codes[:-1]]
+        # Laufendes Maximum von y je Gruppe (der Gruppen-Offset setzt das globale Maximum je Gruppe zurück)
+        offset = np.cumsum(starts) * (np.ptp(sorted_y) + 1)
+        running = np.maximum.accumulate(sorted_y + offset) - offset
+        return order[starts | (sorted_y > np.r_[-np.inf, running[:-1]])]
+
+    def build():
+        codes = df[group].factorize()[0]
+        xs, ys = df[x].to_numpy(dtype=float), df[y].to_numpy(dtype=float)
+        rows = np.flatnonzero((codes >= 0) & ~np.isnan(xs) & ~np.isnan(ys))
+        if not len(rows):
+            return df.index[rows]
+        codes, xs, ys = codes[rows], xs[rows], ys[rows]
+
+        # Vorauswahl mit einem einzigen Sortierschlüssel (Gruppe, x absteigend): enthält die Front sowie
+        # höchstens einige Zeilen mit gleichem x, die im zweiten, exakten Durchlauf entfernt werden
+        key = codes * (np.ptp(xs) + 1) + (xs.max() - xs)
+        candidates = skyline(codes, xs, ys, np.argsort(key))
+        front = skyline(codes, xs, ys, candidates[np.lexsort((-ys[candidates], -xs[candidates], codes[candidates]))])
+
+        front = front[::-1]  # Je Gruppe nach x aufsteigend
+        return df.index[rows[front[np.argsort(codes[front], kind="stable")]]]
+
+    index = cached_per_version(df, f"pareto-{x}-{y}-{group}", build)
+    return df.loc[index]
@@ -0,0 +1,113 @@
+import hashlib
+import json
+import os
+import threading
+
+import joblib
+import numpy as np
+
+from analytics.cache import get_data_version
+
+# Ablage der trainierten Modelle und Importances (ein Eintrag pro Datenversion, siehe .gitignore)
+CACHE_DIR = os.environ.get("DASHBOARD_CACHE_DIR",
+                           os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "cache"))
+
+# Parameter des Gradient-Boosting-Modells und der Permutation Importance
+MODEL_PARAMS = {"max_iter": 200, "learning_rate": 0.1, "max_leaf_nodes": 31, "random_state": 0}
+N_REPEATS = 10
+TEST_SIZE = 0.25
+
+# Verhindert, dass mehrere Threads dasselbe Modell gleichzeitig trainieren
+_lock = threading.Lock()
+
+
+def cache_path(df, models, segment):
+    """Dateipfad des Cache-Eintrags für Datenversion, Modelle, Segment und Parameter (None ohne Datenversion)."""
+    version = get_data_version(df)
+    if version is None:
+        return None
+    key = json.dumps([version, models, MODEL_PARAMS, N_REPEATS, TEST_SIZE], sort_keys=True, default=str)
+    return os.path.join(CACHE_DIR, f"{cache_prefix(segment)}{hashlib.sha256(key.encode()).hexdigest()[:16]}.joblib")
+
+
+def cache_prefix(segment):
+    """Gemeinsamer Anfang der Dateinamen aller Cache-Einträge eines Segments."""
+    return f"permutation-importance-{hashlib.sha256(str(segment).encode()).hexdigest()[:8]}-"
+
+
+def fit_permutation_importances(df, models, n_jobs=-1):
+    """
+    Trainiert für jedes Modell {Name: {"target": ..., "features": [...]}} einen HistGradientBoostingRegressor
+    und berechnet die Permutation Importance der Features auf einem zurückgehaltenen Testdatensatz.
+    Das Training nutzt alle Kerne (OpenMP), die Permutationsrunden werden mit n_jobs parallelisiert.
+
+    Liefert {Name: {"features", "importances_mean", "importances_std", "r2", "model"}}.
+    """
+    # scikit-learn wird erst hier importiert, damit der Start des Dashboards nicht verzögert wird
+    from sklearn.ensemble import HistGradientBoostingRegressor
+    from sklearn.inspection import permutation_importance
+    from sklearn.model_selection import train_test_split
+
+    results = {}
+    for name, model in models.items():
+        data = df[model["features"] + [model["target"]]].dropna()
+        x_train, x_test, y_train, y_test = train_test_split(
+            data[model["features"]], data[model["target"]], test_size=TEST_SIZE, random_state=0)
+
+        estimator = HistGradientBoostingRegressor(**MODEL_PARAMS).fit(x_train, y_train)
+        importance = permutation_importance(estimator, x_test, y_test, n_repeats=N_REPEATS,
+                                            random_state=0, n_jobs=n_jobs)
+        results[name] = {
+            "features": list(model["features"]),
+            "importances_mean": importance.importances_mean,
+            "importances_std": importance.importances_std,
+            "r2": estimator.score(x_test, y_test),
+            "model": estimator,
+        }
+    return results
+
+
+def load_or_fit_permutation_importances(df, models, segment=None):
+    """
+    Liefert die Ergebnisse von fit_permutation_importances() aus dem Cache auf der Festplatte oder trainiert
+    die Modelle und legt sie dort ab. Pro Segment wird nur der Eintrag der aktuellen Datenversion behalten.
+    Der Cache wird von allen Workern geteilt und überlebt Neustarts des Dashboards.
+    """
+    path = cache_path(df, models, segment)
+    if path is None:
+        return fit_permutation_importances(df, models)
+
+    with _lock:
+        if os.path.exists(path):
+            try:
+                return joblib.load(path)
+            except Exception as e:  # z. B. unvollständige Datei oder andere scikit-learn-Version
+                print(f" Cache-Eintrag '{path}' konnte nicht gelesen werden: {e}")
+
+        results = fit_permutation_importances(df, models)
+
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        joblib.dump(results, temporary_path)
+        os.replace(temporary_path, path)  # Atomar: andere Worker sehen nie eine halb geschriebene Datei
+
+        # Veraltete Einträge (frühere Datenversionen) des Segments entfernen
+        for file_name in os.listdir(CACHE_DIR):
+            stale = os.path.join(CACHE_DIR, file_name)
+            if file_name.startswith(cache_prefix(segment)) and file_name.endswith(".joblib") and stale != path:
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
+        return results
+
+
+def permutation_percentages(result):
+    """
+    Normalisiert die mittleren Permutation Importances (negative Werte zählen als 0) auf eine Summe von 100%
+    und skaliert die Standardabweichungen über die Permutationsrunden entsprechend.
+    """
+    importances = np.clip(result["importances_mean"], 0, None)
+    total = importances.sum()
+    scale = 100 / total if total > 0 else 0.0
+    return importances * scale, result["importances_std"] * scale
@@ -0,0 +1,63 @@
+import numpy as np
+
+from analytics.cache import cached_per_version
+from analytics.segmentation import get_feature_columns
+
+# Standardgröße der Peer Group (Anzahl der ähnlichsten Stores)
+DEFAULT_PEERS = 10
+
+
+def get_peer_index(df):
+    """
+    Baut einen KD-Baum (scipy.spatial.cKDTree) über die standardisierten numerischen Merkmale aller Stores auf.
+    Der Baum wird nur einmal pro Datenversion erstellt; jede Abfrage kostet danach O(log n).
+
+    Liefert {"features", "tree", "rows" (Positionen der Zeilen in df, die im Baum enthalten sind),
+    "points" (standardisierte Merkmale dieser Zeilen), "positions" (StoreID -> Index in rows)}.
+    Zeilen mit fehlenden Werten werden nicht aufgenommen.
+    """
+    def build():
+        # scipy wird erst hier importiert, damit der Start des Dashboards nicht verzögert wird
+        from scipy.spatial import cKDTree
+
+        features = get_feature_columns(df)
+        values = df[features].to_numpy(dtype=float)
+        rows = np.flatnonzero(~np.isnan(values).any(axis=1))
+        values = values[rows]
+
+        stds = values.std(axis=0)
+        stds[~(stds > 0)] = 1.0
+        points = (values - values.mean(axis=0)) / stds
+
+        store_ids = df["StoreID"].to_numpy()[rows]
+        return {
+            "features": features,
+            "tree": cKDTree(points),
+            "rows": rows,
+            "points": points,
+            "positions": dict(zip(store_ids.tolist(), range(len(rows)))),
+        }
+
+    return cached_per_version(df, "peer-index", build)
+
+
+def find_peers(df, store_id, k=DEFAULT_PEERS):
+    """
+    Liefert die k Stores, die store_id in den standardisierten Merkmalen am ähnlichsten sind (euklidischer
+    Abstand, ohne den Store selbst), als Zeilen von df mit zusätzlicher Spalte "Distance", aufsteigend sortiert.
+    Ist der Store nicht im Index enthalten (unbekannt oder mit fehlenden Werten), wird None zurückgegeben.
+    """
+    index = get_peer_index(df)
+    position = index["positions"].get(store_id)
+    if position is None:
+        return None
+
+    k = min(k, len(index["rows"]) - 1)
+    if k <= 0:
+        return df.iloc[[]].assign(Distance=[])
+    distances, neighbours = index["tree"].query(index["points"][position], k=k + 1)
+    distances, neighbours = np.atleast_1d(distances), np.atleast_1d(neighbours)
+
+    keep = neighbours != position  # Der Store selbst (Abstand 0) gehört nicht zu seinen Peers
+    distances, neighbours = distances[keep][:k], neighbours[keep][:k]
+    return df.iloc[index["rows"][neighbours]].assign(Distance=distances)
@@ -0,0 +1,81 @@
+import numpy as np
+
+
+class KLLSketch:
+    """
+    Quantil-Sketch nach Karnin, Lang und Liberty (KLL): fasst beliebig viele Werte in wenigen tausend
+    gewichteten Stichprobenwerten zusammen (Rangfehler etwa 1/k). Sketches lassen sich mit update()
+    blockweise fortschreiben und mit merge() zusammenführen, z. B. über Datenblöcke oder Prozesse hinweg.
+
+    Ebene i enthält Werte mit Gewicht 2^i. Läuft eine Ebene über, wird sie sortiert und jeder zweite Wert
+    (zufälliger Versatz) mit doppeltem Gewicht in die nächste Ebene übernommen.
+    """
+
+    def __init__(self, k=400, seed=0):
+        self.k = k
+        self.levels = [np.empty(0)]
+        self.count = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self._rng = np.random.default_rng(seed)
+
+    def capacity(self, level):
+        """Kapazität einer Ebene: k für die oberste Ebene, nach unten um den Faktor 2/3 kleiner (mindestens 2)."""
+        depth = len(self.levels) - level - 1
+        return max(int(np.ceil(self.k * (2 / 3) ** depth)), 2)
+
+    def update(self, values):
+        """Fügt ein Array von Werten hinzu (fehlende Werte werden ignoriert)."""
+        values = np.asarray(values, dtype=float).ravel()
+        values = values[~np.isnan(values)]
+        if len(values):
+            self.count += len(values)
+            self.min = min(self.min, values.min())
+            self.max = max(self.max, values.max())
+            self.levels[0] = np.concatenate([self.levels[0], values])
+            self._compress()
+        return self
+
+    def merge(self, other):
+        """Übernimmt alle Werte eines anderen Sketches."""
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def _compress(self):
+        """Verdichtet übergelaufene Ebenen von unten nach oben, bis alle Ebenen ihre Kapazität einhalten."""
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) <= self.capacity(level):
+                level += 1
+                continue
+            if level + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            items = np.sort(items)
+            even = len(items) - len(items) % 2  # Bei ungerader Anzahl bleibt der größte Wert auf der Ebene
+            promoted = items[self._rng.integers(2):even:2]
+            self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            self.levels[level] = items[even:]
+            level = 0  # Neue Ebenen verkleinern die Kapazität der unteren Ebenen
+
+    def quantiles(self, qs):
+        """Schätzt die Quantile qs (zwischen 0 und 1); 0 und 1 liefern exakt Minimum und Maximum."""
+        qs = np.asarray(qs, dtype=float)
+        if self.count == 0:
+            return np.full(qs.shape, np.nan)
+
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2.0 ** level) for level, items in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        items, cumulative = items[order], np.cumsum(weights[order])
+
+        positions = np.searchsorted(cumulative, qs * cumulative[-1], side="left")
+        result = items[np.minimum(positions, len(items) - 1)]
+        return np.where(qs <= 0, self.min, np.where(qs >= 1, self.max, result))
@@ -0,0 +1,170 @@
+import numpy as np
+import pandas as pd
+
+
+def compute_moments(values, shift=None):
+    """
+    Berechnet die Kreuzprodukt-Matrix M = Z'Z mit Z = [1, X - shift] für die Zeilen von values (n x q).
+    M[0, 0] ist die Anzahl der Zeilen, M[0, 1:] die Spaltensummen und M[1:, 1:] die Kreuzprodukte.
+    Mit shift (z. B. den Spaltenmittelwerten) werden Auslöschungseffekte bei großen Werten vermieden.
+    """
+    values = np.asarray(values, dtype=float)
+    if shift is not None:
+        values = values - shift
+    z = np.column_stack([np.ones(len(values)), values])
+    return z.T @ z
+
+
+def compute_grouped_moments(values, groups, n_groups, shift=None):
+    """
+    Berechnet die Kreuzprodukt-Matrix aus compute_moments() für jede Gruppe in einem Durchlauf
+    (n_groups x (q + 1) x (q + 1)). groups enthält je Zeile die Gruppennummer 0..n_groups-1.
+    Pro Spaltenpaar wird ein np.bincount ausgeführt, ohne die äußeren Produkte aller Zeilen anzulegen.
+    """
+    values = np.asarray(values, dtype=float)
+    if shift is not None:
+        values = values - shift
+    z = np.column_stack([np.ones(len(values)), values])
+    size = z.shape[1]
+
+    moments = np.empty((n_groups, size, size))
+    for i in range(size):
+        for j in range(i, size):
+            moments[:, i, j] = np.bincount(groups, weights=z[:, i] * z[:, j], minlength=n_groups)
+            moments[:, j, i] = moments[:, i, j]
+    return moments
+
+
+class RegressionEngine:
+    """
+    Lineare Regressionen (OLS mit Achsenabschnitt) auf standardisierten Features, berechnet aus einer
+    gemeinsamen Kreuzprodukt-Matrix. Die Matrix wird einmal pro Datenversion aufgebaut; danach kostet
+    jedes Modell nur noch das Lösen eines kleinen Gleichungssystems (Features x Features), unabhängig
+    von der Anzahl der Zeilen.
+
+    Die Koeffizienten entsprechen StandardScaler + LinearRegression aus scikit-learn
+    (Standardisierung mit der Populations-Standardabweichung).
+    """
+
+    def __init__(self, moments, columns, shift=None):
+        """
+        :param moments: Kreuzprodukt-Matrix aus compute_moments(), optional mit führenden Batch-Dimensionen
+                        (z. B. eine Matrix pro Segment oder pro Bootstrap-Stichprobe).
+        :param columns: Spaltennamen in der Reihenfolge der Matrix (ohne die Eins-Spalte).
+        :param shift: Verschiebung, mit der die Matrix berechnet wurde.
+        """
+        moments = np.asarray(moments, dtype=float)
+        self.columns = list(columns)
+        self.index = {column: i for i, column in enumerate(self.columns)}
+        self.n = moments[..., 0, 0]
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            shifted_means = moments[..., 0, 1:] / self.n[..., None]
+            # Summe der Abweichungsprodukte (n * Kovarianz) - unabhängig von der Verschiebung
+            self.scatter = moments[..., 1:, 1:] - self.n[..., None, None] * (
+                shifted_means[..., :, None] * shifted_means[..., None, :])
+        self.means = shifted_means + (0.0 if shift is None else np.asarray(shift, dtype=float))
+
+    @classmethod
+    def from_dataframe(cls, df, columns):
+        """Baut die Engine aus allen Zeilen von df auf, in denen keine der Spalten fehlt."""
+        values = df[list(columns)].dropna().to_numpy(dtype=float)
+        shift = values.mean(axis=0) if len(values) else None
+        return cls(compute_moments(values, shift), columns, shift)
+
+    @classmethod
+    def from_groups(cls, df, columns, group_columns):
+        """
+        Baut eine Engine mit einer Kreuzprodukt-Matrix pro Gruppe (z. B. pro Standort x Kategorie) in einem
+        gruppierten Durchlauf über die Daten auf. fit() schätzt danach alle Gruppen gleichzeitig.
+
+        Liefert (engine, groups): groups enthält die Werte der group_columns je Gruppe (sortiert, in der
+        Reihenfolge der Batch-Dimension der Engine).
+        """
+        data = df[list(group_columns) + list(columns)].dropna()
+        grouped = data.groupby(list(group_columns), sort=True)
+        codes = grouped.ngroup().to_numpy()
+        groups = grouped.size().index.to_frame(index=False)
+        values = data[list(columns)].to_numpy(dtype=float)
+        shift = values.mean(axis=0) if len(values) else None
+        moments = compute_grouped_moments(values, codes, len(groups), shift)
+        return cls(moments, columns, shift), groups
+
+    @classmethod
+    def from_moments_table(cls, table):
+        """
+        Baut die Engine aus der persistierten Kreuzprodukt-Matrix (Tabelle StoreDataMoments, siehe
+        scripts/store_statistics.py) auf, ohne die Rohdaten zu lesen. Die Tabelle enthält nur die obere
+        Dreiecksmatrix; Position 0 ist die Eins-Spalte.
+        """
+        size = int(table["ColumnPosition"].max()) + 1
+        rows = table["RowPosition"].to_numpy(dtype=int)
+        cols = table["ColumnPosition"].to_numpy(dtype=int)
+        moments = np.zeros((size, size))
+        moments[rows, cols] = table["Value"].to_numpy(dtype=float)
+        moments[cols, rows] = moments[rows, cols]
+
+        header = table[table["RowPosition"] == 0].sort_values("ColumnPosition")
+        return cls(moments, header["ColumnName"].iloc[1:], header["ColumnShift"].to_numpy(dtype=float)[1:])
+
+    def correlation(self, columns=None):
+        """Pearson-Korrelationsmatrix der Spalten (wie DataFrame.corr()) als DataFrame (nur ohne Batch-Dimension)."""
+        columns = self.columns if columns is None else list(columns)
+        idx = [self.index[column] for column in columns]
+        scatter = self.scatter[np.ix_(idx, idx)]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            std = np.sqrt(np.diag(scatter))
+            corr = scatter / np.outer(std, std)
+        np.fill_diagonal(corr, np.where(std > 0, 1.0, np.nan))
+        return pd.DataFrame(corr, index=columns, columns=columns)
+
+    def fit(self, target, features):
+        """
+        Schätzt das Modell target ~ features und liefert ein Dictionary mit
+        features, coefficients (standardisiert), std_errors (standardisiert), intercept, r2 und n.
+        """
+        f = [self.index[feature] for feature in features]
+        t = self.index[target]
+
+        sxx = self.scatter[..., f, :][..., :, f]
+        sxy = self.scatter[..., f, t]
+        syy = self.scatter[..., t, t]
+
+        # Normalgleichungen auf zentrierten Daten: beta = Sxx^-1 * Sxy
+        sxx_inv = np.linalg.pinv(sxx)
+        beta = np.einsum("...ij,...j->...i", sxx_inv, sxy)
+
+        sse = np.maximum(syy - np.einsum("...i,...i->...", beta, sxy), 0.0)
+        dof = self.n - len(f) - 1
+        with np.errstate(invalid="ignore", divide="ignore"):
+            r2 = 1.0 - sse / syy
+            sigma2 = sse / dof
+            std = np.sqrt(np.diagonal(sxx, axis1=-2, axis2=-1) / self.n[..., None])  # wie StandardScaler
+            std_errors = np.sqrt(sigma2[..., None] * np.diagonal(sxx_inv, axis1=-2, axis2=-1))
+
+        return {
+            "features": list(features),
+            "target": target,
+            "coefficients": beta * std,
+            "std_errors": std_errors * std,
+            "intercept": self.means[..., t],  # Achsenabschnitt bei standardisierten Features
+            "r2": r2,
+            "n": self.n,
+        }
+
+    def fit_many(self, models):
+        """Schätzt mehrere Modelle {name: {"target": ..., "features": [...]}} aus derselben Kreuzprodukt-Matrix."""
+        return {name: self.fit(model["target"], model["features"]) for name, model in models.items()}
+
+
+def select_group(result, index):
+    """Wählt aus dem Ergebnis einer gruppierten Schätzung (fit() mit Batch-Dimension) die Gruppe index aus."""
+    return {key: value[index] if isinstance(value, np.ndarray) else value for key, value in result.items()}
+
+
+def influence_percentages(coefficients):
+    """Normalisiert die absoluten Koeffizienten, sodass ihre Summe 100% ergibt (letzte Achse)."""
+    importances = np.abs(coefficients)
+    total = importances.sum(axis=-1, keepdims=True)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(total > 0, 100 * importances / total, importances)
@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+
+# Rollup-Tabellen (siehe scripts/store_rollups.py)
+LOCATION_CATEGORY = "StoreRollupLocationCategory"
+PROMOTIONS = "StoreRollupPromotions"
+
+
+def aggregate_rollup(rollup, by, columns=(), statistic="mean"):
+    """
+    Fasst eine Rollup-Tabelle nach den Schlüsselspalten by zusammen (z. B. StoreLocation x StoreCategory zu
+    StoreLocation) und berechnet je Gruppe statistic ("mean", "sum" oder "std", wie bei pandas mit ddof=1)
+    für die Spalten columns sowie die Anzahl der Stores (StoreCount). Gruppen mit fehlenden Schlüsselwerten werden
+    wie bei df.groupby(by) nicht ausgegeben. Der Aufwand hängt nur von der Anzahl der Gruppen ab.
+
+    Liefert einen DataFrame mit den Spalten by, StoreCount und columns, nach by sortiert.
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    sources = ["StoreCount"] + [f"{column}{suffix}" for column in columns for suffix in ("Count", "Sum", "SumSquares")]
+    totals = rollup.groupby(by)[sources].sum()
+
+    result = pd.DataFrame({"StoreCount": totals["StoreCount"]}, index=totals.index)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        for column in columns:
+            count, total = totals[f"{column}Count"], totals[f"{column}Sum"]
+            if statistic == "sum":
+                result[column] = total
+            elif statistic == "mean":
+                result[column] = (total / count).where(count > 0)
+            elif statistic == "std":
+                squares = totals[f"{column}SumSquares"] - total ** 2 / count
+                result[column] = np.sqrt((squares / (count - 1)).clip(lower=0)).where(count > 1)
+            else:
+                raise ValueError(f"Unbekannte Kennzahl: {statistic}")
+    return result.reset_index()
+
+
+def compute_rollup(df, keys):
+    """
+    Berechnet eine Rollup-Tabelle mit den Schlüsselspalten keys aus dem Snapshot df, mit denselben Spalten wie
+    die Tabellen aus scripts/store_rollups.py (StoreCount sowie <Spalte>Count, <Spalte>Sum und <Spalte>SumSquares
+    je numerischer Spalte außer StoreID). Ersatz, solange die Rollup-Tabellen in der Datenbank fehlen.
+    """
+    keys = list(keys)
+    measures = [column for column in df.select_dtypes("number").columns if column != "StoreID"]
+    values = df[measures].astype(float)
+    data = pd.concat([df[keys], values.notna().add_suffix("Count"), values.fillna(0).add_suffix("Sum"),
+                      (values ** 2).fillna(0).add_suffix("SumSquares")], axis=1)
+    grouped = data.groupby(keys, dropna=False, sort=True)
+    rollup = grouped.sum()
+    rollup.insert(0, "StoreCount", grouped.size())
+    columns = ["StoreCount"] + [f"{column}{statistic}" for column in measures
+                                for statistic in ("Count", "Sum", "SumSquares")]
+    return rollup[columns].reset_index()
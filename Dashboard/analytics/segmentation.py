@@ -0,0 +1,119 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from analytics.cache import get_data_version
+
+# Spalten, die trotz numerischem Typ nicht in die Segmentierung einfließen
+EXCLUDED_COLUMNS = ["StoreID"]
+
+# Parameter des Mini-Batch-k-Means
+N_SEGMENTS = 4
+BATCH_SIZE = 4096
+RANDOM_STATE = 0
+
+# Höchstzahl der Zeilen, auf denen die Segmente trainiert werden (begrenzt den Speicherbedarf);
+# zugeordnet werden anschließend alle Zeilen blockweise
+FIT_SAMPLE_SIZE = 200000
+CHUNK_SIZE = 100000
+
+# Ergebnis der aktuellsten Datenversion: (Datenversion, Ergebnis oder Exception)
+_result = None
+_running = set()
+_lock = threading.Lock()
+
+
+def get_feature_columns(df):
+    """Numerische Spalten von df, nach denen segmentiert wird."""
+    return [column for column in df.select_dtypes("number").columns if column not in EXCLUDED_COLUMNS]
+
+
+def compute_segmentation(df):
+    """
+    Gruppiert die Stores mit Mini-Batch-k-Means (scikit-learn) nach ihren standardisierten numerischen Merkmalen.
+    Trainiert wird auf einer Stichprobe von höchstens FIT_SAMPLE_SIZE Zeilen, zugeordnet werden danach alle
+    Zeilen in Blöcken von CHUNK_SIZE, sodass der Speicherbedarf auch bei Millionen Stores begrenzt bleibt.
+    Die Segmente werden nach dem mittleren Umsatz absteigend nummeriert (Segment 1 = höchster Umsatz).
+
+    Liefert {"features", "labels" (Segmentnummer je Zeile von df, -1 bei fehlenden Werten), "names", "centers"
+    (Segmentmittelpunkte in den ursprünglichen Einheiten, ein DataFrame mit einer Zeile je Segment)}.
+    """
+    # scikit-learn wird erst hier importiert, damit der Start des Dashboards nicht verzögert wird
+    from sklearn.cluster import MiniBatchKMeans
+
+    features = get_feature_columns(df)
+    # Mittelwerte und Standardabweichungen spaltenweise, ohne die Merkmale als Ganzes zu kopieren
+    means = np.array([df[column].mean() for column in features])
+    stds = np.array([df[column].std(ddof=0) for column in features])
+    stds[~(stds > 0)] = 1.0
+    positions = [df.columns.get_loc(column) for column in features]
+
+    def standardized(rows):
+        """Standardisierte Merkmale der Zeilen rows und Maske der Zeilen ohne fehlende Werte."""
+        values = (df.iloc[rows, positions].to_numpy(dtype=float) - means) / stds
+        return values, ~np.isnan(values).any(axis=1)
+
+    rng = np.random.default_rng(RANDOM_STATE)
+    sample = np.sort(rng.choice(len(df), min(len(df), FIT_SAMPLE_SIZE), replace=False))
+    values, valid = standardized(sample)
+    n_segments = min(N_SEGMENTS, int(valid.sum()))
+    model = MiniBatchKMeans(n_clusters=n_segments, batch_size=BATCH_SIZE, n_init=3,
+                            random_state=RANDOM_STATE).fit(values[valid])
+
+    labels = np.full(len(df), -1)
+    for start in range(0, len(df), CHUNK_SIZE):
+        rows = np.arange(start, min(start + CHUNK_SIZE, len(df)))
+        values, valid = standardized(rows)
+        labels[rows[valid]] = model.predict(values[valid])
+
+    # Nummerierung nach mittlerem Umsatz, damit die Segmente über Datenversionen hinweg vergleichbar bleiben
+    centers = pd.DataFrame(model.cluster_centers_ * stds + means, columns=features)
+    order = np.argsort(-centers["MonthlySalesRevenue"].to_numpy()) if "MonthlySalesRevenue" in centers \
+        else np.arange(n_segments)
+    ranks = np.empty(n_segments, dtype=int)
+    ranks[order] = np.arange(n_segments)
+    labels[labels >= 0] = ranks[labels[labels >= 0]]
+
+    return {
+        "features": features,
+        "labels": labels,
+        "names": [f"Segment {i + 1}" for i in range(n_segments)],
+        "centers": centers.iloc[order].reset_index(drop=True),
+    }
+
+
+def get_segmentation(df):
+    """
+    Liefert die Segmentierung (siehe compute_segmentation) für die Datenversion von df. Ist sie noch nicht
+    berechnet, wird sie in einem Hintergrund-Thread gestartet und None zurückgegeben, sodass der Aufrufer
+    (z. B. ein Callback mit dcc.Interval) später erneut nachfragen kann. Pro Datenversion wird nur einmal
+    gerechnet; ist die Berechnung fehlgeschlagen, wird der Fehler erneut ausgelöst.
+    """
+    global _result
+    version = get_data_version(df)
+    if version is None:
+        return compute_segmentation(df)
+
+    with _lock:
+        if _result is not None and _result[0] == version:
+            if isinstance(_result[1], Exception):
+                raise _result[1]
+            return _result[1]
+        if version in _running:
+            return None
+        _running.add(version)
+
+    def run():
+        global _result
+        try:
+            value = compute_segmentation(df)
+        except Exception as e:
+            print(f" Fehler bei der Segmentierung der Stores: {e}")
+            value = e
+        with _lock:
+            _result = (version, value)
+            _running.discard(version)
+
+    threading.Thread(target=run, name="store-segmentation", daemon=True).start()
+    return None
@@ -0,0 +1,236 @@
+import numpy as np
+import plotly.express as px
+import plotly.graph_objects as go
+
+from analytics.cache import cached_per_version
+from analytics.regression_engine import RegressionEngine
+
+# Verfügbare Trendlinien:
+#   ols       - lineare Regression (kleinste Quadrate), aus den zwischengespeicherten Kreuzprodukten
+#   huber     - robuste lineare Regression (Huber-Verlust), auf einer Stichprobe
+#   theil-sen - robuste lineare Regression (Median der paarweisen Steigungen), auf einer Stichprobe
+#   lowess    - lokal gewichtete Regression (nichtlinear), auf vorab gebinnten Daten
+TRENDLINE_MODES = {"ols": "OLS", "huber": "Huber", "theil-sen": "Theil-Sen", "lowess": "LOWESS"}
+
+# Obergrenzen, die den Aufwand der Anpassung unabhängig von der Zeilenanzahl beschränken (je Farbgruppe)
+HUBER_MAX_POINTS = 5000      # Stichprobe; höchstens HUBER_MAX_ITER Iterationen mit O(Punkte)
+HUBER_MAX_ITER = 50
+THEIL_SEN_MAX_POINTS = 2000  # Stichprobe; O(Punkte²) paarweise Steigungen
+LOWESS_BINS = 100            # Bins entlang der x-Achse; O(Bins²) je Iteration
+LOWESS_FRAC = 2 / 3          # Anteil der Daten je lokaler Regression (wie statsmodels)
+LOWESS_ITERATIONS = 3        # Robustheits-Iterationen (wie statsmodels)
+
+
+def get_grouped_statistics(df, x, y, color=None):
+    """
+    Kreuzprodukt-Matrizen von x und y je Farbgruppe (bzw. für alle Zeilen ohne color) sowie Minimum und Maximum
+    von x je Gruppe. Berücksichtigt werden wie bei px.scatter(trendline="ols") und den übrigen Trendlinien alle
+    Zeilen, in denen x, y und color vorhanden sind; fehlende Werte in anderen Spalten spielen keine Rolle.
+    Wird einmal pro Datenversion in einem gruppierten Durchlauf berechnet.
+    """
+    def build():
+        data = df[[x, y] + ([color] if color is not None else [])].dropna()
+        data = data.assign(_group="") if color is None else data.assign(_group=data[color].astype(str))
+        engine, groups = RegressionEngine.from_groups(data, [x, y], ["_group"])
+        ranges = data.groupby("_group", sort=True)[x].agg(["min", "max"])
+        return {"engine": engine, "groups": list(groups["_group"]), "ranges": ranges}
+
+    return cached_per_version(df, f"trendlines-{x}-{y}-{color}", build)
+
+
+def compute_trendlines(df, x, y, color=None):
+    """
+    Berechnet die OLS-Trendlinien y = slope * x + intercept für alle Farbgruppen gleichzeitig.
+    Liefert {Gruppe: {"slope", "intercept", "r2", "x_range"}}.
+    """
+    statistics = get_grouped_statistics(df, x, y, color)
+    engine = statistics["engine"]
+    i, j = engine.index[x], engine.index[y]
+
+    sxx, sxy, syy = engine.scatter[:, i, i], engine.scatter[:, i, j], engine.scatter[:, j, j]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        slope = sxy / sxx
+        r2 = sxy ** 2 / (sxx * syy)
+    intercept = engine.means[:, j] - slope * engine.means[:, i]
+
+    ranges = statistics["ranges"]
+    return {
+        group: {"slope": slope[k], "intercept": intercept[k], "r2": r2[k],
+                "x_range": (ranges.loc[group, "min"], ranges.loc[group, "max"])}
+        for k, group in enumerate(statistics["groups"])
+    }
+
+
+def subsample(x, y, size, seed=0):
+    """Gleichverteilte Stichprobe von höchstens size Punkten (reproduzierbar)."""
+    if len(x) <= size:
+        return x, y
+    index = np.random.default_rng(seed).choice(len(x), size=size, replace=False)
+    return x[index], y[index]
+
+
+def fit_huber(x, y, epsilon=1.345):
+    """
+    Robuste lineare Regression mit Huber-Verlust (iterativ neu gewichtete kleinste Quadrate). Die Skala der
+    Residuen wird über die MAD geschätzt; Ausreißer mit |Residuum| > epsilon * Skala werden heruntergewichtet.
+    """
+    x, y = subsample(x, y, HUBER_MAX_POINTS)
+    weights = np.ones(len(x))
+    slope = intercept = 0.0
+    for _ in range(HUBER_MAX_ITER):
+        total = weights.sum()
+        mean_x, mean_y = weights @ x / total, weights @ y / total
+        sxx = weights @ (x - mean_x) ** 2
+        new_slope = weights @ ((x - mean_x) * (y - mean_y)) / sxx if sxx > 0 else 0.0
+        new_intercept = mean_y - new_slope * mean_x
+        converged = np.isclose(new_slope, slope, rtol=1e-8) and np.isclose(new_intercept, intercept, rtol=1e-8)
+        slope, intercept = new_slope, new_intercept
+        if converged:
+            break
+
+        residuals = np.abs(y - (slope * x + intercept))
+        scale = 1.4826 * np.median(residuals)
+        if scale == 0:
+            break
+        weights = np.minimum(1.0, epsilon * scale / np.maximum(residuals, 1e-300))
+    return slope, intercept
+
+
+def fit_theil_sen(x, y):
+    """Theil-Sen-Schätzer: Median aller paarweisen Steigungen, Achsenabschnitt als Median von y - slope * x."""
+    x, y = subsample(x, y, THEIL_SEN_MAX_POINTS)
+    i, j = np.triu_indices(len(x), k=1)
+    dx = x[j] - x[i]
+    valid = dx != 0
+    slope = np.median((y[j] - y[i])[valid] / dx[valid]) if valid.any() else 0.0
+    return slope, np.median(y - slope * x)
+
+
+def fit_lowess(x, y):
+    """
+    LOWESS auf gebinnten Daten: x wird in LOWESS_BINS gleich breite Bins geteilt, je Bin werden Mittelwerte
+    und Anzahl berechnet. Die lokal linearen Regressionen (Tricube-Gewichte, Anteil LOWESS_FRAC der Punkte)
+    laufen dann auf den Bin-Mittelwerten, gewichtet mit deren Anzahl. Liefert (x, y) der geglätteten Kurve.
+    """
+    edges = np.linspace(x.min(), x.max(), LOWESS_BINS + 1)
+    bins = np.clip(np.searchsorted(edges, x, side="right") - 1, 0, LOWESS_BINS - 1)
+    counts = np.bincount(bins, minlength=LOWESS_BINS)
+    filled = counts > 0
+    counts = counts[filled].astype(float)
+    bin_x = np.bincount(bins, weights=x, minlength=LOWESS_BINS)[filled] / counts
+    bin_y = np.bincount(bins, weights=y, minlength=LOWESS_BINS)[filled] / counts
+    if len(bin_x) < 3:
+        return bin_x, bin_y
+
+    # Abstand zu allen Bins und Bandbreite je Bin (so dass LOWESS_FRAC der Punkte im Fenster liegen)
+    distances = np.abs(bin_x[:, None] - bin_x[None, :])
+    order = np.argsort(distances, axis=1)
+    cumulative = np.cumsum(counts[order], axis=1)
+    needed = np.argmax(cumulative >= LOWESS_FRAC * counts.sum(), axis=1)
+    bandwidth = np.maximum(distances[np.arange(len(bin_x)), order[np.arange(len(bin_x)), needed]], 1e-12)
+    tricube = np.clip(1 - (distances / bandwidth[:, None]) ** 3, 0, None) ** 3
+
+    robustness = np.ones(len(bin_x))
+    fitted = bin_y
+    for iteration in range(LOWESS_ITERATIONS + 1):
+        weights = tricube * (counts * robustness)[None, :]
+        total = weights.sum(axis=1)
+        mean_x = weights @ bin_x / total
+        mean_y = weights @ bin_y / total
+        dx = bin_x[None, :] - mean_x[:, None]
+        sxx = (weights * dx ** 2).sum(axis=1)
+        sxy = (weights * dx * (bin_y[None, :] - mean_y[:, None])).sum(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            slope = np.where(sxx > 0, sxy / sxx, 0.0)
+        fitted = mean_y + slope * (bin_x - mean_x)
+
+        if iteration < LOWESS_ITERATIONS:
+            residuals = np.abs(bin_y - fitted)
+            scale = 6 * np.median(residuals)
+            if scale == 0:
+                break
+            robustness = np.clip(1 - (residuals / scale) ** 2, 0, None) ** 2
+    return bin_x, fitted
+
+
+def compute_trendline_curves(df, x, y, color=None, mode="ols"):
+    """
+    Berechnet die Trendlinien aller Farbgruppen im Modus mode (siehe TRENDLINE_MODES) und speichert sie pro
+    Datenversion zwischen. Liefert {Gruppe: {"x", "y", "slope", "intercept", "r2"}}; slope/intercept sind bei
+    LOWESS und r2 außer bei OLS None.
+    """
+    if mode not in TRENDLINE_MODES:
+        raise ValueError(f" Fehler: Unbekannte Trendlinie '{mode}' (erlaubt: {', '.join(TRENDLINE_MODES)}).")
+
+    def build():
+        if mode == "ols":
+            curves = {}
+            for group, line in compute_trendlines(df, x, y, color).items():
+                x_values = np.array(line["x_range"], dtype=float)
+                curves[group] = {"x": x_values, "y": line["slope"] * x_values + line["intercept"],
+                                 "slope": line["slope"], "intercept": line["intercept"], "r2": line["r2"]}
+            return curves
+
+        data = df[[x, y] + ([color] if color is not None else [])].dropna()
+        groups = data.groupby(data[color].astype(str)) if color is not None else [("", data)]
+        curves = {}
+        for group, rows in groups:
+            x_values, y_values = rows[x].to_numpy(dtype=float), rows[y].to_numpy(dtype=float)
+            if mode == "lowess":
+                curve_x, curve_y = fit_lowess(x_values, y_values)
+                curves[group] = {"x": curve_x, "y": curve_y, "slope": None, "intercept": None, "r2": None}
+                continue
+            slope, intercept = (fit_huber if mode == "huber" else fit_theil_sen)(x_values, y_values)
+            curve_x = np.array([x_values.min(), x_values.max()])
+            curves[group] = {"x": curve_x, "y": slope * curve_x + intercept,
+                             "slope": slope, "intercept": intercept, "r2": None}
+        return curves
+
+    return cached_per_version(df, f"trendline-{mode}-{x}-{y}-{color}", build)
+
+
+def add_trendlines(fig, df, x, y, color=None, mode="ols"):
+    """
+    Ergänzt ein Streudiagramm aus px.scatter(df, x, y, color=color) um Trendlinien je Farbgruppe, wie
+    trendline="ols" bzw. "lowess" in Plotly Express - jedoch ohne statsmodels, mit zwischengespeicherten
+    Ergebnissen und mit beschränktem Aufwand bei großen Datenmengen (siehe TRENDLINE_MODES).
+    Jede Linie übernimmt Farbe und Legendengruppe der zugehörigen Punkte. Enthält die Abbildung keine Punkte
+    (Dichte-Modus, siehe analytics/density.py), erhalten die Linien die Standardfarben und eine eigene Legende.
+    """
+    curves = compute_trendline_curves(df, x, y, color, mode)
+    x_label = fig.layout.xaxis.title.text or x
+    y_label = fig.layout.yaxis.title.text or y
+
+    def add_line(group, line_color, legendgroup, showlegend):
+        curve = curves[group]
+        summary = f"<b>{TRENDLINE_MODES[mode]} trendline</b><br>"
+        if curve["slope"] is not None:
+            summary += f"{y_label} = {curve['slope']:.6g} * {x_label} + {curve['intercept']:.6g}<br>"
+        if curve["r2"] is not None:
+            summary += f"R<sup>2</sup>={curve['r2']:.6f}<br>"
+        hover = (summary + "<br>"
+                 + (f"{color}={group}<br>" if color is not None else "")
+                 + f"{x_label}=%{{x}}<br>{y_label}=%{{y}} <b>(trend)</b><extra></extra>")
+        fig.add_trace(go.Scatter(
+            x=curve["x"],
+            y=curve["y"],
+            mode="lines",
+            name=group or f"{TRENDLINE_MODES[mode]} trendline",
+            legendgroup=legendgroup,
+            showlegend=showlegend,
+            line={"color": line_color},
+            hovertemplate=hover,
+        ))
+
+    markers = [trace for trace in fig.data if trace.type in ("scatter", "scattergl")
+               and (trace.name if color is not None else "") in curves]
+    for trace in markers:
+        add_line(trace.name if color is not None else "", trace.marker.color, trace.legendgroup, False)
+
+    if not markers:
+        # Reihenfolge der Farben wie bei px.scatter: nach dem ersten Auftreten der Gruppe
+        order = df[color].dropna().astype(str).unique() if color is not None else [""]
+        palette = px.colors.qualitative.Plotly
+        for k, group in enumerate(group for group in order if group in curves):
+            add_line(group, palette[k % len(palette)], group, True)
+    return fig
@@ -0,0 +1,83 @@
+/*
+ * Clientseitige Callbacks für Navigation, Sidebar-Toggle und die Hervorhebung des aktiven Tabs.
+ * Diese Funktionen verändern nur den UI-Zustand und laufen daher komplett im Browser,
+ * sodass ein Tab-Wechsel oder das Ein-/Ausklappen der Sidebar keinen Request an den Server auslöst.
+ *
+ * Die Zuordnung Button -> URL -> View ergibt sich aus den IDs:
+ *   btn-<name>  ->  /<name>  ->  page-<name>
+ */
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    navigation: {
+        // Aktuelle Seite aus der URL bestimmen (default zur Homepage)
+        currentPage: function (pathname, pages) {
+            const page = (pathname || "/").replace(/^\//, "");
+            if (page === "" || pages.indexOf(page) === -1) {
+                return "overview";
+            }
+            return page;
+        },
+
+        // Seitennamen aus den Output-IDs des Callbacks ableiten (btn-<name> bzw. page-<name>)
+        outputPages: function () {
+            const outputs = window.dash_clientside.callback_context.outputs_list;
+            return outputs.map(function (output) {
+                return output.id.replace(/^(btn|page)-/, "");
+            });
+        },
+
+        // Updaten der URL, je nachdem welcher Button geklickt wird
+        navigate: function () {
+            const triggered = window.dash_clientside.callback_context.triggered;
+            if (!triggered || triggered.length === 0 || triggered[0].prop_id === ".") {
+                return "/overview";
+            }
+            const buttonId = triggered[0].prop_id.split(".")[0];
+            return "/" + buttonId.replace(/^btn-/, "");
+        },
+
+        // Hervorhebung des aktiven Tabs in der Sidebar
+        updateActiveTab: function (pathname) {
+            const defaultStyle = {
+                "width": "100%", "height": "60px", "fontSize": "18px",
+                "margin": "5px 0", "display": "flex", "alignItems": "center",
+                "borderRadius": "12px", "backgroundColor": "#f0f0f0",
+                "fontWeight": "normal", "color": "black"
+            };
+            const activeStyle = Object.assign({}, defaultStyle, {
+                "backgroundColor": "#007bff",  // Blaues Highlight
+                "color": "white",
+                "fontWeight": "bold"
+            });
+
+            const ns = window.dash_clientside.navigation;
+            const pages = ns.outputPages();
+            const active = ns.currentPage(pathname, pages);
+            return pages.map(function (page) {
+                return page === active ? activeStyle : defaultStyle;
+            });
+        },
+
+        // Nur die aktive View, basierend auf der URL, anzeigen
+        displayPage: function (pathname) {
+            const ns = window.dash_clientside.navigation;
+            const pages = ns.outputPages();
+            const active = ns.currentPage(pathname, pages);
+            return pages.map(function (page) {
+                return {"display": page === active ? "block" : "none"};
+            });
+        },
+
+        // Togglen der Sidebar: bei ungerader Anzahl an Klicks verstecken, bei gerader Anzahl zeigen
+        toggleSidebar: function (nClicks, sidebarStyle, contentStyle) {
+            if (nClicks === null || nClicks === undefined) {
+                return window.dash_clientside.no_update;
+            }
+            const hidden = nClicks % 2 === 1;
+            const newSidebarStyle = Object.assign({}, sidebarStyle || {},
+                {"display": hidden ? "none" : "flex"});
+            const newContentStyle = Object.assign({}, contentStyle || {},
+                {"margin-left": hidden ? "20px" : "220px"});
+            return [newSidebarStyle, newContentStyle];
+        }
+    }
+});
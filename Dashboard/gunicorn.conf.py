@@ -0,0 +1,21 @@
+"""
+Konfiguration für den Produktivbetrieb mit gunicorn (nur Linux/macOS):
+    gunicorn -c gunicorn.conf.py "wsgi:create_app()"
+
+Alle Werte lassen sich über Umgebungsvariablen überschreiben.
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get("DASHBOARD_BIND", "0.0.0.0:8050")
+
+# Anzahl der Worker-Prozesse und Threads pro Worker
+workers = int(os.environ.get("DASHBOARD_WORKERS", multiprocessing.cpu_count()))
+threads = int(os.environ.get("DASHBOARD_THREADS", 4))
+worker_class = "gthread"
+
+# App (inkl. Daten-Snapshot) einmalig im Master laden und an die Worker vererben
+preload_app = os.environ.get("DASHBOARD_PRELOAD", "1") != "0"
+
+# Die Berechnung aller Diagramme kann bei großen Tabellen einige Sekunden dauern
+timeout = int(os.environ.get("DASHBOARD_TIMEOUT", 120))
@@ -1,11 +1,15 @@
 import plotly.express as px
 
+from analytics.density import create_scatter
+from analytics.rollups import aggregate_rollup
+from analytics.trendlines import add_trendlines
+
 
 class CustomerInsightsTab:
     """View für Kundenbezogene Einblicke. (JPG und JE)"""
 
     @staticmethod
-    def create_barchart_category_footfall(df):
+    def create_barchart_category_footfall(rollup):
         """
         Erzeugt ein Balkendiagramm, das den durchschnittlichen CustomerFootfall
         (Kundenbesuche) pro StoreCategory darstellt. (JPG)
@@ -14,13 +18,13 @@ class CustomerInsightsTab:
         - Y-Achse: Durchschnittlicher CustomerFootfall
 
         Vorgehensweise:
-        1. Gruppierung des DataFrames nach StoreCategory und Berechnung des Durchschnitts
-           der CustomerFootfall für jede Kategorie.
+        1. Zusammenfassen des Rollups nach Standort und Kategorie (StoreRollupLocationCategory) zu
+           StoreCategory und Berechnung des Durchschnitts der CustomerFootfall für jede Kategorie.
         2. Darstellung der Ergebnisse in einem Balkendiagramm, um die durchschnittliche
            Kundenfrequenz je Kategorie anschaulich zu visualisieren.
         """
         # Gruppiere nach StoreCategory und berechne den Durchschnitt der CustomerFootfall
-        df_grouped = df.groupby("StoreCategory", as_index=False)["CustomerFootfall"].mean()
+        df_grouped = aggregate_rollup(rollup, "StoreCategory", ["CustomerFootfall"])
 
         # Erstelle das Balkendiagramm
         fig = px.bar(
@@ -37,7 +41,7 @@ class CustomerInsightsTab:
         return fig
 
     @staticmethod
-    def create_scatter_footfall_revenue(df):
+    def create_scatter_footfall_revenue(df, trendline="ols"):
         """
         Erzeugt das Streudiagramm für Customer Footfall vs. Monthly Sales Revenue. (JE und JPG)
         - X-Achse: CustomerFootfall
@@ -46,14 +50,14 @@ class CustomerInsightsTab:
         - Trendline: Lineare Regression (OLS)
         Wie funktioniert die lineare Regression hier?
 
-        1. Durch den Parameter trendline="ols" signalisiert Plotly Express,
-           dass eine lineare Regression (Ordinary Least Squares, OLS) berechnet werden soll.
+        1. Nach dem Erstellen des Streudiagramms fügt add_trendlines (analytics/trendlines.py) für jede
+           StoreCategory eine lineare Regression (Ordinary Least Squares, OLS) hinzu.
 
-        2. Plotly Express extrahiert die X- und Y-Daten (hier CustomerFootfall und MonthlySalesRevenue)
-           aus dem DataFrame.
+        2. Die Regression wird aus den Summen und Kreuzprodukten der X- und Y-Daten (hier CustomerFootfall und
+           MonthlySalesRevenue) je Kategorie berechnet. Diese werden einmal pro Datenversion für alle
+           numerischen Spalten gemeinsam ermittelt, sodass jede Trendlinie nur noch nachgeschlagen wird.
 
-        3. Intern wird das statsmodels-Paket verwendet, um ein OLS-Modell zu erstellen.
-           Dabei wird ein Modell in der Form:
+        3. Dabei wird ein Modell in der Form:
 
               y = m * x + b
 
@@ -66,18 +70,20 @@ class CustomerInsightsTab:
         4. Das OLS-Verfahren berechnet m und b so, dass die Summe der quadrierten Abweichungen
            (Residuen) zwischen den vorhergesagten und den tatsächlichen y-Werten minimiert wird.
 
-        5. Die resultierende Regressionslinie wird dann automatisch in das Streudiagramm eingefügt,
-           sodass man visuell den Einfluss des Customer Footfall auf den Umsatz erkennen kann.
+        5. Die resultierende Regressionslinie wird als eigene Linie in der Farbe der Kategorie in das
+           Streudiagramm eingefügt, sodass man visuell den Einfluss des Customer Footfall auf den Umsatz erkennen kann.
 
-        Hinweis: Für die Nutzung der Option trendline="ols" muss das Paket statsmodels installiert sein.
+        Über den Parameter trendline lässt sich statt OLS eine robuste Trendlinie ("huber", "theil-sen") oder eine
+        LOWESS-Kurve ("lowess") wählen, z. B. wenn Ausreißer die OLS-Gerade verzerren. Diese werden auf einer
+        Stichprobe bzw. auf gebinnten Daten berechnet, sodass der Aufwand auch bei vielen Stores begrenzt bleibt.
+        Dies gilt für alle Streudiagramme mit Trendlinie.
         """
-        fig = px.scatter(
+        fig = create_scatter(
             df,
             x="CustomerFootfall",
             y="MonthlySalesRevenue",
             color="StoreCategory",
             # Farb-Codierung nach StoreCategory: Unterscheidet die Datenpunkte anhand ihrer Kategorie. (JPG)
-            trendline="ols",  # Fügt eine Trendline mittels linearer Regression (OLS) hinzu. (JPG)
             title="Customer Footfall vs Revenue",
             labels={
                 "CustomerFootfall": "Customer Footfall",
@@ -85,10 +91,12 @@ class CustomerInsightsTab:
             },
             hover_data=["StoreID"]
         )
+        # Fügt eine Trendline mittels linearer Regression (OLS) hinzu. (JPG)
+        add_trendlines(fig, df, "CustomerFootfall", "MonthlySalesRevenue", "StoreCategory", mode=trendline)
         return fig
 
     @staticmethod
-    def create_scatter_marketing_footfall(df):
+    def create_scatter_marketing_footfall(df, trendline="ols"):
         """
         Erzeugt ein Streudiagramm mit Trendlinie, das den Zusammenhang zwischen Marketing-Ausgaben
         (MarketingSpend, in Tausend $) und der Anzahl der Kunden im Monat (CustomerFootfall) darstellt. (JPG)
@@ -100,12 +108,11 @@ class CustomerInsightsTab:
 
         Die lineare Regression funktioniert hier ähnlich wie im vorherigen Beispiel.
         """
-        fig = px.scatter(
+        fig = create_scatter(
             df,
             x="MarketingSpend",
             y="CustomerFootfall",
             color="StoreCategory",
-            trendline="ols",  # Trendlinie mittels linearer Regression (OLS)
             title="Marketing Spend vs Customer Footfall",
             labels={
                 "MarketingSpend": "Marketing Spend (in Tausend $)",
@@ -113,10 +120,12 @@ class CustomerInsightsTab:
             },
             hover_data=["StoreID"]
         )
+        # Trendlinie mittels linearer Regression (OLS)
+        add_trendlines(fig, df, "MarketingSpend", "CustomerFootfall", "StoreCategory", mode=trendline)
         return fig
 
     @staticmethod
-    def create_scatter_promotions_footfall(df):
+    def create_scatter_promotions_footfall(df, trendline="ols"):
         """
         Erzeugt ein Streudiagramm, das den Zusammenhang zwischen der Anzahl der Promotion-Events
         (PromotionsCount) und der Anzahl der Kunden (CustomerFootfall) visualisiert. (JPG)
@@ -128,12 +137,11 @@ class CustomerInsightsTab:
 
         Die lineare Regression funktioniert hier ähnlich wie im vorherigen Beispiel.
         """
-        fig = px.scatter(
+        fig = create_scatter(
             df,
             x="PromotionsCount",
             y="CustomerFootfall",
             color="StoreCategory",  # Unterscheidung der Datenpunkte nach StoreCategory
-            trendline="ols",  # Fügt eine lineare Regressionslinie (OLS) hinzu
             title="Promotions vs Customer Footfall",
             labels={
                 "PromotionsCount": "Promotions Count (Anzahl der Promotion-Events)",
@@ -141,10 +149,12 @@ class CustomerInsightsTab:
             },
             hover_data=["StoreID"]
         )
+        # Fügt eine lineare Regressionslinie (OLS) hinzu
+        add_trendlines(fig, df, "PromotionsCount", "CustomerFootfall", "StoreCategory", mode=trendline)
         return fig
 
     @staticmethod
-    def create_bar_chart_promotions_vs_footfall(df):
+    def create_bar_chart_promotions_vs_footfall(rollup):
         """
         Erzeugt ein Balkendiagramm, das die durchschnittliche Kundenfrequenz (CustomerFootfall)
         für verschiedene Promotionsanzahlen (PromotionsCount) anzeigt. (JPG)
@@ -152,15 +162,16 @@ class CustomerInsightsTab:
         Vorgehensweise:
 
         1. Gruppierung:
-           - Der DataFrame wird nach der Anzahl der Promotion-Events (PromotionsCount) gruppiert.
-           - Für jede Gruppe wird der Durchschnitt der CustomerFootfall berechnet.
+           - Das Rollup nach der Anzahl der Promotion-Events (StoreRollupPromotions) enthält je PromotionsCount
+             bereits Anzahl und Summe der CustomerFootfall.
+           - Für jede Gruppe wird daraus der Durchschnitt der CustomerFootfall berechnet.
 
         2. Visualisierung:
            - Die X-Achse zeigt die Promotionsanzahl.
            - Die Y-Achse stellt die durchschnittliche Kundenfrequenz dar.
         """
         # Gruppiere nach PromotionsCount und berechne den Durchschnitt der CustomerFootfall
-        df_grouped = df.groupby("PromotionsCount", as_index=False)["CustomerFootfall"].mean()
+        df_grouped = aggregate_rollup(rollup, "PromotionsCount", ["CustomerFootfall"])
 
         # Optional: Sortiere die Ergebnisse nach PromotionsCount, damit die X-Achse korrekt geordnet ist
         df_grouped = df_grouped.sort_values("PromotionsCount")
@@ -179,7 +190,7 @@ class CustomerInsightsTab:
         return fig
 
     @staticmethod
-    def create_scatter_productvariety_vs_footfall(df):
+    def create_scatter_productvariety_vs_footfall(df, trendline="ols"):
         """
         Erzeugt ein Streudiagramm mit Trendlinie, das den Zusammenhang zwischen Produktvielfalt
         (ProductVariety) und Kundenbesuchen (CustomerFootfall) darstellt. (JPG)
@@ -191,12 +202,11 @@ class CustomerInsightsTab:
 
         Die lineare Regression funktioniert wie in den obigen Beispielen.
         """
-        fig = px.scatter(
+        fig = create_scatter(
             df,
             x="ProductVariety",
             y="CustomerFootfall",
             color="StoreCategory",
-            trendline="ols",  # Fügt die lineare Regressionslinie hinzu
             title="Product Variety vs Customer Footfall",
             labels={
                 "ProductVariety": "Product Variety (Produktvielfalt)",
@@ -204,4 +214,6 @@ class CustomerInsightsTab:
             },
             hover_data=["StoreID"]
         )
+        # Fügt die lineare Regressionslinie hinzu
+        add_trendlines(fig, df, "ProductVariety", "CustomerFootfall", "StoreCategory", mode=trendline)
         return fig
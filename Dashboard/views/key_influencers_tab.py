@@ -1,95 +1,93 @@
 import pandas as pd
-import numpy as np
 import plotly.express as px
-from sklearn.linear_model import LinearRegression
-# Importiert die Klasse LinearRegression, mit der ein lineares Regressionsmodell erstellt wird.
-# Dieses Modell ermittelt den Zusammenhang zwischen den unabhängigen Variablen (Features)
-# und der abhängigen Variable (Target) – zum Beispiel, um den Einfluss von MarketingSpend,
-# CustomerFootfall und ProductVariety auf den Umsatz zu analysieren.
 
-from sklearn.preprocessing import StandardScaler
+from analytics.bootstrap import bootstrap_influences
+from analytics.cache import cached_per_version
+from analytics.nonlinear_importance import load_or_fit_permutation_importances, permutation_percentages
+from analytics.regression_engine import RegressionEngine, influence_percentages, select_group
+
+# Regressionsmodelle des Tabs: Ziel (Target) und unabhängige Variablen (Features).
+# Alle Modelle werden aus derselben Kreuzprodukt-Matrix berechnet (siehe analytics/regression_engine.py).
+INFLUENCE_MODELS = {
+    "revenue": {
+        "target": "MonthlySalesRevenue",
+        "features": ["MarketingSpend", "CustomerFootfall", "ProductVariety", "StoreSize", "StoreAge",
+                     "EmployeeEfficiency", "CompetitorDistance", "PromotionsCount", "EconomicIndicator"],
+    },
+    "employee-efficiency": {
+        "target": "EmployeeEfficiency",
+        "features": ["CustomerFootfall", "ProductVariety", "StoreSize", "StoreAge"],
+    },
+    "customer-footfall": {
+        "target": "CustomerFootfall",
+        "features": ["MarketingSpend", "PromotionsCount", "StoreSize", "ProductVariety", "StoreAge",
+                     "CompetitorDistance", "EconomicIndicator"],
+    },
+}
+
+# Anzahl der Bootstrap-Stichproben und Niveau der Konfidenzintervalle (Fehlerbalken)
+BOOTSTRAP_RESAMPLES = 1000
+BOOTSTRAP_CONFIDENCE = 0.95
+
+# Segmente der Analyse (Standort x Kategorie) und Wert der Auswahl "alle Stores"
+SEGMENT_COLUMNS = ["StoreLocation", "StoreCategory"]
+ALL_SEGMENTS = "all"
+
+# Verfahren zur Bestimmung der Einflüsse: lineare Regression oder Gradient Boosting mit Permutation Importance
+LINEAR_ENGINE = "linear"
+GBM_ENGINE = "gbm"
+ENGINE_OPTIONS = [
+    {"label": "Lineare Regression (standardisierte Koeffizienten)", "value": LINEAR_ENGINE},
+    {"label": "Gradient Boosting (Permutation Importance, nichtlinear)", "value": GBM_ENGINE},
+]
 
 
-# Importiert den StandardScaler, der verwendet wird, um die Merkmalswerte zu standardisieren.
-# Die Standardisierung transformiert die Daten so, dass sie einen Mittelwert von 0 und eine
-# Standardabweichung von 1 haben. Dies ist wichtig, damit die Koeffizienten des Regressionsmodells
-# vergleichbar sind, insbesondere wenn die Features unterschiedliche Skalen haben.
-
 class KeyInfluencersTab:
     """Klasse für die Erstellung von Diagrammen im Key Influencers-Tab. (JPG und JE)"""
 
     @staticmethod
-    def create_feature_importance_figure(df):
+    def create_feature_importance_figure(df, statistics=None, segment=None, engine=LINEAR_ENGINE):
         """
         Berechnet die Feature Importance – also den Einfluss verschiedener Faktoren auf den Umsatz –
-        mittels eines linearen Regressionsmodells. Es werden die Features 'MarketingSpend', 'CustomerFootfall'
-        und 'ProductVariety' herangezogen. Die Features werden standardisiert, um vergleichbare Koeffizienten
-        zu erhalten. Anschließend wird ein lineares Regressionsmodell trainiert und die absoluten Werte der
+        mittels eines linearen Regressionsmodells. Es werden alle neun numerischen Store-Merkmale herangezogen
+        (siehe INFLUENCE_MODELS["revenue"]). Die Features werden standardisiert, um vergleichbare Koeffizienten
+        zu erhalten. Anschließend wird ein lineares Regressionsmodell geschätzt und die absoluten Werte der
         Koeffizienten werden normalisiert, sodass die Summe 100% ergibt. (JPG)
 
         Vorgehensweise:
-        1. Auswahl der relevanten Features (MarketingSpend, CustomerFootfall, ProductVariety)
-           und des Zielwerts (MonthlySalesRevenue).
-        2. Entfernen von Zeilen mit fehlenden Werten in diesen Spalten.
-        3. Standardisierung der Features (z. B. mit StandardScaler), damit die Koeffizienten nicht
-           durch unterschiedliche Messskalen verzerrt werden.
-        4. Training eines linearen Regressionsmodells (z. B. mit LinearRegression).
+        1. Auswahl der Features (MarketingSpend, CustomerFootfall, ProductVariety, StoreSize, StoreAge,
+           EmployeeEfficiency, CompetitorDistance, PromotionsCount, EconomicIndicator) und des Zielwerts
+           (MonthlySalesRevenue), siehe INFLUENCE_MODELS.
+        2. Entfernen von Zeilen mit fehlenden Werten in einer numerischen Spalte (siehe get_complete_rows).
+        3. Standardisierung der Features, damit die Koeffizienten nicht durch unterschiedliche
+           Messskalen verzerrt werden.
+        4. Schätzung des linearen Regressionsmodells aus der gemeinsamen Kreuzprodukt-Matrix
+           (analytics/regression_engine.py, gleiches Ergebnis wie StandardScaler + LinearRegression).
         5. Berechnung der absoluten Koeffizientenwerte und Normalisierung dieser Werte auf 100%.
         6. Darstellung der Ergebnisse in einem Balkendiagramm.
+        7. Fehlerbalken: 95%-Bootstrap-Konfidenzintervalle der Einflüsse (siehe get_bootstrap_intervals).
 
-        Hinweis: Diese Methode verwendet die Bibliotheken scikit-learn (sklearn) und plotly.
+        Mit segment (Wert aus get_segment_options) wird das Modell nur für die Stores eines Segments
+        (Standort x Kategorie) angezeigt. Mit engine=GBM_ENGINE werden statt der linearen Koeffizienten die
+        Permutation Importances eines Gradient-Boosting-Modells gezeigt, die auch nichtlineare Effekte erfassen.
         """
-
-        # Definiert die unabhängigen Variablen und das Ziel
-        features = ["MarketingSpend", "CustomerFootfall", "ProductVariety", "StoreSize", "StoreAge",
-                    "EmployeeEfficiency", "CompetitorDistance", "PromotionsCount", "EconomicIndicator"]
-        target = "MonthlySalesRevenue"
-
-        # Entfernt Zeilen mit fehlenden Werten in den relevanten Spalten
-        df_model = df.dropna(subset=features + [target])
-
-        # Standardisiert die Features, um vergleichbare Koeffizienten zu erhalten
-        scaler = StandardScaler()
-        x = scaler.fit_transform(df_model[features])
-        y = df_model[target].values
-
-        # Trainiert das lineare Regressionsmodell
-        model = LinearRegression()
-        model.fit(x, y)
-
-        # Extrahiert die Koeffizienten und berechnet deren absolute Werte
-        coefs = model.coef_
-        importances = np.abs(coefs)
-
-        # Normalisiert die Importances, sodass ihre Summe 100% ergibt
-        total = importances.sum()
-        percentages = 100 * importances / total if total > 0 else importances
-
-        # Erstellt einen DataFrame für die Visualisierung
-        data = {
-            "Feature": features,
-            "Influence": percentages
-        }
-        df_importance = pd.DataFrame(data)
-
-        # Erstellt das Balkendiagramm
-        fig = px.bar(
-            df_importance,
-            x="Feature",
-            y="Influence",
-            title="Feature Importance – Factors Influencing Revenue",
-            labels={"Feature": "Faktor", "Influence": "Influence (%)"},
-            text="Influence"
-        )
-        fig.update_traces(texttemplate='%{text:.1f}%', textposition='outside')
-        fig.update_layout(uniformtext_minsize=8, uniformtext_mode='hide')
-        return fig
+        return KeyInfluencersTab.create_model_figure(
+            df, statistics, segment, engine, "revenue",
+            "Feature Importance – Factors Influencing Revenue", "Influence (%)")
 
     @staticmethod
-    def create_correlation_heatmap(df):
-        """Erzeugt eine optimierte Korrelations-Heatmap. (JE)"""
-        numeric_df = df.select_dtypes(include=["number"])
-        correlation_matrix = numeric_df.corr()
+    def create_correlation_heatmap(df, statistics=None):
+        """
+        Erzeugt eine optimierte Korrelations-Heatmap. (JE)
+
+        Mit statistics (Tabelle StoreDataMoments) wird die Korrelationsmatrix aus den inkrementell
+        gepflegten Kreuzprodukten abgeleitet, statt sie über alle Zeilen neu zu berechnen.
+        """
+        if statistics is not None:
+            correlation_matrix = RegressionEngine.from_moments_table(statistics).correlation()
+        else:
+            numeric_df = df.select_dtypes(include=["number"])
+            correlation_matrix = numeric_df.corr()
 
         fig = px.imshow(
             correlation_matrix,
@@ -107,113 +105,186 @@ class KeyInfluencersTab:
         return fig
 
     @staticmethod
-    def create_employee_efficiency_importance_figure(df):
+    def create_employee_efficiency_importance_figure(df, statistics=None, segment=None, engine=LINEAR_ENGINE):
         """
         Berechnet die Feature Importance – also den Einfluss verschiedener Faktoren auf die EmployeeEfficiency –
 
         Funktionsweise wie im oberen Beispiel (JPG)
         """
-        # Definiert die unabhängigen Variablen (Features) und das Ziel (Target)
-        features = ["CustomerFootfall", "ProductVariety", "StoreSize", "StoreAge"]
-        target = "EmployeeEfficiency"
-
-        # Entfernt Zeilen mit fehlenden Werten in den relevanten Spalten
-        df_model = df.dropna(subset=features + [target])
-
-        # Standardisiert die Features, damit die Koeffizienten vergleichbar sind
-        scaler = StandardScaler()
-        x = scaler.fit_transform(df_model[features])
-        y = df_model[target].values
-
-        # Trainiert das lineare Regressionsmodell
-        model = LinearRegression()
-        model.fit(x, y)
-
-        # Extrahiert die Koeffizienten und berechnet deren absolute Werte
-        coefs = model.coef_
-        importances = np.abs(coefs)
-
-        # Normalisiert die Importances, sodass ihre Summe 100% ergibt
-        total = importances.sum()
-        percentages = 100 * importances / total if total > 0 else importances
-
-        # Erstellt einen DataFrame für die Visualisierung
-        data = {
-            "Feature": features,
-            "Influence": percentages
-        }
-        df_importance = pd.DataFrame(data)
-
-        # Erstellt das Balkendiagramm (Bar Chart) mit plotly.express
-        fig = px.bar(
-            df_importance,
-            x="Feature",
-            y="Influence",
-            title="Feature Importance – Factors Influencing Employee Efficiency",
-            labels={"Feature": "Faktor", "Influence": "Influence (%)"},
-            text="Influence"
-        )
-        fig.update_traces(texttemplate='%{text:.1f}%', textposition='outside')
-        fig.update_layout(uniformtext_minsize=8, uniformtext_mode='hide')
-        return fig
+        return KeyInfluencersTab.create_model_figure(
+            df, statistics, segment, engine, "employee-efficiency",
+            "Feature Importance – Factors Influencing Employee Efficiency", "Influence (%)")
 
     @staticmethod
-    def create_customer_footfall_importance_figure(df):
+    def create_customer_footfall_importance_figure(df, statistics=None, segment=None, engine=LINEAR_ENGINE):
         """
         Berechnet die Feature Importance – also den Einfluss verschiedener Faktoren auf den Customer Footfall –
-        mittels eines linearen Regressionsmodells. Als unabhängige Variablen werden beispielhaft die Features
-        "MarketingSpend", "PromotionsCount", "StoreSize" und "ProductVariety" herangezogen.
+        mittels eines linearen Regressionsmodells. Als unabhängige Variablen werden die Features
+        "MarketingSpend", "PromotionsCount", "StoreSize", "ProductVariety", "StoreAge", "CompetitorDistance" und
+        "EconomicIndicator" herangezogen (siehe INFLUENCE_MODELS["customer-footfall"]).
 
         Vorgehensweise:
-          1. Es werden alle Zeilen entfernt, in denen die relevanten Spalten fehlen.
+          1. Es werden alle Zeilen entfernt, in denen eine numerische Spalte fehlt (siehe get_complete_rows).
           2. Die ausgewählten Features werden standardisiert, damit die Koeffizienten vergleichbar sind.
-          3. Ein lineares Regressionsmodell wird trainiert, um den Zusammenhang zwischen den Features und dem
+          3. Ein lineares Regressionsmodell wird geschätzt, um den Zusammenhang zwischen den Features und dem
              Customer Footfall (Zielvariable) zu ermitteln.
           4. Die absoluten Werte der Koeffizienten werden normalisiert, sodass deren Summe 100% ergibt.
           5. Das Ergebnis wird in einem Balkendiagramm dargestellt.
+        """
+        return KeyInfluencersTab.create_model_figure(
+            df, statistics, segment, engine, "customer-footfall",
+            "Feature Importance – Factors Influencing Customer Footfall", "Einfluss (%)")
+
+    @staticmethod
+    def get_regression_results(df, statistics=None):
+        """
+        Schätzt alle Modelle aus INFLUENCE_MODELS. Die standardisierte Kreuzprodukt-Matrix wird dafür nur
+        einmal pro Datenversion aufgebaut; die Ergebnisse (Koeffizienten, R², Standardfehler) werden
+        zwischengespeichert, sodass die Diagramme danach nur noch nachschlagen.
 
-        Hinweis: Für diese Methode müssen die Bibliotheken scikit-learn (sklearn) und plotly.express installiert sein.
+        Mit statistics (Tabelle StoreDataMoments) wird die persistierte Matrix verwendet; die Rohdaten
+        werden dann gar nicht mehr gelesen.
         """
-        # Definiere die unabhängigen Variablen (Features) und das Ziel (Target)
-        features = ["MarketingSpend", "PromotionsCount", "StoreSize", "ProductVariety", "StoreAge",
-                    "CompetitorDistance", "EconomicIndicator"]
-        target = "CustomerFootfall"
+        if statistics is not None:
+            return cached_per_version(statistics, "key-influencers-regression-statistics", lambda: (
+                RegressionEngine.from_moments_table(statistics).fit_many(INFLUENCE_MODELS)))
 
-        # Entfernt Zeilen mit fehlenden Werten in den relevanten Spalten
-        df_model = df.dropna(subset=features + [target])
+        def build():
+            columns = list(dict.fromkeys(
+                column for model in INFLUENCE_MODELS.values() for column in model["features"] + [model["target"]]))
+            return RegressionEngine.from_dataframe(KeyInfluencersTab.get_complete_rows(df), columns).fit_many(
+                INFLUENCE_MODELS)
 
-        # Standardisiert die Features, um vergleichbare Koeffizienten zu erhalten
-        scaler = StandardScaler()
-        x = scaler.fit_transform(df_model[features])
-        y = df_model[target].values
+        return cached_per_version(df, "key-influencers-regression", build)
 
-        # Trainiert das lineare Regressionsmodell
-        model = LinearRegression()
-        model.fit(x, y)
+    @staticmethod
+    def get_segment_results(df):
+        """
+        Schätzt alle Modelle aus INFLUENCE_MODELS für jedes Segment (Standort x Kategorie). Die Kreuzprodukt-
+        Matrizen aller Segmente werden in einem gruppierten Durchlauf berechnet und alle Segmente gemeinsam
+        (als Batch) geschätzt; das Ergebnis wird pro Datenversion zwischengespeichert.
 
-        # Extrahiert die Koeffizienten und berechnet deren absolute Werte
-        coefs = model.coef_
-        importances = np.abs(coefs)
+        Liefert {"segments": DataFrame mit Standort, Kategorie, Anzahl und Auswahlwert je Segment,
+                 "results": Ergebnisse je Modell mit einer Zeile pro Segment}.
+        """
+        def build():
+            columns = list(dict.fromkeys(
+                column for model in INFLUENCE_MODELS.values() for column in model["features"] + [model["target"]]))
+            engine, segments = RegressionEngine.from_groups(df, columns, SEGMENT_COLUMNS)
+            segments["Count"] = engine.n.astype(int)
+            segments["Value"] = segments[SEGMENT_COLUMNS].astype(str).agg("|".join, axis=1)
+            return {"segments": segments, "results": engine.fit_many(INFLUENCE_MODELS)}
 
-        # Normalisiert die Importances, sodass ihre Summe 100% ergibt
-        total = importances.sum()
-        percentages = 100 * importances / total if total > 0 else importances
+        return cached_per_version(df, "key-influencers-segments", build)
+
+    @staticmethod
+    def get_segment_options(df):
+        """Optionen für die Segment-Auswahl: alle Stores und jedes Segment (sortiert nach Standort, Kategorie)."""
+        segments = KeyInfluencersTab.get_segment_results(df)["segments"]
+        return [{"label": "Alle Stores", "value": ALL_SEGMENTS}] + [
+            {"label": f"{row.StoreLocation} – {row.StoreCategory} ({row.Count} Stores)", "value": row.Value}
+            for row in segments.itertuples()
+        ]
+
+    @staticmethod
+    def create_model_figure(df, statistics, segment, engine, name, title, influence_label):
+        """
+        Erstellt das Diagramm für das Modell name aus INFLUENCE_MODELS: für alle Stores oder, falls ein Segment
+        ausgewählt ist, für die Stores des Segments. Die Fehlerbalken zeigen beim linearen Modell die Bootstrap-
+        Konfidenzintervalle (nur für alle Stores), bei Gradient Boosting die Streuung über die Permutationsrunden.
+        """
+        segments = KeyInfluencersTab.get_segment_results(df)["segments"]
+        matches = segments.index[segments["Value"] == segment]
+        if len(matches):
+            row = segments.loc[matches[0]]
+            title = f"{title} ({row['StoreLocation']}, {row['StoreCategory']})"
+        else:
+            segment = ALL_SEGMENTS
+
+        if engine == GBM_ENGINE:
+            result = KeyInfluencersTab.get_permutation_importances(df, segment)[name]
+            influences, std = permutation_percentages(result)
+            return KeyInfluencersTab.create_importance_figure(
+                result["features"], influences, f"{title} – Gradient Boosting (R² Test: {result['r2']:.2f})",
+                influence_label, {"lower": influences - std, "upper": influences + std}, "± 1 Std.-Abw.")
+
+        if segment == ALL_SEGMENTS:
+            result = KeyInfluencersTab.get_regression_results(df, statistics)[name]
+            intervals = KeyInfluencersTab.get_bootstrap_intervals(df)[name]
+        else:
+            result = select_group(KeyInfluencersTab.get_segment_results(df)["results"][name], matches[0])
+            intervals = None
+        return KeyInfluencersTab.create_importance_figure(
+            result["features"], influence_percentages(result["coefficients"]), title, influence_label, intervals)
+
+    @staticmethod
+    def get_permutation_importances(df, segment=ALL_SEGMENTS):
+        """
+        Gradient-Boosting-Modelle und Permutation Importances aller Modelle aus INFLUENCE_MODELS für alle Stores
+        oder ein Segment (siehe analytics/nonlinear_importance.py). Das Training erfolgt einmal pro Datenversion;
+        danach werden die Ergebnisse aus dem Speicher bzw. aus dem Cache auf der Festplatte gelesen.
+        """
+        def build():
+            rows = df
+            if segment != ALL_SEGMENTS:
+                location, category = segment.split("|", 1)
+                rows = df[(df["StoreLocation"] == location) & (df["StoreCategory"] == category)]
+            return load_or_fit_permutation_importances(rows, INFLUENCE_MODELS, segment)
+
+        return cached_per_version(df, f"key-influencers-permutation-{segment}", build)
+
+    @staticmethod
+    def get_complete_rows(df):
+        """
+        Stores ohne fehlende Werte in einer numerischen Spalte. Das ist dieselbe Auswahl wie in StoreDataMoments
+        (scripts/store_statistics.py), sodass Koeffizienten und Bootstrap-Intervalle auf denselben Stores beruhen.
+        """
+        return df.dropna(subset=df.select_dtypes("number").columns)
+
+    @staticmethod
+    def get_bootstrap_intervals(df):
+        """
+        Bootstrap-Konfidenzintervalle der Einflüsse aller Modelle aus INFLUENCE_MODELS (siehe
+        analytics/bootstrap.py), über dieselben Stores wie die Schätzung (siehe get_complete_rows). Werden einmal
+        pro Datenversion berechnet und zwischengespeichert.
+        """
+        return cached_per_version(df, "key-influencers-bootstrap", lambda: bootstrap_influences(
+            KeyInfluencersTab.get_complete_rows(df), INFLUENCE_MODELS, resamples=BOOTSTRAP_RESAMPLES,
+            confidence=BOOTSTRAP_CONFIDENCE))
+
+    @staticmethod
+    def create_importance_figure(features, influences, title, influence_label, intervals=None, interval_label=None):
+        """
+        Erstellt das Balkendiagramm der auf 100% normalisierten Einflüsse eines Modells.
+        Mit intervals ({"lower": ..., "upper": ...}) werden die Intervalle als Fehlerbalken angezeigt.
+        """
+        interval_label = interval_label or f"{BOOTSTRAP_CONFIDENCE:.0%}-KI"
 
         # Erstellt einen DataFrame für die Visualisierung
-        data = {
+        df_importance = pd.DataFrame({
             "Feature": features,
-            "Influence": percentages
-        }
-        df_importance = pd.DataFrame(data)
+            "Influence": influences
+        })
+        error_bars = {}
+        if intervals is not None:
+            df_importance["Lower"] = intervals["lower"]
+            df_importance["Upper"] = intervals["upper"]
+            df_importance["ErrorPlus"] = (df_importance["Upper"] - df_importance["Influence"]).clip(lower=0)
+            df_importance["ErrorMinus"] = (df_importance["Influence"] - df_importance["Lower"]).clip(lower=0)
+            error_bars = {"error_y": "ErrorPlus", "error_y_minus": "ErrorMinus",
+                          "hover_data": {"Lower": ":.1f", "Upper": ":.1f", "ErrorPlus": False, "ErrorMinus": False}}
 
         # Erstellt das Balkendiagramm
         fig = px.bar(
             df_importance,
             x="Feature",
             y="Influence",
-            title="Feature Importance – Factors Influencing Customer Footfall",
-            labels={"Feature": "Faktor", "Influence": "Einfluss (%)"},
-            text="Influence"
+            title=title,
+            labels={"Feature": "Faktor", "Influence": influence_label,
+                    "Lower": f"{interval_label} untere Grenze (%)",
+                    "Upper": f"{interval_label} obere Grenze (%)"},
+            text="Influence",
+            **error_bars
         )
         fig.update_traces(texttemplate='%{text:.1f}%', textposition='outside')
         fig.update_layout(uniformtext_minsize=8, uniformtext_mode='hide')
@@ -1,17 +1,29 @@
 from dash import html, dcc
 import plotly.express as px
 
+from analytics.rollups import aggregate_rollup
+from scripts.store_leaderboard import leaderboard_query
+
+# Standard- und Höchstzahl der Stores in den Top- und Flop-Listen
+DEFAULT_LEADERBOARD_SIZE = 5
+MAX_LEADERBOARD_SIZE = 100
+
 
 class OverviewTab:
     @staticmethod
-    def create_overview_section(df):
-        """Erzeugt eine visuell ansprechende Übersicht über wichtige Kennzahlen, Rankings und ein Kuchendiagramm. (JPG und JE)"""
+    def create_overview_section(rollup, db_connector):
+        """
+        Erzeugt eine visuell ansprechende Übersicht über wichtige Kennzahlen, Rankings und ein Kuchendiagramm. (JPG und JE)
+        Kennzahlen, Rankings und Kuchendiagramm werden aus dem Rollup nach Standort und Kategorie
+        (StoreRollupLocationCategory, siehe scripts/store_rollups.py) berechnet statt aus allen Stores,
+        die Top- und Flop-Stores per Ranglisten-Abfrage (create_leaderboards).
+        """
 
-        # Wichtige Kennzahlen berechnen
-        total_revenue = df["MonthlySalesRevenue"].sum()
-        avg_footfall = df["CustomerFootfall"].mean()
-        total_marketing_spend = df["MarketingSpend"].sum()
-        total_promotions = df["PromotionsCount"].sum()
+        # Wichtige Kennzahlen berechnen (Summen über alle Gruppen des Rollups)
+        total_revenue = rollup["MonthlySalesRevenueSum"].sum()
+        avg_footfall = rollup["CustomerFootfallSum"].sum() / rollup["CustomerFootfallCount"].sum()
+        total_marketing_spend = rollup["MarketingSpendSum"].sum()
+        total_promotions = int(rollup["PromotionsCountSum"].sum())
 
         # Übersichtliche Darstellung der Kennzahlen
         metrics = [
@@ -21,24 +33,16 @@ class OverviewTab:
             {"label": "Total Promotions", "value": f"{total_promotions}", "icon": "🎉"}
         ]
 
-        # Top 5 und Flop 5 Stores nach Umsatz berechnen
-        top_5_stores = df.nlargest(5, "MonthlySalesRevenue")[
-            ["StoreID", "MonthlySalesRevenue", "StoreCategory", "StoreLocation"]
-        ].reset_index(drop=True)
-        flop_5_stores = df.nsmallest(5, "MonthlySalesRevenue")[
-            ["StoreID", "MonthlySalesRevenue", "StoreCategory", "StoreLocation"]
-        ].reset_index(drop=True)
-
         # Städte Ranking nach Umsatz
-        city_ranking = df.groupby("StoreLocation")["MonthlySalesRevenue"].sum().sort_values(
-            ascending=False).reset_index()
+        city_ranking = aggregate_rollup(rollup, "StoreLocation", ["MonthlySalesRevenue"], "sum").sort_values(
+            "MonthlySalesRevenue", ascending=False)
 
         # Kategorie Ranking nach Umsatz
-        category_ranking = df.groupby("StoreCategory")["MonthlySalesRevenue"].sum().sort_values(
-            ascending=False).reset_index()
+        category_ranking = aggregate_rollup(rollup, "StoreCategory", ["MonthlySalesRevenue"], "sum").sort_values(
+            "MonthlySalesRevenue", ascending=False)
 
         # Anzahl der Stores pro Kategorie (Daten für das Kuchendiagramm)
-        stores_per_category = df.groupby("StoreCategory").size().reset_index(name="StoreCount")
+        stores_per_category = aggregate_rollup(rollup, "StoreCategory")
 
         # Kuchendiagramm erstellen
         pie_chart = dcc.Graph(
@@ -56,72 +60,21 @@ class OverviewTab:
             style={"height": "300px"}
         )
 
-        # HTML Darstellung der Top 5 Stores
-        top_5_list = html.Div(
+        # Ranglisten-Steuerung: Anzahl der Stores und optionaler Filter nach Standort bzw. Kategorie
+        locations = sorted(rollup["StoreLocation"].dropna().unique())
+        categories = sorted(rollup["StoreCategory"].dropna().unique())
+        leaderboard_controls = html.Div(
             [
-                html.H4("🏅 Top 5 Stores by Revenue"),
-                html.Ol(
-                    [
-                        html.Li(
-                            html.Div(
-                                [
-                                    html.Span("🏆", style={"margin-right": "10px", "font-size": "20px"}),
-                                    html.Span(f"Store {row['StoreID']}",
-                                              style={"font-weight": "bold", "margin-right": "10px"}),
-                                    html.Span(f"({row['StoreCategory']}, {row['StoreLocation']})",
-                                              style={"color": "#555"}),
-                                    html.Span(f"${row['MonthlySalesRevenue']:,.2f}",
-                                              style={"color": "#4CAF50", "margin-left": "10px"})
-                                ],
-                                style={"display": "flex", "align-items": "center", "margin-bottom": "5px"}
-                            )
-                        )
-                        for i, row in top_5_stores.iterrows()
-                    ],
-                    style={"padding-left": "20px"}
-                )
+                html.Label("Stores per list:", style={"font-weight": "bold", "margin-right": "10px"}),
+                dcc.Input(id="leaderboard-size", type="number", min=1, max=MAX_LEADERBOARD_SIZE, step=1,
+                          value=DEFAULT_LEADERBOARD_SIZE, debounce=True,
+                          style={"width": "80px", "margin-right": "20px"}),
+                dcc.Dropdown(id="leaderboard-location", options=locations, placeholder="All locations",
+                             style={"width": "220px", "margin-right": "20px"}),
+                dcc.Dropdown(id="leaderboard-category", options=categories, placeholder="All categories",
+                             style={"width": "220px"})
             ],
-            style={
-                "background-color": "#e8f5e9",
-                "border-radius": "8px",
-                "padding": "15px",
-                "margin-bottom": "20px",
-                "box-shadow": "0 4px 8px rgba(0, 0, 0, 0.1)"
-            }
-        )
-
-        # HTML Darstellung der Flop 5 Stores
-        flop_5_list = html.Div(
-            [
-                html.H4("📉 Flop 5 Stores by Revenue"),
-                html.Ol(
-                    [
-                        html.Li(
-                            html.Div(
-                                [
-                                    html.Span("❌", style={"margin-right": "10px", "font-size": "20px"}),
-                                    html.Span(f"Store {row['StoreID']}",
-                                              style={"font-weight": "bold", "margin-right": "10px"}),
-                                    html.Span(f"({row['StoreCategory']}, {row['StoreLocation']})",
-                                              style={"color": "#555"}),
-                                    html.Span(f"${row['MonthlySalesRevenue']:,.2f}",
-                                              style={"color": "#e53935", "margin-left": "10px"})
-                                ],
-                                style={"display": "flex", "align-items": "center", "margin-bottom": "5px"}
-                            )
-                        )
-                        for i, row in flop_5_stores.iterrows()
-                    ],
-                    style={"padding-left": "20px"}
-                )
-            ],
-            style={
-                "background-color": "#ffebee",
-                "border-radius": "8px",
-                "padding": "15px",
-                "margin-bottom": "40px",  # Abstand zum nächsten Element
-                "box-shadow": "0 4px 8px rgba(0, 0, 0, 0.1)"
-            }
+            style={"display": "flex", "align-items": "center", "margin-bottom": "20px"}
         )
 
         # HTML Darstellung des Städte-Rankings
@@ -226,8 +179,8 @@ class OverviewTab:
                     ],
                     style={"display": "flex", "align-items": "center", "margin-bottom": "40px"}
                 ),
-                top_5_list,
-                flop_5_list,
+                leaderboard_controls,
+                html.Div(OverviewTab.create_leaderboards(db_connector), id="overview-leaderboards"),
                 city_ranking_list,
                 category_ranking_list
             ],
@@ -239,3 +192,60 @@ class OverviewTab:
                 "box-shadow": "0 4px 8px rgba(0, 0, 0, 0.1)"
             }
         )
+
+    @staticmethod
+    def create_leaderboards(db_connector, n=DEFAULT_LEADERBOARD_SIZE, location=None, category=None):
+        """
+        Erzeugt die Top-N- und Flop-N-Liste der Stores nach Umsatz, optional für einen Standort und/oder eine
+        Kategorie. Beide Listen werden per ORDER BY ... LIMIT n über den Umsatz-Index abgefragt
+        (scripts/store_leaderboard.py), der Aufwand hängt also nur von n ab.
+        """
+        top_stores = db_connector.fetch_data(*leaderboard_query(n, False, location, category))
+        flop_stores = db_connector.fetch_data(*leaderboard_query(n, True, location, category))
+
+        top_list = OverviewTab.create_leaderboard_list(
+            top_stores, f"🏅 Top {n} Stores by Revenue", "🏆", "#4CAF50",
+            {"background-color": "#e8f5e9", "margin-bottom": "20px"}
+        )
+        flop_list = OverviewTab.create_leaderboard_list(
+            flop_stores, f"📉 Flop {n} Stores by Revenue", "❌", "#e53935",
+            {"background-color": "#ffebee", "margin-bottom": "40px"}  # Abstand zum nächsten Element
+        )
+        return [top_list, flop_list]
+
+    @staticmethod
+    def create_leaderboard_list(stores, title, icon, color, style):
+        """HTML-Darstellung einer Rangliste (Spalten StoreID, MonthlySalesRevenue, StoreCategory, StoreLocation)."""
+        if stores.empty:
+            items = [html.P("🚫 No stores match the selection.")]
+        else:
+            items = [html.Ol(
+                [
+                    html.Li(
+                        html.Div(
+                            [
+                                html.Span(icon, style={"margin-right": "10px", "font-size": "20px"}),
+                                html.Span(f"Store {store.StoreID}",
+                                          style={"font-weight": "bold", "margin-right": "10px"}),
+                                html.Span(f"({store.StoreCategory}, {store.StoreLocation})",
+                                          style={"color": "#555"}),
+                                html.Span(f"${store.MonthlySalesRevenue:,.2f}",
+                                          style={"color": color, "margin-left": "10px"})
+                            ],
+                            style={"display": "flex", "align-items": "center", "margin-bottom": "5px"}
+                        )
+                    )
+                    for store in stores.itertuples(index=False)
+                ],
+                style={"padding-left": "20px"}
+            )]
+
+        return html.Div(
+            [html.H4(title)] + items,
+            style={
+                "border-radius": "8px",
+                "padding": "15px",
+                "box-shadow": "0 4px 8px rgba(0, 0, 0, 0.1)",
+                **style
+            }
+        )
@@ -1,11 +1,13 @@
-import plotly.express as px
+from analytics.density import create_scatter
+from analytics.distributions import compute_box_statistics, create_box
+from analytics.trendlines import add_trendlines
 
 
 class PerformanceInsightsTab:
     """Klasse für die Erstellung von Diagrammen im Performance Insights-Tab. (JE und JPG)"""
 
     @staticmethod
-    def create_scatter_marketing_revenue(df):
+    def create_scatter_marketing_revenue(df, trendline="ols"):
         """
         Erzeugt ein Streudiagramm, das den Zusammenhang zwischen Marketingausgaben und Umsatz darstellt.
 
@@ -16,12 +18,11 @@ class PerformanceInsightsTab:
 
         Die lineare Regression funktioniert wie in den bereits dokumentierten Beispielen. (JPG und JE)
         """
-        fig = px.scatter(
+        fig = create_scatter(
             df,
             x="MarketingSpend",
             y="MonthlySalesRevenue",
             color="StoreCategory",  # Farb-Codierung nach StoreCategory, um Unterschiede zwischen Branchen zu zeigen
-            trendline="ols",  # Fügt eine Trendlinie mittels linearer Regression (OLS) hinzu
             title="Marketing Spend vs Revenue",
             labels={
                 "MarketingSpend": "Marketing Spend (in Tausend $)",
@@ -29,33 +30,33 @@ class PerformanceInsightsTab:
             },
             hover_data=["StoreID"]
         )
+        # Fügt eine Trendlinie mittels linearer Regression (OLS) hinzu
+        add_trendlines(fig, df, "MarketingSpend", "MonthlySalesRevenue", "StoreCategory", mode=trendline)
         return fig
 
     @staticmethod
     def create_box_plot_category(df):
         """Erzeugt ein verbessertes Boxplot-Diagramm für den Umsatz nach Geschäftskategorie mit festen Farben. (JE)"""
 
-        # Sortiere Kategorien nach Medianwert
-        category_order = df.groupby("StoreCategory")["MonthlySalesRevenue"].median().sort_values().index
+        # Sortiere Kategorien nach Medianwert (aus den zwischengespeicherten Kennzahlen, die auch create_box zeichnet)
+        statistics, _ = compute_box_statistics(df, "MonthlySalesRevenue", "StoreCategory", "StoreID")
+        category_order = statistics["median"].sort_values().index
 
-        fig = px.box(
+        # Quartile, Whisker und Ausreißer werden auf dem Server berechnet (mehrere Boxplots überlagert)
+        fig = create_box(
             df,
             x="StoreCategory",
             y="MonthlySalesRevenue",
-            color="StoreCategory",
             title="Revenue by Store Category",
             labels={"StoreCategory": "Store Category", "MonthlySalesRevenue": "Revenue"},
-            hover_data=["StoreID"],
-            points="all",  # Zeigt alle Datenpunkte zusätzlich zum Boxplot
-            category_orders={"StoreCategory": category_order},  # Sortiere nach Median
+            hover_column="StoreID",  # Zeigt die extremsten Ausreißer mit StoreID zusätzlich zum Boxplot
+            category_order=category_order,  # Sortiere nach Median
         )
 
-        fig.update_layout(boxmode="overlay")  # Mehrere Boxplots überlagert anzeigen
-
         return fig
 
     @staticmethod
-    def create_scatter_promotions_revenue(df):
+    def create_scatter_promotions_revenue(df, trendline="ols"):
         """
         Erzeugt ein Streudiagramm mit Trendlinie, das den Zusammenhang zwischen PromotionsCount
         (Anzahl der Promotion-Events) und MonthlySalesRevenue (Monatlicher Umsatz) darstellt. (JPG)
@@ -65,12 +66,11 @@ class PerformanceInsightsTab:
         - Farb-Codierung: StoreCategory (zeigt branchenspezifische Unterschiede)
         - Trendlinie: Fügt eine lineare Regressionslinie (OLS) hinzu, um den generellen Trend zu verdeutlichen.
         """
-        fig = px.scatter(
+        fig = create_scatter(
             df,
             x="PromotionsCount",
             y="MonthlySalesRevenue",
             color="StoreCategory",  # Unterscheidung nach StoreCategory
-            trendline="ols",  # Trendlinie als lineare Regression (OLS)
             title="Promotions vs Revenue",
             labels={
                 "PromotionsCount": "Promotions Count (Anzahl der Promotion-Events)",
@@ -78,4 +78,6 @@ class PerformanceInsightsTab:
             },
             hover_data=["StoreID"]
         )
+        # Trendlinie als lineare Regression (OLS)
+        add_trendlines(fig, df, "PromotionsCount", "MonthlySalesRevenue", "StoreCategory", mode=trendline)
         return fig
@@ -1,36 +1,51 @@
-from dash import dcc, html, Input, Output, dash
+from dash import dcc, html, Input, Output, State, dash
+
+from analytics.cache import cached_per_version
+from scripts.store_recommendations import (build_report, check_store_recommendations, evaluate_rules,
+                                          hash_rules_config, load_rules_config, report_query)
+from scripts.store_search import SEARCH_LIMIT, search_query
 
 
 class RecommendationsTab:
     @staticmethod
-    def create_recommendations_section(df, selected_store=None):
-        """Erstellt das Layout für den Recommendations-Tab. (JE und JPG)"""
+    def create_recommendations_section(df, db_connector, selected_store=None):
+        """
+        Erstellt das Layout für den Recommendations-Tab. (JE und JPG)
+        Das Layout für den Standard-Store wird pro Datenversion und Regelstand nur einmal erzeugt.
+        """
         if df is None or df.empty:
             return html.P("🚫 No Data Available.")
 
-        # Store-Optionen für Dropdown erstellen
-        store_options = [{"label": f"Store {store}", "value": store} for store in df["StoreID"].unique()]
+        if selected_store is None:
+            rules_hash = hash_rules_config()  # Dos/Don'ts und Empfehlungen ändern sich auch mit der Regeldatei
+            return cached_per_version(df, f"recommendations-section-{rules_hash}",
+                                      lambda: RecommendationsTab.build_recommendations_section(df, db_connector))
+        return RecommendationsTab.build_recommendations_section(df, db_connector, selected_store)
+
+    @staticmethod
+    def build_recommendations_section(df, db_connector, selected_store=None):
+        """Baut das Layout für den Recommendations-Tab auf. (JE und JPG)"""
 
         # Falls kein Store ausgewählt wurde, wähle den ersten Store als Standard
         if selected_store is None:
-            selected_store = df["StoreID"].iloc[0]
+            selected_store = int(df["StoreID"].iloc[0])
+
+        # Im Layout steht nur der ausgewählte Store, weitere Stores liefert die Suche (search_store_options)
+        store_options = [{"label": f"Store {selected_store}", "value": selected_store}]
 
         top_general_heading = html.H2(
             "Top General Recommendations to Increase Revenue",
             style={"textAlign": "center", "marginBottom": "30px"}
         )
 
+        # Allgemeine Empfehlungen aus der Konfiguration (scripts/recommendation_rules.json)
+        general = load_rules_config()["general"]
+
         # Sektion: Top Dos und Top Don'ts (JPG)
         dos_donts_section = html.Div([
             html.Div([
                 html.H3("✓ Top Dos", style={"textAlign": "center", "color": "#28a745", "marginBottom": "15px"}),
-                html.Ul([
-                    html.Li("✔️ Optimize product variety (see Store Operations)"),
-                    html.Li("✔️ Re-Evaluate your marketing and promotion strategy"),
-                    html.Li("✔️ Increase customer footfall"),
-                    html.Li("✔️ Increase employee efficiency"),
-                    html.Li("✔️ Increase store-size when possible"),
-                ], style={"fontSize": "16px", "lineHeight": "1.5"})
+                html.Ul([html.Li(text) for text in general["dos"]], style={"fontSize": "16px", "lineHeight": "1.5"})
             ], style={
                 "width": "48%",
                 "padding": "10px",
@@ -41,11 +56,7 @@ class RecommendationsTab:
             }),
             html.Div([
                 html.H3("✗ Top Don'ts", style={"textAlign": "center", "color": "#dc3545", "marginBottom": "15px"}),
-                html.Ul([
-                    html.Li("❌ Spend too much on marketing and promotions (unless you know for sure they are useful)"),
-                    html.Li("❌ Fear a short distance to a competitor"),
-                    html.Li("❌ Give up too early"),
-                ], style={"fontSize": "16px", "lineHeight": "1.5"})
+                html.Ul([html.Li(text) for text in general["donts"]], style={"fontSize": "16px", "lineHeight": "1.5"})
             ], style={
                 "width": "48%",
                 "padding": "10px",
@@ -76,72 +87,121 @@ class RecommendationsTab:
                 options=store_options,
                 value=selected_store,  # Standardmäßig erster Store
                 clearable=False,
+                placeholder="Type to search stores",
                 style={"marginBottom": "30px"}
             ),
             html.Div(id="recommendations-content",
-                     children=RecommendationsTab.generate_recommendations(df, selected_store))
+                     children=RecommendationsTab.generate_recommendations(db_connector, selected_store)),
+
+            # Sammelbericht: Empfehlungen aller Stores als CSV herunterladen
+            html.Button("⬇️ Export recommendations for all stores (CSV)", id="export-recommendations-button",
+                        n_clicks=0, style={"marginTop": "30px"}),
+            dcc.Download(id="export-recommendations-download")
         ])
 
     @staticmethod
     def register_callbacks(app, db_connector):
-        """Registriert den Callback für das Dropdown-Menü. (JE)"""
+        """Registriert die Callbacks für das Dropdown-Menü, die Store-Suche und den CSV-Export. (JE)"""
+
+        @app.callback(
+            Output("store-dropdown", "options"),
+            Input("store-dropdown", "search_value"),
+            State("store-dropdown", "value")
+        )
+        def search_store_options(search_value, selected_store):
+            """Liefert die Store-Optionen passend zur Eingabe, einschließlich des ausgewählten Stores."""
+            return RecommendationsTab.search_store_options(db_connector, search_value, selected_store)
 
         @app.callback(
             Output("recommendations-content", "children"),
-            Input("store-dropdown", "value")
+            Input("store-dropdown", "value"),
+            prevent_initial_call=True  # Die Empfehlungen des Standard-Stores sind bereits im Layout enthalten
         )
         def update_recommendations(selected_store):
             """Aktualisiert die Empfehlungen basierend auf dem gewählten Store. (JE)"""
             if not selected_store:
                 raise dash.exceptions.PreventUpdate  # Kein Update, wenn kein Store ausgewählt wurde
 
-            df = db_connector.fetch_data("SELECT * FROM StoreData")
-            if df.empty:
-                return html.P("🚫 No Data Available.")
+            return RecommendationsTab.generate_recommendations(db_connector, selected_store)
 
-            return RecommendationsTab.generate_recommendations(df, selected_store)
+        @app.callback(
+            Output("export-recommendations-download", "data"),
+            Input("export-recommendations-button", "n_clicks"),
+            prevent_initial_call=True
+        )
+        def export_recommendations(n_clicks):
+            """Exportiert die ausgelösten Empfehlungen aller Stores als CSV."""
+            recommendations = RecommendationsTab.get_stale_recommendations(db_connector)
+            if recommendations is None:
+                report = db_connector.fetch_data(report_query())
+            else:
+                report = build_report(db_connector.fetch_store_data(), recommendations.reset_index())
+            return dcc.send_data_frame(report.to_csv, "store_recommendations.csv", index=False, sep=";")
 
     @staticmethod
-    def generate_recommendations(df, selected_store):
-        """Erstellt die Empfehlungen basierend auf dem ausgewählten Store. (JE)"""
-        if df is None or df.empty:
-            return html.P("🚫 No Data Available.")
-
-        # Prüfe, ob der Store existiert
-        if selected_store not in df["StoreID"].values:
-            return html.P("🚫 The selected store does not exist")
-
-        # Daten des ausgewählten Stores abrufen
-        store_data = df.loc[df["StoreID"] == selected_store]
-
-        # Filtere DataFrame, um den gewählten Store auszuschließen
-        df_filtered = df.loc[df["StoreID"] != selected_store]
-
-        # Berechne den Mittelwert aller numerischen Spalten
-        avg_values = df_filtered.mean(numeric_only=True).dropna()
+    def search_store_options(db_connector, search_value, selected_store=None):
+        """
+        Dropdown-Optionen für eine Suche: die ersten SEARCH_LIMIT Stores, deren StoreID, Standort oder Kategorie zur
+        Eingabe passt (Suchindex StoreSearch, siehe scripts/store_search.py), sowie der ausgewählte Store.
+        """
+        selected = [selected_store] if selected_store else []
+        indexed = "StoreSearch" not in db_connector.outdated  # Ohne Index wird StoreData direkt durchsucht
+        stores = db_connector.fetch_data(*search_query(search_value, SEARCH_LIMIT, selected, indexed))
+        return [{"label": f"Store {row.StoreID} ({row.StoreLocation}, {row.StoreCategory})",
+                 "value": int(row.StoreID)} for row in stores.itertuples(index=False)]
 
-        # Generiere spezifische Empfehlungen
-        recommendations = []
-
-        def add_recommendation(column, threshold, message):
-            if column in store_data.columns and column in avg_values:
-                if store_data.iloc[0][column] < avg_values[column] * threshold:
-                    recommendations.append(html.P(message))
-
-        # 🔥 Umsatzsteigerung
-        add_recommendation("MonthlySalesRevenue", 1, "📊 Increase the marketing budget to increase revenue.")
+    @staticmethod
+    def get_stale_recommendations(db_connector):
+        """
+        Liefert None, solange die Tabelle StoreRecommendations aktuell ist (siehe check_store_recommendations).
+        Ist sie veraltet (z. B. nach Änderungen an StoreData oder an den Regeln seit dem letzten
+        scripts/migrate.py), werden die Empfehlungen aller Stores pro Datenversion und Regelstand einmal im Prozess
+        aus dem Snapshot berechnet und nach StoreID indiziert zurückgegeben; das Dashboard selbst schreibt nie in
+        die Datenbank. Bei eingefrorenem Snapshot (siehe Dashboard.preload) wird immer aus dem Snapshot berechnet,
+        damit die Empfehlungen nicht von späteren Änderungen an der Tabelle abhängen.
+        """
+        df = db_connector.fetch_store_data()
+        rules_hash = hash_rules_config()  # Die Regeldatei kann sich ohne neue Datenversion ändern
+
+        def build():
+            if not db_connector.frozen:
+                conn = db_connector.connect()
+                try:
+                    if check_store_recommendations(conn):
+                        return None
+                finally:
+                    conn.close()
+            recommendations = evaluate_rules(df, load_rules_config()["rules"])
+            return recommendations.sort_values(["StoreID", "Priority", "Position"]).set_index("StoreID")
+
+        return cached_per_version(df, f"stale-recommendations-{rules_hash}", build)
 
-        # 🔥 Kundenfrequenz verbessern
-        add_recommendation("CustomerFootfall", 1, "👥 Plan more promotions to increase customer footfall.")
+    @staticmethod
+    def generate_recommendations(db_connector, selected_store):
+        """
+        Erstellt die Empfehlungen basierend auf dem ausgewählten Store. (JE)
+        Die Empfehlungen aller Stores werden vorab im Batch anhand der konfigurierten Regeln berechnet
+        (scripts/store_recommendations.py) und in der Tabelle StoreRecommendations gespeichert. Pro Auswahl wird nur noch über den
+        Primärschlüssel nachgeschlagen, unabhängig von der Anzahl der Stores. Ist die Tabelle veraltet, wird in den
+        im Prozess berechneten Empfehlungen nachgeschlagen (siehe get_stale_recommendations).
+        """
+        stale = RecommendationsTab.get_stale_recommendations(db_connector)
+        if stale is None:
+            recommendations = db_connector.fetch_data(
+                "SELECT Message, Triggered FROM StoreRecommendations WHERE StoreID = ? ORDER BY Priority, Position",
+                params=(int(selected_store),)
+            )
+        else:
+            recommendations = stale.loc[int(selected_store):int(selected_store), ["Message", "Triggered"]]
 
-        # 🔥 Werbeaktionen optimieren
-        add_recommendation("PromotionsCount", 1, "🎯 Use targeted marketing to increase customer footfall.")
+        # Prüfe, ob der Store existiert
+        if recommendations.empty:
+            return html.P("🚫 The selected store does not exist")
 
-        # 🔥 Mitarbeiterschulung verbessern
-        add_recommendation("EmployeeEfficiency", 1, "📚 Optimize employee training to increase efficiency.")
+        messages = recommendations.loc[recommendations["Triggered"] == 1, "Message"].tolist()
 
         # Falls keine spezifischen Empfehlungen notwendig sind
-        if not recommendations:
-            recommendations.append(html.P("✅ The store is above average in all areas!"))
+        if not messages:
+            messages = ["✅ The store is above average in all areas!"]
 
-        return html.Div(recommendations)
+        return html.Div([html.P(message) for message in messages])
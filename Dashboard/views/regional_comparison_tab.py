@@ -2,6 +2,10 @@ import plotly.graph_objects as go  # Detaillierte Schnittstelle zum Erstellen vo
 import plotly.express as px  # Vereinfachte Schnittstelle zum Erstellen von Plotly-Visualisierung
 import math
 
+from analytics.density import create_scatter
+from analytics.rollups import aggregate_rollup
+from analytics.trendlines import add_trendlines
+
 
 class RegionalComparisonTab:
     """ View für Regionale bzw. Standortvergleiche (JPG)"""
@@ -25,17 +29,18 @@ class RegionalComparisonTab:
         return coordinates
 
     @staticmethod
-    def create_map_visualization(df):
-        """Erzeugt die Kartenvisualisierung für die Filialverteilung nach Kategorie und Umsatz."""
+    def create_map_visualization(rollup):
+        """
+        Erzeugt die Kartenvisualisierung für die Filialverteilung nach Kategorie und Umsatz.
+        Anzahl und Durchschnittsumsatz je Stadt und Kategorie stammen aus dem Rollup StoreRollupLocationCategory.
+        """
         regional_comparison = RegionalComparisonTab()  # Instanz der Klasse erstellen
 
-        coordinates = regional_comparison.get_all_coordinates(df)  # Koordinaten für Städte abfragen
+        # Aggregieren der Daten pro Stadt und Kategorie (Spalte StoreID = Anzahl der Stores)
+        city_category_stats = aggregate_rollup(rollup, ['StoreLocation', 'StoreCategory'],
+                                               ['MonthlySalesRevenue']).rename(columns={'StoreCount': 'StoreID'})
 
-        # Aggregieren der Daten pro Stadt und Kategorie
-        city_category_stats = df.groupby(['StoreLocation', 'StoreCategory']).agg({
-            'StoreID': 'count',
-            'MonthlySalesRevenue': 'mean'
-        }).reset_index()
+        coordinates = regional_comparison.get_all_coordinates(city_category_stats)  # Koordinaten für Städte abfragen
 
         # Dictionary für Kategorie-Symbole
         category_symbols = {
@@ -47,7 +52,8 @@ class RegionalComparisonTab:
         map_fig = go.Figure()
         RegionalComparisonTab.add_category_legend(map_fig, category_symbols)
         RegionalComparisonTab.add_city_labels(map_fig, coordinates, city_category_stats)
-        RegionalComparisonTab.add_category_markers(map_fig, df, coordinates, city_category_stats, category_symbols)
+        RegionalComparisonTab.add_category_markers(map_fig, city_category_stats, coordinates, city_category_stats,
+                                                   category_symbols)
 
         map_fig.update_layout(
             title='Store Distribution by Category and Revenue',
@@ -241,9 +247,9 @@ class RegionalComparisonTab:
         return base_lat + lat_offset, base_lon + lon_offset
 
     @staticmethod
-    def create_grouped_bar_chart(df):
-        """Erzeugt ein gruppiertes Balkendiagramm für Umsatz nach Stadt und Kategorie."""
-        df_grouped = df.groupby(["StoreLocation", "StoreCategory"], as_index=False)["MonthlySalesRevenue"].mean()
+    def create_grouped_bar_chart(rollup):
+        """Erzeugt ein gruppiertes Balkendiagramm für Umsatz nach Stadt und Kategorie (aus dem Rollup)."""
+        df_grouped = aggregate_rollup(rollup, ["StoreLocation", "StoreCategory"], ["MonthlySalesRevenue"])
 
         fig = px.bar(
             df_grouped,
@@ -258,26 +264,27 @@ class RegionalComparisonTab:
         return fig
 
     @staticmethod
-    def create_scatter_competitor_revenue(df):
+    def create_scatter_competitor_revenue(df, trendline="ols"):
         """
         Erzeugt ein Scatter-Plot für Competitor Distance vs. Revenue mit festen Farben.
         Dabei werden die Stores anhand ihrer StoreLocation farblich unterschieden. (JE und JPG)
         """
-        fig = px.scatter(
+        fig = create_scatter(
             df,
             x="CompetitorDistance",
             y="MonthlySalesRevenue",
             color="StoreCategory",
-            trendline="ols",
             title="Competitor Distance vs. Revenue",
             labels={"CompetitorDistance": "Competitor Distance", "MonthlySalesRevenue": "Monthly Sales Revenue"}
         )
+        # Trendlinie als lineare Regression (OLS)
+        add_trendlines(fig, df, "CompetitorDistance", "MonthlySalesRevenue", "StoreCategory", mode=trendline)
         return fig
 
     @staticmethod
-    def create_grouped_barchart_footfall(df):
-        """Erzeugt ein gruppiertes Balkendiagramm für Kundenfrequenz nach Stadt und Kategorie."""
-        df_grouped = df.groupby(["StoreLocation", "StoreCategory"], as_index=False)["CustomerFootfall"].mean()
+    def create_grouped_barchart_footfall(rollup):
+        """Erzeugt ein gruppiertes Balkendiagramm für Kundenfrequenz nach Stadt und Kategorie (aus dem Rollup)."""
+        df_grouped = aggregate_rollup(rollup, ["StoreLocation", "StoreCategory"], ["CustomerFootfall"])
 
         fig = px.bar(
             df_grouped,
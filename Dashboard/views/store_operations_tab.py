@@ -1,12 +1,18 @@
+import numpy as np
 import plotly.express as px  # Vereinfachte Schnittstelle zum Erstellen von Plotly-Visualisierung
 import plotly.graph_objects as go
 
+from analytics.density import create_scatter
+from analytics.distributions import create_histogram
+from analytics.frontier import pareto_frontier, select_best_points
+from analytics.trendlines import add_trendlines
+
 
 class StoreOperationsTab:
     """ Klasse für die Visualisierungen im Tab "Store Operations" (JPG und JE) """
 
     @staticmethod
-    def create_scatter_productvariety_revenue(df):
+    def create_scatter_productvariety_revenue(df, trendline="ols"):
         """
         Erzeugt ein Streudiagramm, das den Zusammenhang zwischen Produktvielfalt und Umsatz darstellt. (JPG)
 
@@ -15,12 +21,11 @@ class StoreOperationsTab:
         - Farb-Codierung: StoreCategory (um branchenspezifische Unterschiede hervorzuheben)
         - Trendlinie: Fügt eine lineare Regressionslinie hinzu (OLS), um den Trend visuell zu unterstützen.
         """
-        fig = px.scatter(
+        fig = create_scatter(
             df,
             x="ProductVariety",
             y="MonthlySalesRevenue",
             color="StoreCategory",
-            trendline="ols",  # Trendlinie als lineare Regression (OLS)
             title="Product Variety vs Revenue",
             labels={
                 "ProductVariety": "Product Variety",
@@ -28,10 +33,12 @@ class StoreOperationsTab:
             },
             hover_data=["StoreID"]
         )
+        # Trendlinie als lineare Regression (OLS)
+        add_trendlines(fig, df, "ProductVariety", "MonthlySalesRevenue", "StoreCategory", mode=trendline)
         return fig
 
     @staticmethod
-    def create_scatter_productvariety_efficiency(df):
+    def create_scatter_productvariety_efficiency(df, trendline="ols"):
         """
         Erzeugt ein Streudiagramm mit Trendlinie, das den Zusammenhang zwischen
         der Produktvielfalt (ProductVariety) und der Mitarbeitereffizienz (EmployeeEfficiency) darstellt. (JPG)
@@ -42,12 +49,11 @@ class StoreOperationsTab:
         - Trendlinie: Fügt eine lineare Regressionslinie (OLS) hinzu, die den allgemeinen Trend
           zwischen Produktvielfalt und Effizienz verdeutlicht.
         """
-        fig = px.scatter(
+        fig = create_scatter(
             df,
             x="ProductVariety",
             y="EmployeeEfficiency",
             color="StoreCategory",
-            trendline="ols",  # Fügt eine lineare Regressions-Trendlinie hinzu
             title="Product Variety vs Employee Efficiency",
             labels={
                 "ProductVariety": "Product Variety",
@@ -55,6 +61,8 @@ class StoreOperationsTab:
             },
             hover_data=["StoreID"]
         )
+        # Fügt eine lineare Regressions-Trendlinie hinzu
+        add_trendlines(fig, df, "ProductVariety", "EmployeeEfficiency", "StoreCategory", mode=trendline)
         return fig
 
     @staticmethod
@@ -73,8 +81,12 @@ class StoreOperationsTab:
         Für jede Kategorie wird der "Best Point" separat als Stern markiert.
         Beim Mousehover werden für den Best Point dieselben Informationen angezeigt wie bei den anderen Blasen.
         """
-        # Erstellt den Basis-Bubble Chart mit Plotly Express
-        fig = px.scatter(
+        # Bestimmt je Kategorie in einem gruppierten Durchlauf den Punkt mit maximalem Score
+        # (MonthlySalesRevenue * EmployeeEfficiency)
+        best_points = select_best_points(df, "StoreCategory", ["MonthlySalesRevenue", "EmployeeEfficiency"])
+
+        # Erstellt den Basis-Bubble Chart mit Plotly Express (bei sehr vielen Stores als Dichte-Heatmap)
+        fig = create_scatter(
             df,
             x="ProductVariety",
             y="MonthlySalesRevenue",
@@ -86,55 +98,52 @@ class StoreOperationsTab:
                 "MonthlySalesRevenue": "Monthly Sales Revenue",
                 "EmployeeEfficiency": "Employee Efficiency"
             },
-            hover_data=["StoreID", "EmployeeEfficiency", "StoreCategory"]
+            hover_data=["StoreID", "EmployeeEfficiency", "StoreCategory"],
+            # Beim Ausdünnen großer Datenmengen bleiben die Best Points als Blasen erhalten
+            keep=best_points.index
         )
 
-        # Kopie des DataFrames und Berechnung eines Scores, um den besten Punkt je Kategorie zu bestimmen.
-        df = df.copy()
-        df["score"] = df["MonthlySalesRevenue"] * df["EmployeeEfficiency"]
-
-        # Für jede Kategorie: Bestimmt den Punkt mit maximalem Score
-        for cat in df["StoreCategory"].unique():
-            df_cat = df[df["StoreCategory"] == cat]
-            if not df_cat.empty:
-                best_idx = df_cat["score"].idxmax()
-                best_point = df_cat.loc[best_idx]
-
-                # Erstellt den Hovertext, der die gleichen Informationen enthält wie bei den anderen Bubbles
-                hover_text = (
-                    f"StoreID: {best_point['StoreID']}<br>"
-                    f"Product Variety: {best_point['ProductVariety']}<br>"
-                    f"Monthly Sales Revenue: {best_point['MonthlySalesRevenue']}<br>"
-                    f"Employee Efficiency: {best_point['EmployeeEfficiency']}<br>"
-                    f"StoreCategory: {best_point['StoreCategory']}"
-                )
+        # Fügt für jede Kategorie den Best Point als Stern hinzu
+        for _, best_point in best_points.iterrows():
+            # Erstellt den Hovertext, der die gleichen Informationen enthält wie bei den anderen Bubbles
+            hover_text = (
+                f"StoreID: {best_point['StoreID']}<br>"
+                f"Product Variety: {best_point['ProductVariety']}<br>"
+                f"Monthly Sales Revenue: {best_point['MonthlySalesRevenue']}<br>"
+                f"Employee Efficiency: {best_point['EmployeeEfficiency']}<br>"
+                f"StoreCategory: {best_point['StoreCategory']}"
+            )
 
-                # Fügt den besten Punkt als zusätzlichen Trace hinzu
-                fig.add_trace(
-                    go.Scatter(
-                        x=[best_point["ProductVariety"]],
-                        y=[best_point["MonthlySalesRevenue"]],
-                        mode="markers+text",
-                        marker=dict(
-                            size=best_point["EmployeeEfficiency"] * 0.5,
-                            color="black",
-                            symbol="star"
-                        ),
-                        text=[f"Best {best_point['StoreCategory']}"],
-                        textposition="top center",
-                        name=f"Best {best_point['StoreCategory']}",
-                        hoverinfo="text",
-                        hovertext=[hover_text]
-                    )
+            # Fügt den besten Punkt als zusätzlichen Trace hinzu
+            fig.add_trace(
+                go.Scatter(
+                    x=[best_point["ProductVariety"]],
+                    y=[best_point["MonthlySalesRevenue"]],
+                    mode="markers+text",
+                    marker=dict(
+                        size=best_point["EmployeeEfficiency"] * 0.5,
+                        color="black",
+                        symbol="star"
+                    ),
+                    text=[f"Best {best_point['StoreCategory']}"],
+                    textposition="top center",
+                    name=f"Best {best_point['StoreCategory']}",
+                    hoverinfo="text",
+                    hovertext=[hover_text]
                 )
+            )
 
         return fig
 
     @staticmethod
     def create_bubble_chart_operations(df):
         """Erzeugt das Blasendiagramm für Filialgröße, Effizienz und Umsatz, inklusive Hervorhebung des Best Point je Kategorie. (JE)"""
-        # Erstellt den Basis-Bubble Chart mit Plotly Express
-        fig = px.scatter(
+        # Bestimmt je StoreCategory in einem gruppierten Durchlauf den Punkt mit dem höchsten Score.
+        # Hier wird als Score das Produkt aus MonthlySalesRevenue und EmployeeEfficiency verwendet.
+        best_points = select_best_points(df, "StoreCategory", ["MonthlySalesRevenue", "EmployeeEfficiency"])
+
+        # Erstellt den Basis-Bubble Chart mit Plotly Express (bei sehr vielen Stores als Dichte-Heatmap)
+        fig = create_scatter(
             df,
             x="StoreSize",
             y="MonthlySalesRevenue",
@@ -146,52 +155,44 @@ class StoreOperationsTab:
                 "MonthlySalesRevenue": "Revenue",
                 "EmployeeEfficiency": "Efficiency"
             },
-            hover_data=["StoreID", "EmployeeEfficiency", "StoreCategory"]
+            hover_data=["StoreID", "EmployeeEfficiency", "StoreCategory"],
+            # Beim Ausdünnen großer Datenmengen bleiben die Best Points als Blasen erhalten
+            keep=best_points.index
         )
 
-        # Kopiert den DataFrame und berechne einen Score, um den besten Punkt je Kategorie zu ermitteln.
-        # Hier wird als Score das Produkt aus MonthlySalesRevenue und EmployeeEfficiency verwendet.
-        df_copy = df.copy()
-        df_copy["score"] = df_copy["MonthlySalesRevenue"] * df_copy["EmployeeEfficiency"]
-
-        # Für jede StoreCategory: Bestimme den Punkt mit dem höchsten Score
-        for cat in df_copy["StoreCategory"].unique():
-            df_cat = df_copy[df_copy["StoreCategory"] == cat]
-            if not df_cat.empty:
-                best_idx = df_cat["score"].idxmax()
-                best_point = df_cat.loc[best_idx]
-
-                # Erstellt den Hovertext, der dieselben Informationen enthält wie bei den übrigen Bubbles
-                hover_text = (
-                    f"StoreID: {best_point['StoreID']}<br>"
-                    f"Store Size: {best_point['StoreSize']}<br>"
-                    f"Revenue: {best_point['MonthlySalesRevenue']}<br>"
-                    f"Efficiency: {best_point['EmployeeEfficiency']}<br>"
-                    f"StoreCategory: {best_point['StoreCategory']}"
-                )
+        # Fügt für jede StoreCategory den Best Point als Stern hinzu
+        for _, best_point in best_points.iterrows():
+            # Erstellt den Hovertext, der dieselben Informationen enthält wie bei den übrigen Bubbles
+            hover_text = (
+                f"StoreID: {best_point['StoreID']}<br>"
+                f"Store Size: {best_point['StoreSize']}<br>"
+                f"Revenue: {best_point['MonthlySalesRevenue']}<br>"
+                f"Efficiency: {best_point['EmployeeEfficiency']}<br>"
+                f"StoreCategory: {best_point['StoreCategory']}"
+            )
 
-                # Fügt den Best Point als zusätzlichen Trace hinzu
-                fig.add_trace(
-                    go.Scatter(
-                        x=[best_point["StoreSize"]],
-                        y=[best_point["MonthlySalesRevenue"]],
-                        mode="markers+text",
-                        marker=dict(
-                            size=best_point["EmployeeEfficiency"] * 0.5,
-                            color="black",
-                            symbol="star"
-                        ),
-                        text=[f"Best {best_point['StoreCategory']}"],
-                        textposition="top center",
-                        name=f"Best {best_point['StoreCategory']}",
-                        hoverinfo="text",
-                        hovertext=[hover_text]
-                    )
+            # Fügt den Best Point als zusätzlichen Trace hinzu
+            fig.add_trace(
+                go.Scatter(
+                    x=[best_point["StoreSize"]],
+                    y=[best_point["MonthlySalesRevenue"]],
+                    mode="markers+text",
+                    marker=dict(
+                        size=best_point["EmployeeEfficiency"] * 0.5,
+                        color="black",
+                        symbol="star"
+                    ),
+                    text=[f"Best {best_point['StoreCategory']}"],
+                    textposition="top center",
+                    name=f"Best {best_point['StoreCategory']}",
+                    hoverinfo="text",
+                    hovertext=[hover_text]
                 )
+            )
         return fig
 
     @staticmethod
-    def create_scatter_customerfootfall_efficiency(df):
+    def create_scatter_customerfootfall_efficiency(df, trendline="ols"):
         """
         Erzeugt ein Streudiagramm mit Trendlinie, das den Zusammenhang zwischen CustomerFootfall
         (Anzahl der Kundenbesuche) und EmployeeEfficiency (Mitarbeitereffizienz) untersucht. (JPG)
@@ -201,12 +202,11 @@ class StoreOperationsTab:
         - Farb-Codierung: StoreCategory (zeigt branchenspezifische Unterschiede)
         - Trendlinie: Fügt eine lineare Regression (OLS) hinzu, die den generellen Trend in der Beziehung veranschaulicht.
         """
-        fig = px.scatter(
+        fig = create_scatter(
             df,
             x="CustomerFootfall",
             y="EmployeeEfficiency",
             color="StoreCategory",  # Unterscheidung der Datenpunkte nach StoreCategory
-            trendline="ols",  # Trendlinie als lineare Regression (OLS)
             title="Customer Footfall vs Employee Efficiency",
             labels={
                 "CustomerFootfall": "Customer Footfall",
@@ -214,14 +214,124 @@ class StoreOperationsTab:
             },
             hover_data=["StoreID"]
         )
+        # Trendlinie als lineare Regression (OLS)
+        add_trendlines(fig, df, "CustomerFootfall", "EmployeeEfficiency", "StoreCategory", mode=trendline)
         return fig
 
     @staticmethod
     def create_histogram_efficiency(df):
         """Erzeugt das Histogramm für die Verteilung der Mitarbeitereffizienz. (JE)"""
-        return px.histogram(
+        # Die Bins werden auf dem Server berechnet, sodass die Antwort unabhängig von der Anzahl der Stores ist
+        return create_histogram(
             df, x="EmployeeEfficiency",
             title="Employee Efficiency Distribution",
-            labels={"EmployeeEfficiency": "Efficiency"},
+            labels={"EmployeeEfficiency": "Efficiency"}
+        )
+
+    @staticmethod
+    def create_pareto_frontier(df):
+        """
+        Erzeugt ein Streudiagramm von EmployeeEfficiency und MonthlySalesRevenue mit der Pareto-Front je
+        StoreCategory: alle Stores, die von keinem anderen Store derselben Kategorie in Umsatz und Effizienz
+        zugleich übertroffen werden. Anders als der einzelne Best Point zeigt die Front alle sinnvollen
+        Kompromisse zwischen beiden Zielen.
+
+        - X-Achse: EmployeeEfficiency
+        - Y-Achse: MonthlySalesRevenue
+        - Farbkodierung: StoreCategory (Stores blass, die Front als Treppenlinie mit Markern)
+
+        Die Front wird mit einem Sortierlauf über alle Kategorien bestimmt (siehe analytics/frontier.py).
+        """
+        fig = create_scatter(
+            df,
+            x="EmployeeEfficiency",
+            y="MonthlySalesRevenue",
+            color="StoreCategory",
+            opacity=0.3,
+            title="Pareto Frontier of Revenue and Efficiency per Category",
+            labels={
+                "EmployeeEfficiency": "Employee Efficiency",
+                "MonthlySalesRevenue": "Monthly Sales Revenue"
+            },
             hover_data=["StoreID"]
         )
+
+        # Farbe der Front wie die der Stores derselben Kategorie (im Dichte-Modus die Standardfarben)
+        colors = {trace.name: trace.marker.color for trace in fig.data if trace.type in ("scatter", "scattergl")}
+        palette = px.colors.qualitative.Plotly
+
+        front = pareto_frontier(df, "EmployeeEfficiency", "MonthlySalesRevenue", "StoreCategory")
+        for k, (category, stores) in enumerate(front.groupby("StoreCategory", sort=False)):
+            fig.add_trace(
+                go.Scatter(
+                    x=stores["EmployeeEfficiency"],
+                    y=stores["MonthlySalesRevenue"],
+                    mode="lines+markers",
+                    line=dict(shape="vh", width=2, color=colors.get(category, palette[k % len(palette)])),
+                    marker=dict(size=8, symbol="diamond"),
+                    name=f"Pareto {category}",
+                    customdata=stores["StoreID"],
+                    hovertemplate=(
+                        f"<b>Pareto {category}</b><br>StoreID: %{{customdata}}<br>"
+                        "Employee Efficiency: %{x}<br>Monthly Sales Revenue: %{y}<extra></extra>"
+                    )
+                )
+            )
+        return fig
+
+    @staticmethod
+    def create_segment_bubble_chart(df, segmentation):
+        """
+        Erzeugt einen Bubble Chart von StoreSize, MonthlySalesRevenue und EmployeeEfficiency, eingefärbt nach dem
+        Segment jedes Stores (Mini-Batch-k-Means auf allen standardisierten numerischen Merkmalen, siehe
+        analytics/segmentation.py). Segment 1 ist das Segment mit dem höchsten mittleren Umsatz.
+        """
+        names = np.array(segmentation["names"] + ["Unassigned"])
+        stores = df[["StoreID", "StoreSize", "MonthlySalesRevenue", "EmployeeEfficiency"]].assign(
+            Segment=names[segmentation["labels"]])  # Label -1 (fehlende Werte) wird zu "Unassigned"
+
+        return create_scatter(
+            stores,
+            x="StoreSize",
+            y="MonthlySalesRevenue",
+            size="EmployeeEfficiency",
+            color="Segment",
+            category_orders={"Segment": list(names)},
+            title="Store Segments (Mini-Batch k-Means)",
+            labels={
+                "StoreSize": "Store Size",
+                "MonthlySalesRevenue": "Revenue",
+                "EmployeeEfficiency": "Efficiency"
+            },
+            hover_data=["StoreID"]
+        )
+
+    @staticmethod
+    def create_segment_kpi_table(df, segmentation):
+        """
+        Erzeugt eine Tabelle mit den Kennzahlen je Segment: Anzahl und Anteil der Stores, häufigste
+        StoreCategory sowie die Mittelwerte der wichtigsten Kennzahlen.
+        """
+        labels = segmentation["labels"]
+        assigned = labels >= 0
+        kpis = ["MonthlySalesRevenue", "EmployeeEfficiency", "CustomerFootfall", "StoreSize", "MarketingSpend"]
+
+        counts = np.bincount(labels[assigned], minlength=len(segmentation["names"]))
+        means = df.loc[assigned, kpis].groupby(labels[assigned]).mean().reindex(range(len(counts)))
+        top_category = df.loc[assigned, "StoreCategory"].groupby(labels[assigned]).agg(
+            lambda categories: categories.mode().iloc[0] if categories.notna().any() else "-")
+
+        columns = ["Segment", "Stores", "Share", "Top Category"] + kpis
+        values = [
+            segmentation["names"],
+            [f"{count:,}" for count in counts],
+            [f"{count / max(counts.sum(), 1):.1%}" for count in counts],
+            top_category.reindex(range(len(counts))).fillna("-").tolist(),
+        ] + [[f"{value:,.1f}" for value in means[kpi]] for kpi in kpis]
+
+        fig = go.Figure(go.Table(
+            header=dict(values=columns, fill_color="#e0e0e0", align="left"),
+            cells=dict(values=values, align="left"),
+        ))
+        fig.update_layout(title="Segment KPIs", height=120 + 30 * len(counts), margin=dict(t=50, b=10))
+        return fig
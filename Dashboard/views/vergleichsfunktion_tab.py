@@ -1,205 +1,280 @@
+import numpy as np
+import pandas as pd
 import plotly.graph_objects as go
 from dash import dcc, html
 
+from analytics.cache import cached_per_version
+from analytics.peers import DEFAULT_PEERS, find_peers, get_peer_index
+from scripts.store_search import SEARCH_LIMIT, search_query
+
+
+# Dropdown values of categories are prefixed, since StoreIDs are numbers and regions are plain names
+CATEGORY_PREFIX = "category:"
+
+# Columns of the stats index: selection type -> grouping column
+GROUPS = {"stores": "StoreID", "regions": "StoreLocation", "categories": "StoreCategory"}
+
+# Maximum number of stores/regions/categories compared at once
+MAX_SELECTIONS = 50
+
 
 # Comparison function (DM - Davronbek Mavlonov)
 class VergleichsfunktionTab:
-    """Tab for comparing two stores or regions across multiple metrics. (DM)"""
+    """Tab for comparing stores, regions or categories across multiple metrics. (DM)"""
 
     def __init__(self, db_connector):
         self.db_connector = db_connector
 
     def fetch_store_data(self):
         """Fetch store data from the database."""
-        query = "SELECT * FROM StoreData"
-        df = self.db_connector.fetch_data(query)
-        return df
+        return self.db_connector.fetch_store_data()
 
     def create_comparison_section(self):
-        """Creates the layout for store/region comparison."""
+        """Creates the layout for the store/region/category comparison."""
         df = self.fetch_store_data()
         if df.empty:
             return html.Div("Error: No data available in StoreData.")
 
-        # Separate regions and stores
-        unique_locations = df["StoreLocation"].dropna().unique()
-        unique_stores = df[["StoreID", "StoreLocation", "StoreCategory"]].drop_duplicates()
-
-        # Prepare dropdowns
-        location_options = [{"label": f"Region: {loc}", "value": loc} for loc in unique_locations]
-        store_options = [{"label": f"Store {row['StoreID']} ({row['StoreLocation']}, {row['StoreCategory']})",
-                          "value": row['StoreID']}
-                         for _, row in unique_stores.iterrows()]
-
-        # Merge stores and regions into the dropdown
-        dropdown_options = store_options + location_options
+        # Regions and categories are few and embedded in the layout; stores are served by the search callbacks
+        group_options = self.get_group_options(df)
 
         # Metrics dropdown
         metrics = [col for col in df.columns if col not in ["StoreID", "StoreLocation", "StoreCategory"]]
         metric_options = [{"label": metric, "value": metric} for metric in metrics]
 
         return html.Div([
-            html.H3("Compare Two Stores or Regions"),
-            html.Label("Select First Store or Region:"),
-            dcc.Dropdown(id="compare-first", options=dropdown_options, placeholder="Select first", searchable=True),
-            html.Label("Select Second Store or Region:"),
-            dcc.Dropdown(id="compare-second", options=dropdown_options, placeholder="Select second", searchable=True),
+            html.H3("Compare Stores, Regions or Categories"),
+            html.Label(f"Select 2 to {MAX_SELECTIONS} Stores, Regions or Categories:"),
+            dcc.Dropdown(id="compare-selections", options=group_options, placeholder="Type to search stores/regions",
+                         searchable=True, multi=True),
             html.Label("Select Metrics for Comparison:"),
             dcc.Dropdown(id="compare-metrics", options=metric_options, placeholder="Select metrics", multi=True),
             html.Button("Compare", id="compare-button", n_clicks=0),
             html.Div(id="comparison-output"),
             dcc.Graph(id="comparison-bar-chart"),
-            dcc.Graph(id="comparison-pie-chart")
+            dcc.Graph(id="comparison-pie-chart"),
+
+            # Peer group finder: k most similar stores from a KD-tree over the standardized features
+            html.H3("Find Similar Stores"),
+            html.Label("Select Store:"),
+            dcc.Dropdown(id="peer-store", options=[], placeholder="Type to search stores", searchable=True),
+            html.Label("Number of Peers:"),
+            dcc.Input(id="peer-count", type="number", min=1, max=100, step=1, value=DEFAULT_PEERS),
+            html.Button("Find Peers", id="peer-button", n_clicks=0),
+            html.Div(id="peer-output"),
+            dcc.Graph(id="peer-comparison-chart")
         ])
 
-    def generate_comparison_metrics(self, df, first, second, metrics):
-        """Generates comparison results between two selected stores or regions."""
-
-        # Check if the selection is a StoreID (number) or a Region (string)
-        first_is_store = isinstance(first, int) or str(first).isdigit()
-        second_is_store = isinstance(second, int) or str(second).isdigit()
-
-        if first_is_store:
-            first_data = df[df["StoreID"] == int(first)]  # Filter by StoreID
-        else:
-            first_data = df[df["StoreLocation"] == first]  # Filter by StoreLocation
-
-        if second_is_store:
-            second_data = df[df["StoreID"] == int(second)]  # Filter by StoreID
-        else:
-            second_data = df[df["StoreLocation"] == second]  # Filter by StoreLocation
-
-        if first_data.empty or second_data.empty:
-            return html.Div("Error: No data available for one or both of the selected stores or regions.")
-
-        # Ensure all metrics exist in the DataFrame
-        available_metrics = [m for m in metrics if m in df.columns]
+    @staticmethod
+    def get_group_options(df):
+        """Dropdown options for all regions and categories, built once per data version."""
+        def build():
+            location_options = [{"label": f"Region: {loc}", "value": loc}
+                                for loc in df["StoreLocation"].dropna().unique()]
+            category_options = [{"label": f"Category: {cat}", "value": f"{CATEGORY_PREFIX}{cat}"}
+                                for cat in df["StoreCategory"].dropna().unique()]
+            return location_options + category_options
+
+        return cached_per_version(df, "comparison-group-options", build)
+
+    def search_store_options(self, search_value, selected=()):
+        """
+        Store options for a search in a dropdown: the first SEARCH_LIMIT stores matching search_value in the
+        StoreSearch full-text index (scripts/store_search.py), plus the selected stores so their labels stay visible.
+        """
+        indexed = "StoreSearch" not in self.db_connector.outdated  # Without the index, StoreData is searched directly
+        stores = self.db_connector.fetch_data(*search_query(search_value, SEARCH_LIMIT, selected, indexed))
+        return [{"label": f"Store {row.StoreID} ({row.StoreLocation}, {row.StoreCategory})",
+                 "value": int(row.StoreID)} for row in stores.itertuples(index=False)]
+
+    def search_comparison_options(self, search_value, selections=()):
+        """
+        Options of the comparison dropdown for a search: regions and categories whose label contains every
+        search word, followed by the matching stores. Selected regions, categories and stores are always kept.
+        """
+        words = (search_value or "").lower().split()
+        group_options = [option for option in self.get_group_options(self.fetch_store_data())
+                         if option["value"] in selections or all(word in option["label"].lower() for word in words)]
+        stores = [selection for selection in selections if isinstance(selection, int) or str(selection).isdigit()]
+        return group_options + self.search_store_options(search_value, stores)
+
+    @staticmethod
+    def get_stats_index(df):
+        """
+        Builds the stats index used by all comparison outputs, once per data version: per StoreID,
+        StoreLocation and StoreCategory the sums and non-missing counts of every numeric metric, plus labels.
+        Resolving any number of selections afterwards is a dictionary lookup each instead of a filter over
+        the whole table.
+        """
+        def build():
+            metrics = [col for col in df.select_dtypes("number").columns if col != "StoreID"]
+            index = {"metrics": metrics}
+            for key, column in GROUPS.items():
+                grouped = df.groupby(column, sort=False)
+                sums = grouped[metrics].sum()
+                counts = grouped[metrics].count()
+                info = df[["StoreLocation", "StoreCategory"]].groupby(df[column], sort=False).first()
+                index[key] = {
+                    "positions": {value: i for i, value in enumerate(sums.index.tolist())},
+                    "sums": sums.to_numpy(dtype=float),
+                    "counts": counts.to_numpy(dtype=float),
+                    "locations": info["StoreLocation"].tolist(),
+                    "categories": info["StoreCategory"].tolist(),
+                }
+            return index
+
+        return cached_per_version(df, "comparison-stats-index", build)
+
+    def resolve_selections(self, df, selections):
+        """
+        Looks up stores (StoreID), regions (StoreLocation) and categories ("category:<StoreCategory>") in the
+        stats index. Returns one dict per selection with label, category, mean and sum (pandas Series over all
+        numeric metrics), or None for selections that match nothing.
+        """
+        index = self.get_stats_index(df)
+        resolved = []
+        for selection in selections:
+            if isinstance(selection, str) and selection.startswith(CATEGORY_PREFIX):
+                kind, key = "categories", selection[len(CATEGORY_PREFIX):]
+            elif isinstance(selection, int) or str(selection).isdigit():
+                kind, key = "stores", int(selection)
+            else:
+                kind, key = "regions", selection
+
+            group = index[kind]
+            position = group["positions"].get(key)
+            if position is None:
+                resolved.append(None)
+                continue
+
+            sums, counts = group["sums"][position], group["counts"][position]
+            with np.errstate(invalid="ignore", divide="ignore"):
+                mean = sums / counts  # Same as mean(skipna=True): NaN if a metric has no values
+            if kind == "stores":
+                category = group["categories"][position]
+                label = f"Store {key} ({group['locations'][position]}, {category})"
+            elif kind == "regions":
+                category, label = "Multiple Categories", f"Region: {key}"
+            else:
+                category, label = key, f"Category: {key}"
+            resolved.append({
+                "label": label,
+                "category": category,
+                "mean": pd.Series(mean, index=index["metrics"]),
+                "sum": pd.Series(sums, index=index["metrics"]),
+            })
+        return resolved
+
+    def generate_comparison_metrics(self, df, selections, metrics):
+        """Generates comparison results between the selected stores, regions or categories."""
+        resolved = self.resolve_selections(df, selections)
+
+        if not resolved or any(stats is None for stats in resolved):
+            return html.Div("Error: No data available for one or more of the selected stores or regions.")
+
+        # Ensure all metrics exist in the stats index
+        available_metrics = [m for m in metrics if m in resolved[0]["mean"].index]
 
         if not available_metrics:
             return html.Div("Error: No valid metrics selected.")
 
-        # Compute the mean for comparison (handling missing values)
-        first_avg = first_data[available_metrics].mean(skipna=True)
-        second_avg = second_data[available_metrics].mean(skipna=True)
-
-        # Generate comparison results
-        first_category = (
-            first_data["StoreCategory"].iloc[
-                0] if first_is_store and "StoreCategory" in first_data.columns else "Multiple Categories"
-        )
-        second_category = (
-            second_data["StoreCategory"].iloc[
-                0] if second_is_store and "StoreCategory" in second_data.columns else "Multiple Categories"
-        )
-
-        comparison_result = [
-            html.Li(
-                f"{metric}: {first_avg[metric]:.2f} vs. {second_avg[metric]:.2f} → "
-                f"{'Higher in First' if first_avg[metric] > second_avg[metric] else 'Higher in Second'} "
-                f"({first_category} vs. {second_category})"
-            )
-            for metric in available_metrics
-        ]
+        categories = " vs. ".join(str(stats["category"]) for stats in resolved)
+        comparison_result = []
+        for metric in available_metrics:
+            values = [stats["mean"][metric] for stats in resolved]
+            highest = resolved[int(np.nanargmax(values))]["label"] if not np.isnan(values).all() else "n/a"
+            comparison_result.append(html.Li(
+                f"{metric}: {' vs. '.join(f'{value:.2f}' for value in values)} → Highest: {highest} "
+                f"({categories})"
+            ))
 
         return html.Ul(comparison_result)
 
     # bar chart
-    def create_comparison_bar_chart(self, df, first, second, metrics):
+    def create_comparison_bar_chart(self, df, selections, metrics):
         """Creates a grouped bar chart for selected metrics."""
+        resolved = self.resolve_selections(df, selections)
 
-        # Check if selection is a StoreID or Region
-        first_is_store = isinstance(first, int) or str(first).isdigit()
-        second_is_store = isinstance(second, int) or str(second).isdigit()
-
-        if first_is_store:
-            first_data = df[df["StoreID"] == int(first)]
-            first_category = first_data["StoreCategory"].iloc[0] if "StoreCategory" in first_data.columns else "Unknown"
-            first_label = f"Store {int(first)} ({first_data['StoreLocation'].iloc[0]}, {first_category})"
-        else:
-            first_data = df[df["StoreLocation"] == first]
-            first_label = f"Region: {first}"
-
-        if second_is_store:
-            second_data = df[df["StoreID"] == int(second)]
-            second_category = second_data["StoreCategory"].iloc[
-                0] if "StoreCategory" in second_data.columns else "Unknown"
-            second_label = f"Store {int(second)} ({second_data['StoreLocation'].iloc[0]}, {second_category})"
-        else:
-            second_data = df[df["StoreLocation"] == second]
-            second_label = f"Region: {second}"
-
-        if first_data.empty or second_data.empty:
+        if not resolved or any(stats is None for stats in resolved):
             return go.Figure(layout={"title": "No data available"})
 
-        # Ensure all selected metrics exist in the DataFrame
-        available_metrics = [m for m in metrics if m in df.columns]
+        # Ensure all selected metrics exist in the stats index
+        available_metrics = [m for m in metrics if m in resolved[0]["mean"].index]
 
         if not available_metrics:
             return go.Figure(layout={"title": "No valid metrics selected"})
 
-        first_avg = first_data[available_metrics].mean(skipna=True)
-        second_avg = second_data[available_metrics].mean(skipna=True)
+        labels = [stats["label"] for stats in resolved]
 
         # Create bar chart
         fig = go.Figure()
         for metric in available_metrics:
-            fig.add_trace(go.Bar(x=[first_label, second_label], y=[first_avg[metric], second_avg[metric]], name=metric))
+            fig.add_trace(go.Bar(x=labels, y=[stats["mean"][metric] for stats in resolved], name=metric))
 
         fig.update_layout(
             title="Metric Comparison",
             barmode="group",
-            xaxis_title="Store/Region",
+            xaxis_title="Store/Region/Category",
             yaxis_title="Metric Value"
         )
         return fig
 
     # pie chart
-    def create_comparison_pie_chart(self, df, first, second):
-        """Creates a pie chart comparing total revenue of the two selections."""
-
-        # Check if selection is a StoreID or Region
-        first_is_store = isinstance(first, int) or str(first).isdigit()
-        second_is_store = isinstance(second, int) or str(second).isdigit()
-
-        if first_is_store:
-            first_data = df[df["StoreID"] == int(first)]
-        else:
-            first_data = df[df["StoreLocation"] == first]
+    def create_comparison_pie_chart(self, df, selections):
+        """Creates a pie chart comparing total revenue of the selections."""
+        resolved = self.resolve_selections(df, selections)
 
-        if second_is_store:
-            second_data = df[df["StoreID"] == int(second)]
-        else:
-            second_data = df[df["StoreLocation"] == second]
-
-        if first_data.empty or second_data.empty:
+        if not resolved or any(stats is None for stats in resolved):
             return go.Figure(layout={"title": "No data available"})
 
         # Ensure "MonthlySalesRevenue" exists
-        if "MonthlySalesRevenue" not in df.columns:
+        if "MonthlySalesRevenue" not in resolved[0]["sum"].index:
             return go.Figure(layout={"title": "Revenue data not available"})
 
-        revenue_first = first_data["MonthlySalesRevenue"].sum()
-        revenue_second = second_data["MonthlySalesRevenue"].sum()
-
-        # Generate labels including category
-        if first_is_store:
-            first_category = first_data["StoreCategory"].iloc[0] if "StoreCategory" in first_data.columns else "Unknown"
-            first_label = f"Store {int(first)} ({first_data['StoreLocation'].iloc[0]}, {first_category})"
-        else:
-            first_label = f"Region: {first}"
-
-        if second_is_store:
-            second_category = second_data["StoreCategory"].iloc[
-                0] if "StoreCategory" in second_data.columns else "Unknown"
-            second_label = f"Store {int(second)} ({second_data['StoreLocation'].iloc[0]}, {second_category})"
-        else:
-            second_label = f"Region: {second}"
-
-        # Jetzt erst die Umsatzdaten berechnen
-        revenue_first, revenue_second = first_data["MonthlySalesRevenue"].sum(), second_data[
-            "MonthlySalesRevenue"].sum()
-
-        labels = [first_label, second_label]
-        fig = go.Figure(data=[go.Pie(labels=labels, values=[revenue_first, revenue_second], hole=0.4)])
-        fig.update_layout(title="Revenue Distribution Between Selected Stores/Regions")
+        labels = [stats["label"] for stats in resolved]
+        revenues = [stats["sum"]["MonthlySalesRevenue"] for stats in resolved]
+        fig = go.Figure(data=[go.Pie(labels=labels, values=revenues, hole=0.4)])
+        fig.update_layout(title="Revenue Distribution Between Selected Stores/Regions/Categories")
         return fig
+
+    # peer group
+    def create_peer_comparison(self, df, store_id, k=DEFAULT_PEERS):
+        """
+        Finds the k most similar stores to store_id and compares the store against the peer group's averages.
+        Returns the list of peers and a bar chart of the relative deviation from the peer average per feature.
+        """
+        peers = find_peers(df, store_id, k)
+        if peers is None:
+            return html.Div("Error: The selected store has missing values or does not exist."), go.Figure()
+        if peers.empty:
+            return html.Div("Error: Not enough stores to build a peer group."), go.Figure()
+
+        # find_peers has succeeded, so the store is in the (cached) peer index: O(1) lookup instead of a full scan
+        index = get_peer_index(df)
+        store = df.iloc[index["rows"][index["positions"][store_id]]]
+        features = [column for column in peers.columns
+                    if column not in ["StoreID", "StoreLocation", "StoreCategory", "Distance"]
+                    and column in df.select_dtypes("number").columns]
+        peer_avg = peers[features].mean()
+        deviation = (store[features].astype(float) / peer_avg.replace(0, float("nan")) - 1) * 100
+
+        peer_list = html.Ul([
+            html.Li(f"Store {row['StoreID']} ({row['StoreLocation']}, {row['StoreCategory']}) - "
+                    f"distance {row['Distance']:.2f}")
+            for _, row in peers.iterrows()
+        ])
+
+        fig = go.Figure(go.Bar(
+            x=features,
+            y=deviation.round(1),
+            marker_color=["#28a745" if value >= 0 else "#dc3545" for value in deviation.fillna(0)],
+            customdata=list(zip(store[features], peer_avg)),
+            hovertemplate="%{x}: %{y:.1f}%<br>Store: %{customdata[0]:.2f}<br>Peer Avg: %{customdata[1]:.2f}"
+                          "<extra></extra>",
+        ))
+        fig.update_layout(
+            title=f"Store {store_id} vs. Average of its {len(peers)} Most Similar Stores",
+            xaxis_title="Metric",
+            yaxis_title="Deviation from Peer Average (%)"
+        )
+        return html.Div([html.H4(f"Peer Group of Store {store_id}"), peer_list]), fig
@@ -0,0 +1,43 @@
+"""
+WSGI-Einstiegspunkt für den Produktivbetrieb des Dashboards mit einem Multi-Worker-Server.
+
+Beispiel (aus dem Ordner Dashboard/):
+    gunicorn -c gunicorn.conf.py "wsgi:create_app()"
+
+Mit preload_app (Standard in gunicorn.conf.py) wird create_app() einmalig im Master-Prozess ausgeführt.
+Die Daten werden dabei als eingefrorener Snapshot geladen und von allen Workern nach dem Fork
+per Copy-on-Write gemeinsam genutzt. Neue Daten werden erst nach einem vollständigen Neustart von gunicorn
+übernommen: Ein Reload (SIGHUP) startet nur die Worker neu, die vorab geladene App im Master bleibt unverändert.
+Sollen Reloads neue Daten laden, DASHBOARD_PRELOAD=0 setzen; dann lädt jeder Worker beim Start seinen eigenen
+Snapshot.
+
+Die Top-/Flop-Listen und die Store-Suche werden auch bei eingefrorenem Snapshot live aus der Datenbank gelesen
+(siehe Dashboard.preload) und können nach Änderungen an StoreData bis zum Neustart von den übrigen Seiten abweichen.
+"""
+import os
+import sys
+
+DASHBOARD_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(DASHBOARD_DIR)
+
+# Dashboard.py importiert sowohl "views" (Dashboard/) als auch "scripts" (Projektordner)
+for path in (ROOT_DIR, DASHBOARD_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from Dashboard import Dashboard  # noqa: E402
+
+DEFAULT_DB_PATH = os.path.join(ROOT_DIR, "scripts", "Database.db")
+
+
+def create_app(db_path=None, preload=True):
+    """
+    App-Factory: Erstellt das Dashboard und gibt die Flask-WSGI-App zurück.
+
+    :param db_path: Pfad zur SQLite-Datenbank (Standard: Umgebungsvariable DASHBOARD_DB_PATH bzw. scripts/Database.db).
+    :param preload: Lädt die Daten vorab in einen eingefrorenen Snapshot, der zwischen den Workern geteilt wird.
+    """
+    dashboard = Dashboard(db_path or os.environ.get("DASHBOARD_DB_PATH", DEFAULT_DB_PATH))
+    if preload:
+        dashboard.preload()
+    return dashboard.app.server
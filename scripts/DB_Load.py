@@ -2,6 +2,13 @@ import sqlite3
 import pandas as pd
 import os
 
+from store_changes import build_store_changes
+from store_leaderboard import ensure_store_leaderboard
+from store_recommendations import build_store_recommendations
+from store_rollups import build_store_rollups
+from store_search import build_store_search
+from store_statistics import build_store_statistics
+
 # Datenbank- und CSV-Dateipfade
 DB_PATH = "Database.db"
 CSV_PATH = "../data/Store_CA Überarbeitet.csv"  # Falls CSV woanders liegt, hier anpassen
@@ -101,3 +108,9 @@ if __name__ == "__main__":
     create_database()  # Erstellt die Datenbank
     create_table()  # Erstellt die Tabelle
     insert_data_from_csv()  # Lädt die CSV-Daten in die DB
+    build_store_changes(DB_PATH)  # Protokolliert ab jetzt alle Änderungen an StoreData
+    build_store_recommendations(DB_PATH)  # Berechnet die Empfehlungen für alle Stores vor
+    build_store_statistics(DB_PATH)  # Legt die Statistiken an, die danach per Trigger fortgeschrieben werden
+    build_store_search(DB_PATH)  # Legt den Suchindex der Store-Dropdowns an (ebenfalls per Trigger fortgeschrieben)
+    build_store_rollups(DB_PATH)  # Legt die Rollups nach Standort/Kategorie und Promotions an (ebenfalls per Trigger)
+    ensure_store_leaderboard(DB_PATH)  # Legt die Umsatz-Indizes für die Top-/Flop-Listen an
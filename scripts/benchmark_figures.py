@@ -0,0 +1,128 @@
+"""
+Benchmark für die Größe und Darstellung der Streu-, Blasen- und Verteilungsdiagramme bei vielen Stores.
+
+Die Daten aus StoreData werden auf die gewünschten Zeilenzahlen hochgerechnet (Ziehen mit Zurücklegen).
+Für jede Abbildung und Größe werden gemessen:
+  - Aufbau: Zeit zum Erzeugen der Abbildung auf dem Server
+  - Payload: Größe der JSON-Antwort, die an den Browser gesendet wird
+  - Rendering (optional, --browser): Zeit von Plotly.newPlot bis zum ersten gezeichneten Frame in einem
+    Headless-Chrome (benötigt selenium und Chrome)
+
+Mit --max-bytes endet das Skript mit Exit-Code 1, wenn eine Abbildung das Budget überschreitet, sodass
+es als Regressionstest (z. B. in CI) verwendet werden kann.
+
+Aufruf (aus dem Projektordner):
+    python scripts/benchmark_figures.py --rows 1650 10000 50000 200000 --max-bytes 1000000 --browser
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+import pandas as pd
+import plotly.io as pio
+from plotly.offline import get_plotlyjs
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DASHBOARD_DIR = os.path.join(ROOT_DIR, "Dashboard")
+DB_PATH = os.path.join(ROOT_DIR, "scripts", "Database.db")
+
+sys.path[:0] = [DASHBOARD_DIR]
+from views.customer_insights_tab import CustomerInsightsTab  # noqa: E402
+from views.performance_insights_tab import PerformanceInsightsTab  # noqa: E402
+from views.store_operations_tab import StoreOperationsTab  # noqa: E402
+
+# Gemessene Abbildungen: Name -> Funktion, die aus dem DataFrame die Abbildung erzeugt
+FIGURES = {
+    "Product Variety vs Revenue": StoreOperationsTab.create_scatter_productvariety_revenue,
+    "Bubble Chart (Best Points)": StoreOperationsTab.create_bubble_chart_with_best_point,
+    "Bubble Chart (Operations)": StoreOperationsTab.create_bubble_chart_operations,
+    "Footfall vs Revenue": CustomerInsightsTab.create_scatter_footfall_revenue,
+    "Efficiency Histogram": StoreOperationsTab.create_histogram_efficiency,
+    "Revenue Box Plot": PerformanceInsightsTab.create_box_plot_category,
+}
+
+# Seite, in der die Abbildungen im Browser gezeichnet werden
+RENDER_PAGE = """<html><head><meta charset="utf-8"><script>{plotly}</script></head>
+<body><div id="plot" style="width:1200px;height:700px"></div></body></html>"""
+
+RENDER_SCRIPT = """
+const done = arguments[arguments.length - 1];
+const figure = JSON.parse(arguments[0]);
+const div = document.getElementById("plot");
+Plotly.purge(div);
+const start = performance.now();
+Plotly.newPlot(div, figure.data, figure.layout).then(
+    () => requestAnimationFrame(() => done(performance.now() - start)));
+"""
+
+
+def load_rows(rows):
+    """Liefert StoreData, hochgerechnet auf rows Zeilen, mit eigener Datenversion (kalter Cache)."""
+    with sqlite3.connect(DB_PATH) as conn:
+        df = pd.read_sql_query("SELECT * FROM StoreData", conn)
+    df = df.sample(rows, replace=rows > len(df), random_state=0).reset_index(drop=True)
+    df.attrs["data_version"] = f"benchmark-{rows}"
+    return df
+
+
+def create_browser():
+    """Startet einen Headless-Chrome mit einer leeren Seite, in die die Abbildungen gezeichnet werden."""
+    try:
+        from selenium import webdriver
+    except ImportError:
+        sys.exit("Für --browser wird selenium (und Chrome) benötigt: pip install selenium")
+
+    options = webdriver.ChromeOptions()
+    options.add_argument("--headless=new")
+    driver = webdriver.Chrome(options=options)
+    driver.set_script_timeout(300)
+
+    page = tempfile.NamedTemporaryFile("w", suffix=".html", delete=False, encoding="utf-8")
+    with page:
+        page.write(RENDER_PAGE.format(plotly=get_plotlyjs()))
+    driver.get(f"file://{page.name}")
+    return driver, page.name
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1650, 10000, 50000, 200000])
+    parser.add_argument("--max-bytes", type=int, default=None, help="Budget für die Payload je Abbildung (Bytes)")
+    parser.add_argument("--browser", action="store_true", help="Rendering-Zeit im Headless-Chrome messen")
+    args = parser.parse_args()
+
+    driver, page = create_browser() if args.browser else (None, None)
+    failures = []
+    try:
+        print(f"{'Abbildung':<28} {'Zeilen':>8} {'Traces':>17} {'Aufbau':>9} {'Payload':>11} {'Rendering':>10}")
+        for rows in args.rows:
+            df = load_rows(rows)
+            for name, builder in FIGURES.items():
+                start = time.perf_counter()
+                fig = builder(df)
+                build_time = time.perf_counter() - start
+
+                payload = pio.to_json(fig, validate=False)
+                size = len(payload.encode("utf-8"))
+                render = f"{driver.execute_async_script(RENDER_SCRIPT, payload):.0f} ms" if driver else "-"
+                traces = "/".join(sorted({trace.type for trace in fig.data}))
+                print(f"{name:<28} {rows:>8} {traces:>17} {build_time:>7.2f} s {size / 1024:>8.0f} KB {render:>10}")
+
+                if args.max_bytes is not None and size > args.max_bytes:
+                    failures.append(f"{name} ({rows} Zeilen): {size} Bytes überschreiten das Budget von "
+                                    f"{args.max_bytes} Bytes")
+    finally:
+        if driver:
+            driver.quit()
+            os.remove(page)
+
+    for failure in failures:
+        print(f" Fehler: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""
+Benchmark für die Startzeit des Dashboards.
+
+Gemessen werden in frischen Python-Prozessen:
+  - Import-Zeit: Import des Moduls Dashboard.py
+  - Time-to-Serve: Prozessstart bis zur ersten ausgelieferten Homepage (App erstellen + Overview-Callback)
+
+Zusätzlich wird geprüft, dass schwere Analyse-Bibliotheken (scikit-learn) weder beim Import noch bis zur
+ersten Homepage geladen werden. Bei Überschreitung der Budgets (Standard: 2 s Import, 4 s Time-to-Serve)
+endet das Skript mit Exit-Code 1, sodass es als Regressionstest (z. B. in CI) verwendet werden kann.
+Ohne DASHBOARD_DB_PATH wird eine migrierte Kopie von scripts/Database.db verwendet.
+
+Aufruf (aus einem beliebigen Ordner):
+    python scripts/benchmark_startup.py --runs 5 --max-import 2.0 --max-serve 4.0
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DASHBOARD_DIR = os.path.join(ROOT_DIR, "Dashboard")
+
+# Import über den Paketpfad (wie in wsgi.py), damit das Skript aus jedem Ordner aufgerufen werden kann
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from scripts.load_test import build_payload, prepare_database  # noqa: E402
+
+# Standard-Budgets in Sekunden
+DEFAULT_MAX_IMPORT = 2.0
+DEFAULT_MAX_SERVE = 4.0
+
+# Module, die erst beim Aufruf der Seiten benötigt werden und den Start nicht verzögern sollen
+HEAVY_MODULES = ["sklearn"]
+
+
+def probe():
+    """Wird im Kindprozess ausgeführt: misst Import-Zeit und Time-to-Serve und gibt sie als JSON aus."""
+    start = time.perf_counter()
+    sys.path[:0] = [DASHBOARD_DIR, ROOT_DIR]
+    import wsgi  # noqa: F401  (importiert Dashboard.py)
+    import_time = time.perf_counter() - start
+    heavy_after_import = [name for name in HEAVY_MODULES if name in sys.modules]
+
+    server = wsgi.create_app()
+    client = server.test_client()
+    client.get("/")
+    dependencies = json.loads(client.get("/_dash-dependencies").data)
+    payload = build_payload(dependencies, "overview-section", "/overview")
+    response = client.post("/_dash-update-component", data=payload, content_type="application/json")
+    serve_time = time.perf_counter() - start
+
+    print(json.dumps({
+        "import": import_time,
+        "serve": serve_time,
+        "status": response.status_code,
+        "heavy_after_import": heavy_after_import,
+        "heavy_after_serve": [name for name in HEAVY_MODULES if name in sys.modules],
+    }))
+
+
+def run_probe(db_path):
+    """Startet einen frischen Python-Prozess auf der Datenbank db_path und liefert dessen Messwerte."""
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), "--probe"],
+                            cwd=DASHBOARD_DIR, env=dict(os.environ, DASHBOARD_DB_PATH=db_path),
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--max-import", type=float, default=DEFAULT_MAX_IMPORT,
+                        help="Budget für die Import-Zeit (Sekunden)")
+    parser.add_argument("--max-serve", type=float, default=DEFAULT_MAX_SERVE,
+                        help="Budget für Time-to-Serve (Sekunden)")
+    parser.add_argument("--probe", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.probe:
+        probe()
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.environ.get("DASHBOARD_DB_PATH") or prepare_database(directory)
+        results = [run_probe(db_path) for _ in range(args.runs)]
+    import_time = statistics.median(result["import"] for result in results)
+    serve_time = statistics.median(result["serve"] for result in results)
+    heavy_import = sorted({name for result in results for name in result["heavy_after_import"]})
+    heavy = sorted({name for result in results for name in result["heavy_after_serve"]})
+
+    print(f"Import-Zeit (Median):   {import_time:.3f} s")
+    print(f"Time-to-Serve (Median): {serve_time:.3f} s")
+    print(f"Schwere Module beim Start geladen: {', '.join(heavy) if heavy else 'keine'}")
+
+    failures = []
+    if any(result["status"] != 200 for result in results):
+        failures.append("Die Homepage konnte nicht ausgeliefert werden.")
+    if heavy_import:
+        failures.append(f"Schwere Module werden bereits beim Import geladen: {', '.join(heavy_import)}")
+    if set(heavy) - set(heavy_import):
+        failures.append(f"Schwere Module werden bis zur ersten Homepage geladen: "
+                        f"{', '.join(sorted(set(heavy) - set(heavy_import)))}")
+    if import_time > args.max_import:
+        failures.append(f"Import-Zeit {import_time:.3f} s überschreitet das Budget von {args.max_import} s")
+    if serve_time > args.max_serve:
+        failures.append(f"Time-to-Serve {serve_time:.3f} s überschreitet das Budget von {args.max_serve} s")
+
+    for failure in failures:
+        print(f" Fehler: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Lokaler Lasttest für den Produktivbetrieb (gunicorn, siehe Dashboard/gunicorn.conf.py).
+
+Startet das Dashboard nacheinander mit unterschiedlich vielen Workern und misst den Durchsatz
+(Requests pro Sekunde) eines Dash-Callbacks bei gleichbleibender Anzahl paralleler Clients. Ohne
+DASHBOARD_DB_PATH wird eine migrierte Kopie von scripts/Database.db verwendet (siehe prepare_database).
+
+Aufruf (aus dem Projektordner):
+    python scripts/load_test.py --workers 1 2 4 --clients 16 --duration 15
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DASHBOARD_DIR = os.path.join(ROOT_DIR, "Dashboard")
+DB_PATH = os.path.join(ROOT_DIR, "scripts", "Database.db")
+MIGRATE_PATH = os.path.join(ROOT_DIR, "scripts", "migrate.py")
+
+
+def prepare_database(directory):
+    """
+    Kopiert scripts/Database.db nach directory und legt dort mit scripts/migrate.py alle abgeleiteten Tabellen
+    an, die das Dashboard liest. Die Datenbank im Repository bleibt unverändert. Liefert den Pfad der Kopie.
+    """
+    db_path = os.path.join(directory, "Database.db")
+    shutil.copy(DB_PATH, db_path)
+    subprocess.run([sys.executable, MIGRATE_PATH, "--db", db_path], check=True, stdout=subprocess.DEVNULL)
+    return db_path
+
+
+def wait_until_ready(base_url, timeout=120):
+    """Wartet, bis der Server Anfragen beantwortet."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with urllib.request.urlopen(base_url + "/_dash-dependencies", timeout=5) as response:
+                return json.loads(response.read())
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.2)
+    raise RuntimeError("Server ist nicht rechtzeitig gestartet.")
+
+
+def build_payload(dependencies, output_id, pathname):
+    """Erzeugt den Request-Body für den Callback, dessen Outputs die Komponente output_id enthalten."""
+    dependency = next(dep for dep in dependencies if f"{output_id}." in dep["output"])
+    output = dependency["output"]
+    if output.startswith(".."):
+        outputs = [dict(zip(("id", "property"), item.rsplit(".", 1))) for item in output.strip(".").split("...")]
+    else:
+        outputs = dict(zip(("id", "property"), output.split("@")[0].rsplit(".", 1)))
+    inputs = [{"id": item["id"], "property": item["property"],
+               "value": pathname if item["property"] == "pathname" else item["id"]}
+              for item in dependency["inputs"]]
+    state = [{"id": item["id"], "property": item["property"], "value": None} for item in dependency["state"]]
+    payload = {"output": output, "outputs": outputs, "inputs": inputs, "state": state, "changedPropIds": []}
+    return json.dumps(payload).encode("utf-8")
+
+
+def run_clients(url, payload, clients, duration):
+    """Schickt von `clients` parallelen Clients für `duration` Sekunden Requests und zählt die Antworten."""
+    def client():
+        done = 0
+        deadline = time.time() + duration
+        while time.time() < deadline:
+            request = urllib.request.Request(url, data=payload, headers={"Content-Type": "application/json"})
+            with urllib.request.urlopen(request, timeout=120) as response:
+                response.read()
+            done += 1
+        return done
+
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        return sum(pool.map(lambda _: client(), range(clients)))
+
+
+def measure(workers, args, db_path):
+    """Startet gunicorn mit `workers` Workern auf der Datenbank db_path und misst den Durchsatz."""
+    env = dict(os.environ, DASHBOARD_WORKERS=str(workers), DASHBOARD_THREADS=str(args.threads),
+               DASHBOARD_BIND=f"127.0.0.1:{args.port}", DASHBOARD_DB_PATH=db_path)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "wsgi:create_app()"],
+        cwd=DASHBOARD_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        base_url = f"http://127.0.0.1:{args.port}"
+        dependencies = wait_until_ready(base_url)
+        payload = build_payload(dependencies, args.output, args.pathname)
+        url = base_url + "/_dash-update-component"
+        run_clients(url, payload, args.clients, args.warmup)  # Aufwärmen
+        requests = run_clients(url, payload, args.clients, args.duration)
+        return requests / args.duration
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=15)
+    parser.add_argument("--warmup", type=float, default=3)
+    parser.add_argument("--port", type=int, default=8051)
+    parser.add_argument("--output", default="overview-section",
+                        help="Komponente, deren Callback getestet wird")
+    parser.add_argument("--pathname", default="/overview", help="URL, mit der der Callback aufgerufen wird")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        db_path = os.environ.get("DASHBOARD_DB_PATH") or prepare_database(directory)
+        baseline = None
+        print(f"{'Workers':>8} {'Req/s':>10} {'Speedup':>8}")
+        for workers in args.workers:
+            throughput = measure(workers, args, db_path)
+            baseline = baseline or throughput
+            print(f"{workers:>8} {throughput:>10.2f} {throughput / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
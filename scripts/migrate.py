@@ -0,0 +1,50 @@
+"""
+Bringt eine bestehende Datenbank auf den aktuellen Stand: legt fehlende oder veraltete abgeleitete Tabellen,
+Trigger und Indizes an (Änderungsprotokoll, Empfehlungen, Statistiken, Suchindex, Rollups, Ranglisten-Indizes).
+Bereits aktuelle Teile bleiben unverändert.
+
+Das Dashboard öffnet die Datenbank nur lesend und gibt beim Start lediglich eine Warnung aus, wenn etwas fehlt.
+
+Aufruf:
+    python scripts/migrate.py [--db PFAD]
+"""
+import argparse
+import os
+
+from store_changes import ensure_store_changes
+from store_leaderboard import ensure_store_leaderboard
+from store_recommendations import ensure_store_recommendations
+from store_rollups import ensure_store_rollups
+from store_search import ensure_store_search
+from store_statistics import ensure_store_statistics
+
+# Datenbankpfad (relativ zum Ordner scripts/, wie in DB_Load.py)
+DB_PATH = "Database.db"
+
+# Reihenfolge der Migrationen: Das Änderungsprotokoll zuerst, damit alle folgenden Stände darin erfasst sind
+MIGRATIONS = [
+    ensure_store_changes,
+    ensure_store_recommendations,
+    ensure_store_statistics,
+    ensure_store_search,
+    ensure_store_rollups,
+    ensure_store_leaderboard,
+]
+
+
+def migrate(db_path):
+    """Führt alle Migrationen auf der Datenbank db_path aus."""
+    if not os.path.exists(db_path):
+        raise FileNotFoundError(f" Fehler: Die Datenbank '{db_path}' wurde nicht gefunden.")
+    for migration in MIGRATIONS:
+        migration(db_path)
+    print(f" Datenbank '{db_path}' ist auf dem aktuellen Stand.")
+
+
+if __name__ == "__main__":
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Legt fehlende Tabellen, Trigger und Indizes der Datenbank an.")
+    parser.add_argument("--db", default=os.path.join(script_dir, DB_PATH))
+    args = parser.parse_args()
+
+    migrate(args.db)
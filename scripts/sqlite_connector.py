@@ -1,6 +1,13 @@
+import json
 import sqlite3
+import numpy as np
 import pandas as pd
 import os
+import pathlib
+import threading
+
+# Höchstzahl protokollierter Änderungen, bis zu der der Snapshot inkrementell aktualisiert statt neu gelesen wird
+INCREMENTAL_REFRESH_LIMIT = 10000
 
 
 class SQLiteConnector:
@@ -14,13 +21,215 @@ class SQLiteConnector:
         if not os.path.exists(self.db_path):
             raise FileNotFoundError(f" Fehler: Die Datenbank '{self.db_path}' wurde nicht gefunden.")
 
-    def fetch_data(self, query):
+        # Zwischengespeicherter Snapshot der Tabelle StoreData (wird pro Datenversion neu geladen)
+        self._snapshot = None
+        self._snapshot_version = None
+        self._snapshot_seq = None  # Stand des Änderungsprotokolls (StoreDataChanges) beim Lesen des Snapshots
+        self._statistics = None
+        self._statistics_version = None
+        self._rollups = {}  # Rollup-Tabelle -> (Datenversion, DataFrame)
+        self._frozen = False
+        self._lock = threading.Lock()
+
+        # Fehlende bzw. veraltete abgeleitete Tabellen (siehe Dashboard.check_database); statt aus ihnen zu lesen,
+        # wird aus dem Snapshot berechnet, bis scripts/migrate.py gelaufen ist und das Dashboard neu startet
+        self.outdated = set()
+
+    def connect(self):
+        """
+        Öffnet eine nur lesende Verbindung zur Datenbank (mode=ro). Das Dashboard schreibt nie in die Datenbank;
+        Tabellen, Trigger und Indizes legen DB_Load.py bzw. scripts/migrate.py an.
+        """
+        return sqlite3.connect(pathlib.Path(self.db_path).as_uri() + "?mode=ro", uri=True)
+
+    def fetch_data(self, query, params=None):
 
         try:
-            conn = sqlite3.connect(self.db_path)
-            df = pd.read_sql_query(query, conn)
+            conn = self.connect()
+            df = pd.read_sql_query(query, conn, params=params)
             conn.close()
             return df
-        except sqlite3.Error as e:
+        except (sqlite3.Error, pd.errors.DatabaseError) as e:
             print(f" SQLite-Fehler: {e}")
             return pd.DataFrame()  # Gibt einen leeren DataFrame zurück, falls ein Fehler auftritt
+
+    def get_data_version(self):
+        """Liefert eine Kennung für den aktuellen Stand der Datenbank (ändert sich bei jedem Schreibzugriff)."""
+        stat = os.stat(self.db_path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def fetch_store_data(self):
+        """
+        Liefert die komplette Tabelle StoreData. Die Tabelle wird nur neu gelesen, wenn sich die
+        Datenversion geändert hat; ansonsten wird der zwischengespeicherte Snapshot zurückgegeben.
+        Stehen die Änderungen seit dem letzten Snapshot im Änderungsprotokoll, werden nur die geänderten
+        Stores neu gelesen (siehe load_snapshot).
+
+        Der Snapshot wird von allen Callbacks gemeinsam genutzt und darf daher nicht verändert werden
+        (vor Änderungen immer df.copy() verwenden).
+        """
+        with self._lock:
+            if self._snapshot is not None and self._frozen:
+                return self._snapshot
+
+            version = self.get_data_version()
+            if self._snapshot is None or self._snapshot_version != version:
+                self._snapshot, self._snapshot_seq = self.load_snapshot()
+                self._snapshot.attrs["data_version"] = version  # Schlüssel für abgeleitete Caches
+                self._snapshot_version = version
+            return self._snapshot
+
+    def load_snapshot(self):
+        """
+        Liest StoreData für einen neuen Snapshot und liefert (Snapshot, Sequenznummer des Änderungsprotokolls).
+        Gibt es bereits einen Snapshot und stehen alle Änderungen seitdem im Protokoll (höchstens
+        INCREMENTAL_REFRESH_LIMIT), werden nur die geänderten Stores gelesen und in eine Kopie des bisherigen
+        Snapshots übernommen; sonst wird die ganze Tabelle gelesen.
+        """
+        try:
+            conn = self.connect()
+            try:
+                conn.execute("BEGIN")  # Protokollstand und Daten aus demselben, konsistenten Lesezugriff
+                seq = self.read_change_sequence(conn)
+                changes = None
+                if self._snapshot is not None and self._snapshot_seq is not None:
+                    changes = self.read_changes(conn, self._snapshot_seq)
+                if changes is None or len(changes) > INCREMENTAL_REFRESH_LIMIT:
+                    return pd.read_sql_query("SELECT * FROM StoreData", conn), seq
+
+                store_ids = pd.concat([changes["OldStoreID"], changes["NewStoreID"]]).dropna().astype(int).unique()
+                rows = pd.read_sql_query("SELECT * FROM StoreData WHERE StoreID IN (SELECT value FROM json_each(?))",
+                                         conn, params=(json.dumps(store_ids.tolist()),))
+                if list(rows.columns) != list(self._snapshot.columns):  # Schema geändert (z. B. neue Spalte)
+                    return pd.read_sql_query("SELECT * FROM StoreData", conn), seq
+            finally:
+                conn.close()
+        except (sqlite3.Error, pd.errors.DatabaseError) as e:
+            print(f" SQLite-Fehler: {e}")
+            return pd.DataFrame(), None
+
+        # Geänderte und gelöschte Stores entfernen, aktuelle Zeilen anhängen und wie beim Lesen nach StoreID ordnen
+        snapshot = self._snapshot[~self._snapshot["StoreID"].isin(store_ids)]
+        if len(rows):
+            snapshot = pd.concat([snapshot, rows], ignore_index=True).infer_objects()
+        return snapshot.sort_values("StoreID", kind="stable", ignore_index=True), seq
+
+    @staticmethod
+    def read_change_sequence(conn):
+        """Aktuelle Sequenznummer des Änderungsprotokolls StoreDataChanges (None, falls es kein Protokoll gibt)."""
+        try:
+            conn.execute("SELECT 1 FROM StoreDataChanges LIMIT 0")
+            row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'StoreDataChanges'").fetchone()
+        except sqlite3.Error:
+            return None
+        return row[0] if row else 0
+
+    @staticmethod
+    def read_changes(conn, seq):
+        """
+        Liest alle Änderungen mit einer Sequenznummer größer als seq aus StoreDataChanges. Liefert None, wenn sie
+        nicht mehr vollständig im Protokoll stehen (bereits kompaktiert, Protokoll neu angelegt oder nicht vorhanden).
+        """
+        current = SQLiteConnector.read_change_sequence(conn)
+        if current is None or seq > current:
+            return None
+        changes = pd.read_sql_query("SELECT * FROM StoreDataChanges WHERE Seq > ? ORDER BY Seq", conn, params=(seq,))
+        if current > seq and (changes.empty or changes["Seq"].iloc[0] != seq + 1):
+            return None
+        return changes
+
+    def get_change_sequence(self):
+        """
+        Liefert die aktuelle Sequenznummer des Änderungsprotokolls (siehe scripts/store_changes.py) bzw. None, falls
+        es kein Protokoll gibt. Abgeleitete Daten merken sich diesen Stand und holen später mit
+        fetch_changes_since() nur die Änderungen seitdem.
+        """
+        conn = self.connect()
+        try:
+            return self.read_change_sequence(conn)
+        finally:
+            conn.close()
+
+    def fetch_changes_since(self, seq):
+        """
+        Liefert alle Änderungen an StoreData seit der Sequenznummer seq aus dem Änderungsprotokoll StoreDataChanges,
+        nach Seq sortiert (Spalten Seq, Operation sowie OldStoreID/NewStoreID, OldStoreLocation/NewStoreLocation und
+        OldStoreCategory/NewStoreCategory). Liefert None, wenn die Änderungen nicht mehr vollständig im Protokoll
+        stehen; der Aufrufer muss dann vollständig neu berechnen.
+        """
+        try:
+            conn = self.connect()
+            try:
+                conn.execute("BEGIN")  # Sequenznummer und Änderungen aus demselben Lesezugriff
+                return self.read_changes(conn, seq)
+            finally:
+                conn.close()
+        except (sqlite3.Error, pd.errors.DatabaseError) as e:
+            print(f" SQLite-Fehler: {e}")
+            return None
+
+    def fetch_store_statistics(self):
+        """
+        Liefert die suffizienten Statistiken von StoreData (Tabelle StoreDataMoments, siehe
+        scripts/store_statistics.py). Wie der Snapshot wird die Tabelle nur pro Datenversion neu gelesen.
+        Liefert None, wenn die Tabelle fehlt oder veraltet ist; die Aufrufer rechnen dann mit dem Snapshot.
+        """
+        if "StoreDataMoments" in self.outdated:
+            return None
+
+        with self._lock:
+            if self._statistics is not None and self._frozen:
+                return self._statistics
+
+            version = self.get_data_version()
+            if self._statistics is None or self._statistics_version != version:
+                self._statistics = self.fetch_data("SELECT * FROM StoreDataMoments")
+                self._statistics.attrs["data_version"] = version
+                self._statistics_version = version
+            return self._statistics
+
+    def fetch_store_rollup(self, table):
+        """
+        Liefert die Rollup-Tabelle table (z. B. StoreRollupLocationCategory, siehe scripts/store_rollups.py).
+        Wie der Snapshot wird die Tabelle nur pro Datenversion neu gelesen.
+        """
+        with self._lock:
+            entry = self._rollups.get(table)
+            if entry is not None and self._frozen:
+                return entry[1]
+
+            version = self.get_data_version()
+            if entry is None or entry[0] != version:
+                rollup = self.fetch_data(f"SELECT * FROM {table}")
+                rollup.attrs["data_version"] = version
+                entry = self._rollups[table] = (version, rollup)
+            return entry[1]
+
+    def freeze(self):
+        """
+        Lädt den Snapshot von StoreData (und dessen Statistiken) und friert ihn ein, d. h. es wird nicht mehr auf neue
+        Datenversionen geprüft. Wird im Produktivbetrieb vor dem Forken der Worker aufgerufen,
+        damit sich alle Worker denselben, schreibgeschützten Snapshot teilen (Copy-on-Write).
+        """
+        self.make_read_only(self.fetch_store_data())
+        statistics = self.fetch_store_statistics()
+        if statistics is not None:
+            self.make_read_only(statistics)
+        self._frozen = True
+
+    @property
+    def frozen(self):
+        """True, sobald der Snapshot eingefroren ist (siehe freeze)."""
+        return self._frozen
+
+    @staticmethod
+    def make_read_only(df):
+        """
+        Setzt die numpy-Arrays hinter df auf schreibgeschützt, sodass versehentliche Änderungen am gemeinsam
+        genutzten Snapshot (z. B. df.loc[...] = ... ohne vorheriges df.copy()) einen ValueError auslösen,
+        statt unbemerkt alle Callbacks und - nach dem Fork - die Copy-on-Write-Seiten zu verändern.
+        """
+        for block in df._mgr.blocks:
+            if isinstance(block.values, np.ndarray):
+                block.values.flags.writeable = False
+        return df
@@ -0,0 +1,128 @@
+"""
+Änderungsprotokoll (Change Data Capture) der Tabelle StoreData.
+
+Trigger schreiben jede Änderung an StoreData als Zeile in StoreDataChanges: fortlaufende Sequenznummer (Seq),
+Art der Änderung (INSERT, UPDATE, DELETE) sowie alte und neue Schlüsselwerte der Zeile (StoreID = rowid,
+StoreLocation, StoreCategory; bei INSERT sind die alten, bei DELETE die neuen Werte NULL). Abgeleitete Daten
+(Snapshot, Caches, Aggregate) können damit seit einem bekannten Stand gezielt nur die geänderten Stores neu lesen,
+siehe SQLiteConnector.fetch_changes_since().
+
+Das Protokoll wird automatisch kompaktiert: Ein Trigger behält nur die letzten CHANGE_LOG_SIZE Änderungen. Wer einen
+älteren Stand hat, muss vollständig neu berechnen. Die Sequenznummern werden dabei nie wiederverwendet
+(AUTOINCREMENT).
+"""
+import argparse
+import sqlite3
+import os
+
+# Datenbankpfad (relativ zum Ordner scripts/, wie in DB_Load.py)
+DB_PATH = "Database.db"
+
+# Anzahl der Änderungen, die im Protokoll erhalten bleiben (ältere werden beim Einfügen neuer Änderungen gelöscht)
+CHANGE_LOG_SIZE = 100000
+
+# Spalten von StoreData, deren alte und neue Werte protokolliert werden
+KEY_COLUMNS = ["StoreID", "StoreLocation", "StoreCategory"]
+
+# Spalten der Tabelle StoreDataChanges
+TABLE_COLUMNS = ["Seq", "Operation"] + [f"{age}{column}" for column in KEY_COLUMNS for age in ("Old", "New")]
+
+# Trigger, die StoreDataChanges fortschreiben bzw. kompaktieren
+TRIGGERS = ["StoreDataChanges_insert", "StoreDataChanges_delete", "StoreDataChanges_update",
+            "StoreDataChanges_compact"]
+
+
+def create_triggers(connection, log_size=CHANGE_LOG_SIZE):
+    """Erstellt die Trigger, die jede Änderung an StoreData protokollieren und das Protokoll kompaktieren."""
+    for trigger in TRIGGERS:
+        connection.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+
+    columns = ", ".join(TABLE_COLUMNS[1:])
+
+    def log(operation, old, new):
+        values = ", ".join(f"{prefix}.{column}" if prefix else "NULL"
+                           for column in KEY_COLUMNS for prefix in (old, new))
+        return f"INSERT INTO StoreDataChanges ({columns}) VALUES ('{operation}', {values});"
+
+    connection.execute(f"""
+        CREATE TRIGGER StoreDataChanges_insert AFTER INSERT ON StoreData
+        BEGIN {log("INSERT", None, "NEW")} END
+    """)
+    connection.execute(f"""
+        CREATE TRIGGER StoreDataChanges_delete AFTER DELETE ON StoreData
+        BEGIN {log("DELETE", "OLD", None)} END
+    """)
+    connection.execute(f"""
+        CREATE TRIGGER StoreDataChanges_update AFTER UPDATE ON StoreData
+        BEGIN {log("UPDATE", "OLD", "NEW")} END
+    """)
+    # Kompaktierung: Pro neuer Änderung fällt (im eingeschwungenen Zustand) genau die älteste heraus
+    connection.execute(f"""
+        CREATE TRIGGER StoreDataChanges_compact AFTER INSERT ON StoreDataChanges
+        BEGIN DELETE FROM StoreDataChanges WHERE Seq <= NEW.Seq - {int(log_size)}; END
+    """)
+
+
+def build_store_changes(db_path, log_size=CHANGE_LOG_SIZE):
+    """
+    Legt das Änderungsprotokoll StoreDataChanges an (falls es fehlt) und erstellt die Trigger neu. Bestehende
+    Einträge und der Stand der Sequenznummern bleiben erhalten.
+    """
+    connection = sqlite3.connect(db_path)
+    try:
+        with connection:  # Eine Transaktion: Tabelle und Trigger passen immer zusammen
+            connection.execute("""
+            CREATE TABLE IF NOT EXISTS StoreDataChanges (
+                Seq INTEGER PRIMARY KEY AUTOINCREMENT,  -- Fortlaufende Sequenznummer (wird nie wiederverwendet)
+                Operation TEXT NOT NULL,                -- INSERT, UPDATE oder DELETE
+                OldStoreID INTEGER,                     -- Alte bzw. neue rowid der Zeile in StoreData
+                NewStoreID INTEGER,
+                OldStoreLocation TEXT,
+                NewStoreLocation TEXT,
+                OldStoreCategory TEXT,
+                NewStoreCategory TEXT
+            )
+            """)
+            create_triggers(connection, log_size)
+            # Beim Verkleinern des Protokolls überzählige Einträge sofort entfernen
+            connection.execute("DELETE FROM StoreDataChanges WHERE Seq <= (SELECT MAX(Seq) FROM StoreDataChanges) - ?",
+                               (int(log_size),))
+        count = connection.execute("SELECT COUNT(*) FROM StoreDataChanges").fetchone()[0]
+    finally:
+        connection.close()
+    print(f" Änderungsprotokoll 'StoreDataChanges' mit {count} Einträgen (höchstens {log_size}) eingerichtet.")
+
+
+def check_store_changes(connection):
+    """Prüft über connection (nur lesend), ob das Änderungsprotokoll mit aktuellem Schema und allen Triggern besteht."""
+    columns = [row[1] for row in connection.execute("PRAGMA table_info(StoreDataChanges)")]
+    triggers = {row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+    return columns == TABLE_COLUMNS and set(TRIGGERS) <= triggers
+
+
+def ensure_store_changes(db_path):
+    """Richtet das Änderungsprotokoll ein, falls die Tabelle oder ein Trigger fehlt oder das Schema veraltet ist."""
+    connection = sqlite3.connect(db_path)
+    try:
+        if check_store_changes(connection):
+            return
+        columns = [row[1] for row in connection.execute("PRAGMA table_info(StoreDataChanges)")]
+        if columns and columns != TABLE_COLUMNS:
+            # Veraltetes Schema: Das Protokoll wird verworfen, Leser mit älterem Stand berechnen dann vollständig neu
+            with connection:
+                connection.execute("DROP TABLE StoreDataChanges")
+    finally:
+        connection.close()
+
+    build_store_changes(db_path)
+
+
+if __name__ == "__main__":
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Richtet das Änderungsprotokoll von StoreData ein.")
+    parser.add_argument("--db", default=os.path.join(script_dir, DB_PATH))
+    parser.add_argument("--size", type=int, default=CHANGE_LOG_SIZE,
+                        help="Anzahl der Änderungen, die im Protokoll erhalten bleiben")
+    args = parser.parse_args()
+
+    build_store_changes(args.db, args.size)
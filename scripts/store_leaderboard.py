@@ -0,0 +1,84 @@
+"""
+Ranglisten (Top-N / Flop-N) der Stores nach Umsatz.
+
+Die Abfragen sortieren mit ORDER BY MonthlySalesRevenue ... LIMIT n und lesen dabei einen Index über den Umsatz
+(optional mit Standort bzw. Kategorie als führender Spalte) in Sortierreihenfolge. SQLite bricht nach n Zeilen ab,
+der Aufwand hängt also nur von n und nicht von der Anzahl der Stores ab. Bei gleichem Umsatz entscheidet die StoreID.
+"""
+import argparse
+import sqlite3
+import os
+
+# Datenbankpfad (relativ zum Ordner scripts/, wie in DB_Load.py)
+DB_PATH = "Database.db"
+
+# Indizes für die Ranglisten: Name -> Spalten (der Umsatz steht immer zuletzt, die rowid hängt SQLite selbst an)
+INDEXES = {
+    "StoreData_Revenue": ["MonthlySalesRevenue"],
+    "StoreData_Location_Revenue": ["StoreLocation", "MonthlySalesRevenue"],
+    "StoreData_Category_Revenue": ["StoreCategory", "MonthlySalesRevenue"],
+}
+
+# Spalten, die je Store der Rangliste geliefert werden
+LEADERBOARD_COLUMNS = ["StoreID", "MonthlySalesRevenue", "StoreCategory", "StoreLocation"]
+
+
+def check_store_leaderboard(connection):
+    """Prüft über connection (nur lesend), ob alle Indizes für die Ranglisten vorhanden sind."""
+    indexes = {row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    return set(INDEXES) <= indexes
+
+
+def ensure_store_leaderboard(db_path):
+    """Legt die Indizes für die Ranglisten an, falls sie fehlen."""
+    connection = sqlite3.connect(db_path)
+    try:
+        with connection:
+            for name, columns in INDEXES.items():
+                connection.execute(f"CREATE INDEX IF NOT EXISTS {name} ON StoreData ({', '.join(columns)})")
+    finally:
+        connection.close()
+
+
+def leaderboard_query(n, ascending=False, location=None, category=None):
+    """
+    SQL-Abfrage und Parameter für die n Stores mit dem höchsten (bzw. mit ascending=True dem niedrigsten) Umsatz,
+    optional nur für einen Standort und/oder eine Kategorie. Stores ohne Umsatz werden nicht berücksichtigt.
+    """
+    conditions = ["MonthlySalesRevenue IS NOT NULL"]
+    params = []
+    if location is not None:
+        conditions.append("StoreLocation = ?")
+        params.append(location)
+    if category is not None:
+        conditions.append("StoreCategory = ?")
+        params.append(category)
+
+    # Beide Sortierschlüssel in derselben Richtung, damit der Index (Umsatz, rowid) vollständig genutzt wird
+    direction = "ASC" if ascending else "DESC"
+    query = f"""
+        SELECT {", ".join(LEADERBOARD_COLUMNS)} FROM StoreData
+        WHERE {" AND ".join(conditions)}
+        ORDER BY MonthlySalesRevenue {direction}, StoreID {direction}
+        LIMIT ?
+    """
+    return query, params + [int(n)]
+
+
+if __name__ == "__main__":
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Gibt die Top-N- bzw. Flop-N-Stores nach Umsatz aus.")
+    parser.add_argument("--db", default=os.path.join(script_dir, DB_PATH))
+    parser.add_argument("-n", type=int, default=5, help="Anzahl der Stores")
+    parser.add_argument("--bottom", action="store_true", help="Stores mit dem niedrigsten Umsatz ausgeben")
+    parser.add_argument("--location", help="Nur Stores dieses Standorts")
+    parser.add_argument("--category", help="Nur Stores dieser Kategorie")
+    args = parser.parse_args()
+
+    ensure_store_leaderboard(args.db)
+    connection = sqlite3.connect(args.db)
+    try:
+        for row in connection.execute(*leaderboard_query(args.n, args.bottom, args.location, args.category)):
+            print(row)
+    finally:
+        connection.close()
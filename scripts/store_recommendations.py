@@ -0,0 +1,257 @@
+import argparse
+import hashlib
+import json
+import operator
+import sqlite3
+import numpy as np
+import pandas as pd
+import os
+
+try:
+    from scripts.sqlite_connector import SQLiteConnector  # Import aus dem Dashboard (Projektordner im Pfad)
+except ImportError:
+    from sqlite_connector import SQLiteConnector  # Aufruf als Skript aus scripts/ (DB_Load.py, migrate.py)
+
+# Datenbankpfad (relativ zum Ordner scripts/, wie in DB_Load.py)
+DB_PATH = "Database.db"
+
+# Konfiguration der Empfehlungsregeln und der allgemeinen Dos/Don'ts
+RULES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "recommendation_rules.json")
+
+# Erlaubte Vergleichsoperatoren einer Regel: Wert des Stores <op> Schwellwert * Vergleichswert
+COMPARISONS = {"<": operator.lt, "<=": operator.le, ">": operator.gt, ">=": operator.ge}
+
+# Vergleichswerte (baseline) einer Regel:
+#   global   - Durchschnitt aller Stores
+#   others   - Durchschnitt aller anderen Stores (ohne den Store selbst)
+#   location - Durchschnitt der anderen Stores am selben Standort
+#   category - Durchschnitt der anderen Stores derselben Kategorie
+BASELINE_GROUPS = {"global": None, "others": None, "location": "StoreLocation", "category": "StoreCategory"}
+
+# Spalten der Tabelle StoreRecommendations
+TABLE_COLUMNS = ["StoreID", "RuleID", "Position", "Priority", "Metric", "Comparison", "BaselineType",
+                 "StoreValue", "Baseline", "Triggered", "Message"]
+
+# Spalten des Sammelberichts (siehe report_query und build_report)
+REPORT_COLUMNS = ["StoreID", "StoreLocation", "StoreCategory", "RuleID", "Priority", "Metric",
+                  "StoreValue", "Baseline", "BaselineType", "Triggered", "Message"]
+
+
+def load_rules_config(path=RULES_PATH):
+    """Lädt die Regeln und die allgemeinen Empfehlungen aus der JSON-Konfiguration und prüft sie."""
+    with open(path, encoding="utf-8") as file:
+        config = json.load(file)
+
+    for rule in config["rules"]:
+        if rule["comparison"] not in COMPARISONS:
+            raise ValueError(f" Fehler: Unbekannter Vergleich '{rule['comparison']}' in Regel '{rule['id']}'.")
+        if rule["baseline"] not in BASELINE_GROUPS:
+            raise ValueError(f" Fehler: Unbekannter Vergleichswert '{rule['baseline']}' in Regel '{rule['id']}'.")
+        rule.setdefault("threshold", 1)
+        rule.setdefault("priority", 0)
+
+    config.setdefault("general", {"dos": [], "donts": []})
+    return config
+
+
+def hash_rules_config(path=RULES_PATH):
+    """SHA-256 der Regel-Konfiguration; ändert sich die Datei, sind gespeicherte Empfehlungen veraltet."""
+    with open(path, "rb") as file:
+        return hashlib.sha256(file.read()).hexdigest()
+
+
+def compute_baselines(df, columns, baseline):
+    """
+    Berechnet den Vergleichswert je Store für mehrere Spalten auf einmal. Die Leave-One-Out-Durchschnitte
+    ergeben sich aus Summe und Anzahl (je Gruppe) abzüglich des eigenen Werts, statt für jeden Store erneut
+    über die übrigen Zeilen zu mitteln. Fehlende Werte werden wie bei DataFrame.mean() ignoriert.
+    """
+    values = df[columns].astype(float)
+    if baseline == "global":
+        return pd.DataFrame(np.broadcast_to(values.mean().to_numpy(), values.shape), index=df.index, columns=columns)
+
+    group = BASELINE_GROUPS[baseline]
+    if group is None:
+        sums, counts = values.sum(), values.count()
+    else:
+        grouped = values.groupby(df[group])
+        sums, counts = grouped.transform("sum"), grouped.transform("count")
+
+    present = values.notna()
+    others_sum = sums - values.where(present, 0.0)
+    others_count = counts - present.astype(int)
+    return (others_sum / others_count.where(others_count > 0)).astype(float)
+
+
+def evaluate_rules(df, rules):
+    """
+    Wertet alle Regeln für alle Stores in einem vektorisierten Durchlauf aus. Die Vergleichswerte werden
+    je Art (global, others, location, category) nur einmal für alle beteiligten Spalten berechnet.
+
+    Gibt einen DataFrame mit einer Zeile pro Store und Regel zurück (Spalten siehe TABLE_COLUMNS).
+    """
+    rules = [rule for rule in rules if rule["column"] in df.columns]
+
+    # Vergleichswerte je Art für alle Spalten, die mit dieser Art verglichen werden
+    baselines = {}
+    for baseline in dict.fromkeys(rule["baseline"] for rule in rules):
+        columns = list(dict.fromkeys(rule["column"] for rule in rules if rule["baseline"] == baseline))
+        baselines[baseline] = compute_baselines(df, columns, baseline)
+
+    results = []
+    for position, rule in enumerate(rules):
+        values = df[rule["column"]].astype(float).to_numpy()
+        baseline = baselines[rule["baseline"]][rule["column"]].to_numpy()
+        triggered = COMPARISONS[rule["comparison"]](values, baseline * rule["threshold"])  # NaN ergibt False
+        results.append(pd.DataFrame({
+            "StoreID": df["StoreID"].to_numpy(),
+            "RuleID": rule["id"],
+            "Position": position,
+            "Priority": rule["priority"],
+            "Metric": rule["column"],
+            "Comparison": rule["comparison"],
+            "BaselineType": rule["baseline"],
+            "StoreValue": values,
+            "Baseline": baseline,
+            "Triggered": triggered.astype(int),
+            "Message": rule["message"],
+        }))
+
+    if not results:
+        return pd.DataFrame(columns=TABLE_COLUMNS)
+    return pd.concat(results, ignore_index=True)
+
+
+def create_table(connection):
+    """Erstellt die Tabelle StoreRecommendations und ihre Metadaten (StoreRecommendationsMeta) neu."""
+    connection.execute("DROP TABLE IF EXISTS StoreRecommendationsMeta")
+    connection.execute("""
+    CREATE TABLE StoreRecommendationsMeta (
+        Key TEXT PRIMARY KEY,           -- ChangeSequence (Stand des Änderungsprotokolls) bzw. RulesHash
+        Value
+    ) WITHOUT ROWID
+    """)
+    connection.execute("DROP TABLE IF EXISTS StoreRecommendations")
+    connection.execute("""
+    CREATE TABLE StoreRecommendations (
+        StoreID INTEGER NOT NULL,
+        RuleID TEXT NOT NULL,
+        Position INTEGER NOT NULL,      -- Reihenfolge der Regel in der Konfiguration
+        Priority INTEGER NOT NULL,      -- Kleinere Werte werden zuerst angezeigt
+        Metric TEXT NOT NULL,
+        Comparison TEXT NOT NULL,
+        BaselineType TEXT NOT NULL,
+        StoreValue REAL,
+        Baseline REAL,                  -- Vergleichswert (z. B. Durchschnitt aller anderen Stores)
+        Triggered INTEGER NOT NULL,     -- 1, wenn die Empfehlung für den Store gilt
+        Message TEXT NOT NULL,
+        PRIMARY KEY (StoreID, Position)
+    ) WITHOUT ROWID
+    """)
+
+
+def build_store_recommendations(db_path, rules_path=RULES_PATH):
+    """
+    Berechnet die Empfehlungen für alle Stores neu und speichert sie in StoreRecommendations. Der Stand des
+    Änderungsprotokolls und der Hash der Regeln werden in StoreRecommendationsMeta festgehalten, damit spätere
+    Änderungen an StoreData bzw. an der Konfiguration erkannt werden (siehe check_store_recommendations).
+    """
+    rules = load_rules_config(rules_path)["rules"]
+    rules_hash = hash_rules_config(rules_path)
+    connection = sqlite3.connect(db_path)
+    try:
+        with connection:  # Eine Transaktion: die Tabelle ist nie halb befüllt
+            # Schreibsperre vor dem Lesen, damit Daten und Sequenznummer zusammenpassen
+            connection.execute("BEGIN IMMEDIATE")
+            df = pd.read_sql_query("SELECT * FROM StoreData", connection)
+            seq = SQLiteConnector.read_change_sequence(connection)
+            recommendations = evaluate_rules(df, rules)
+
+            create_table(connection)
+            connection.executemany(
+                f"INSERT INTO StoreRecommendations VALUES ({', '.join('?' * len(TABLE_COLUMNS))})",
+                recommendations[TABLE_COLUMNS].astype(object).where(recommendations.notna(), None)
+                .itertuples(index=False)
+            )
+            connection.executemany("INSERT INTO StoreRecommendationsMeta VALUES (?, ?)",
+                                   [("ChangeSequence", seq), ("RulesHash", rules_hash)])
+    finally:
+        connection.close()
+    print(f" {len(recommendations)} Empfehlungen für {df['StoreID'].nunique()} Stores in 'StoreRecommendations' gespeichert.")
+
+
+def check_store_recommendations(connection, rules_path=RULES_PATH):
+    """
+    Prüft über connection (nur lesend), ob die Tabelle StoreRecommendations mit aktuellem Schema besteht, mit den
+    aktuellen Regeln (rules_path) berechnet wurde und seit ihrem Aufbau keine Änderungen an StoreData protokolliert
+    wurden. Ohne Änderungsprotokoll lässt sich das nicht feststellen, die Tabelle gilt dann als veraltet.
+    """
+    columns = [row[1] for row in connection.execute("PRAGMA table_info(StoreRecommendations)")]
+    if columns != TABLE_COLUMNS:
+        return False
+    try:
+        meta = dict(connection.execute("SELECT Key, Value FROM StoreRecommendationsMeta"))
+    except sqlite3.OperationalError:
+        return False
+    seq = SQLiteConnector.read_change_sequence(connection)
+    return seq is not None and meta.get("ChangeSequence") == seq \
+        and meta.get("RulesHash") == hash_rules_config(rules_path)
+
+
+def ensure_store_recommendations(db_path, rules_path=RULES_PATH):
+    """Baut StoreRecommendations auf, falls die Tabelle fehlt oder veraltet ist (siehe check_store_recommendations)."""
+    connection = sqlite3.connect(db_path)
+    try:
+        current = check_store_recommendations(connection, rules_path)
+    finally:
+        connection.close()
+    if not current:
+        build_store_recommendations(db_path, rules_path)
+
+
+def report_query(triggered_only=True):
+    """SQL-Abfrage für den Sammelbericht: Empfehlungen aller Stores inkl. Standort und Kategorie."""
+    return f"""
+        SELECT r.StoreID, s.StoreLocation, s.StoreCategory, r.RuleID, r.Priority, r.Metric,
+               r.StoreValue, r.Baseline, r.BaselineType, r.Triggered, r.Message
+        FROM StoreRecommendations r JOIN StoreData s ON s.StoreID = r.StoreID
+        {"WHERE r.Triggered = 1" if triggered_only else ""}
+        ORDER BY s.StoreLocation, r.StoreID, r.Priority, r.Position
+    """
+
+
+def build_report(df, recommendations, triggered_only=True):
+    """
+    Sammelbericht wie report_query, aber aus bereits geladenen Daten: df (StoreData) und recommendations
+    (Ergebnis von evaluate_rules). Wird verwendet, solange StoreRecommendations veraltet ist.
+    """
+    if triggered_only:
+        recommendations = recommendations[recommendations["Triggered"] == 1]
+    report = recommendations.merge(df[["StoreID", "StoreLocation", "StoreCategory"]], on="StoreID")
+    report = report.sort_values(["StoreLocation", "StoreID", "Priority", "Position"], kind="stable")
+    return report[REPORT_COLUMNS].reset_index(drop=True)
+
+
+def export_store_recommendations(db_path, output_path, triggered_only=True):
+    """Exportiert die Empfehlungen aller Stores als CSV (Sammelbericht, z. B. für Regionalmanager)."""
+    connection = sqlite3.connect(db_path)
+    try:
+        report = pd.read_sql_query(report_query(triggered_only), connection)
+    finally:
+        connection.close()
+    report.to_csv(output_path, index=False, sep=";", encoding="utf-8")
+    print(f" {len(report)} Empfehlungen nach '{output_path}' exportiert.")
+
+
+if __name__ == "__main__":
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Berechnet die Empfehlungen für alle Stores vor.")
+    parser.add_argument("--db", default=os.path.join(script_dir, DB_PATH))
+    parser.add_argument("--rules", default=RULES_PATH)
+    parser.add_argument("--export", metavar="CSV", help="Empfehlungen zusätzlich als CSV exportieren")
+    parser.add_argument("--all", action="store_true", help="Beim Export auch nicht ausgelöste Regeln ausgeben")
+    args = parser.parse_args()
+
+    build_store_recommendations(args.db, args.rules)
+    if args.export:
+        export_store_recommendations(args.db, args.export, triggered_only=not args.all)
@@ -0,0 +1,160 @@
+"""
+Materialisierte Rollups der Tabelle StoreData.
+
+Jede Rollup-Tabelle enthält eine Zeile je Kombination ihrer Schlüsselspalten (z. B. StoreLocation x StoreCategory)
+mit der Anzahl der Stores (StoreCount) und je numerischer Spalte der Anzahl der vorhandenen Werte (<Spalte>Count),
+deren Summe (<Spalte>Sum) und der Summe ihrer Quadrate (<Spalte>SumSquares). Daraus ergeben sich Summen,
+Mittelwerte und Standardabweichungen je Gruppe (und durch Zusammenfassen auch für gröbere Gruppen), ohne
+StoreData erneut zu lesen - der Aufwand hängt nur von der Anzahl der Gruppen ab.
+
+Die Tabellen werden einmal vollständig berechnet und danach von Triggern bei jedem INSERT, UPDATE und DELETE
+fortgeschrieben. Fehlende Schlüsselwerte bilden eine eigene Gruppe (NULL), fehlende Messwerte werden wie bei
+pandas nicht mitgezählt. Gruppen ohne Stores werden entfernt.
+"""
+import argparse
+import sqlite3
+import os
+
+# Datenbankpfad (relativ zum Ordner scripts/, wie in DB_Load.py)
+DB_PATH = "Database.db"
+
+# Rollup-Tabellen und ihre Schlüsselspalten
+ROLLUPS = {
+    "StoreRollupLocationCategory": ["StoreLocation", "StoreCategory"],
+    "StoreRollupPromotions": ["PromotionsCount"],
+}
+
+# Spalten, die trotz numerischem Typ nicht aggregiert werden
+EXCLUDED_COLUMNS = ["StoreID"]
+
+# Kennzahlen je numerischer Spalte (Suffix des Spaltennamens in der Rollup-Tabelle)
+STATISTICS = ["Count", "Sum", "SumSquares"]
+
+
+def get_measure_columns(connection):
+    """Liefert die numerischen Spalten von StoreData (INTEGER/REAL), die aggregiert werden, in Tabellenreihenfolge."""
+    return [row[1] for row in connection.execute("PRAGMA table_info(StoreData)")
+            if row[2].upper() in ("INTEGER", "REAL") and row[1] not in EXCLUDED_COLUMNS]
+
+
+def get_table_columns(keys, measures):
+    """Spalten einer Rollup-Tabelle: Schlüssel, StoreCount und die Kennzahlen je numerischer Spalte."""
+    return keys + ["StoreCount"] + [f"{column}{statistic}" for column in measures for statistic in STATISTICS]
+
+
+def get_triggers(table):
+    """Namen der Trigger, die die Rollup-Tabelle table fortschreiben."""
+    return [f"{table}_insert", f"{table}_delete", f"{table}_update"]
+
+
+def create_triggers(connection, table, keys, measures):
+    """Erstellt die Trigger, die die Rollup-Tabelle table bei Änderungen an StoreData fortschreiben."""
+    for trigger in get_triggers(table):
+        connection.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+
+    def group(prefix):
+        # IS statt =, damit auch die Gruppe mit fehlenden Schlüsselwerten (NULL) gefunden wird
+        return " AND ".join(f"{key} IS {prefix}.{key}" for key in keys)
+
+    def add(prefix, sign):
+        # Legt die Gruppe bei Bedarf an und schreibt Anzahl, Summen und Quadratsummen der Zeile prefix fort
+        assignments = ", ".join(
+            f"{column}Count = {column}Count {sign} ({prefix}.{column} IS NOT NULL), "
+            f"{column}Sum = {column}Sum {sign} COALESCE({prefix}.{column}, 0), "
+            f"{column}SumSquares = {column}SumSquares {sign} COALESCE({prefix}.{column} * {prefix}.{column}, 0)"
+            for column in measures
+        )
+        create = ""
+        if sign == "+":
+            columns = get_table_columns(keys, measures)
+            values = [f"{prefix}.{key}" for key in keys] + ["0"] * (len(columns) - len(keys))
+            create = f"""
+                INSERT INTO {table} ({", ".join(columns)}) SELECT {", ".join(values)}
+                WHERE NOT EXISTS (SELECT 1 FROM {table} WHERE {group(prefix)});
+            """
+        return f"""
+            {create}
+            UPDATE {table} SET StoreCount = StoreCount {sign} 1, {assignments} WHERE {group(prefix)};
+        """
+
+    remove_empty = f"DELETE FROM {table} WHERE StoreCount = 0;"
+    connection.execute(f"""
+        CREATE TRIGGER {table}_insert AFTER INSERT ON StoreData
+        BEGIN {add("NEW", "+")} END
+    """)
+    connection.execute(f"""
+        CREATE TRIGGER {table}_delete AFTER DELETE ON StoreData
+        BEGIN {add("OLD", "-")} {remove_empty} END
+    """)
+    connection.execute(f"""
+        CREATE TRIGGER {table}_update AFTER UPDATE OF {", ".join(keys + measures)} ON StoreData
+        BEGIN {add("OLD", "-")} {add("NEW", "+")} {remove_empty} END
+    """)
+
+
+def build_store_rollups(db_path):
+    """Berechnet alle Rollup-Tabellen vollständig neu und legt die Trigger für die Fortschreibung an."""
+    connection = sqlite3.connect(db_path)
+    try:
+        measures = get_measure_columns(connection)
+        with connection:  # Eine Transaktion: Tabellen und Trigger passen immer zusammen
+            for table, keys in ROLLUPS.items():
+                columns = get_table_columns(keys, measures)
+                definitions = [f"{key}" for key in keys] + ["StoreCount INTEGER NOT NULL"] + [
+                    f"{column}{statistic} {'INTEGER' if statistic == 'Count' else 'REAL'} NOT NULL"
+                    for column in measures for statistic in STATISTICS]
+                aggregates = ["COUNT(*)"] + [
+                    aggregate
+                    for column in measures
+                    for aggregate in (f"COUNT({column})", f"TOTAL({column})", f"TOTAL({column} * {column})")]
+
+                connection.execute(f"DROP TABLE IF EXISTS {table}")
+                connection.execute(f"CREATE TABLE {table} ({', '.join(definitions)})")
+                connection.execute(f"""
+                    INSERT INTO {table} ({", ".join(columns)})
+                    SELECT {", ".join(keys + aggregates)} FROM StoreData GROUP BY {", ".join(keys)}
+                """)
+                create_triggers(connection, table, keys, measures)
+        groups = {table: connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] for table in ROLLUPS}
+    finally:
+        connection.close()
+    for table, count in groups.items():
+        print(f" Rollup mit {count} Gruppen für {len(measures)} Spalten in '{table}' gespeichert.")
+
+
+def check_store_rollups(connection):
+    """
+    Prüft über connection (nur lesend), ob alle Rollup-Tabellen aktuell sind: Tabellen und Trigger vorhanden,
+    Spalten von StoreData unverändert und Anzahl der Stores stimmig (sonst z. B. Änderungen ohne Trigger).
+    """
+    measures = get_measure_columns(connection)
+    triggers = {row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+    expected = connection.execute("SELECT COUNT(*) FROM StoreData").fetchone()[0]
+    for table, keys in ROLLUPS.items():
+        columns = [row[1] for row in connection.execute(f"PRAGMA table_info({table})")]
+        if columns != get_table_columns(keys, measures) or not set(get_triggers(table)) <= triggers:
+            return False
+        if connection.execute(f"SELECT TOTAL(StoreCount) FROM {table}").fetchone()[0] != expected:
+            return False
+    return True
+
+
+def ensure_store_rollups(db_path):
+    """Baut die Rollup-Tabellen auf, falls eine fehlt oder veraltet ist (siehe check_store_rollups)."""
+    connection = sqlite3.connect(db_path)
+    try:
+        current = check_store_rollups(connection)
+    finally:
+        connection.close()
+
+    if not current:
+        build_store_rollups(db_path)
+
+
+if __name__ == "__main__":
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Berechnet die Rollup-Tabellen von StoreData neu.")
+    parser.add_argument("--db", default=os.path.join(script_dir, DB_PATH))
+    args = parser.parse_args()
+
+    build_store_rollups(args.db)
@@ -0,0 +1,160 @@
+"""
+Volltext-Suche über die Stores der Tabelle StoreData.
+
+StoreSearch ist eine FTS5-Tabelle über StoreID, StoreLocation und StoreCategory, die ihre Inhalte aus StoreData
+liest (External Content) und nur den Suchindex selbst speichert. Der Index wird einmal vollständig aufgebaut und
+danach von Triggern bei jedem INSERT, UPDATE und DELETE fortgeschrieben.
+
+Die Dropdowns des Dashboards laden damit nicht mehr alle Stores ins Layout, sondern fragen pro Tastendruck nur
+die ersten Treffer ab (Präfixsuche, z. B. "12" oder "Store 12" findet Store 12, 120, 1200 ...; "san gro" findet
+Grocery-Stores in San Francisco).
+"""
+import argparse
+import re
+import sqlite3
+import os
+
+# Datenbankpfad (relativ zum Ordner scripts/, wie in DB_Load.py)
+DB_PATH = "Database.db"
+
+# Durchsuchte Spalten von StoreData
+SEARCH_COLUMNS = ["StoreID", "StoreLocation", "StoreCategory"]
+
+# Wort vor der StoreID in den Labels der Dropdowns ("Store 5 (Palo Alto, Electronics)"), gehört nicht zum Index
+LABEL_PREFIX = "store"
+
+# Höchstzahl der Treffer, die pro Suchanfrage an das Dropdown gesendet werden
+SEARCH_LIMIT = 20
+
+# Trigger, die StoreSearch bei jeder Änderung von StoreData fortschreiben
+TRIGGERS = ["StoreSearch_insert", "StoreSearch_delete", "StoreSearch_update"]
+
+
+def create_triggers(connection):
+    """Erstellt die Trigger, die StoreSearch bei Änderungen an StoreData fortschreiben."""
+    for trigger in TRIGGERS:
+        connection.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+
+    columns = ", ".join(SEARCH_COLUMNS)
+
+    def insert(prefix):
+        values = ", ".join(f"{prefix}.{column}" for column in SEARCH_COLUMNS)
+        return f"INSERT INTO StoreSearch(rowid, {columns}) VALUES ({prefix}.StoreID, {values});"
+
+    def delete(prefix):
+        # Bei External Content muss der alte Inhalt mitgegeben werden, damit FTS5 die Einträge im Index findet
+        values = ", ".join(f"{prefix}.{column}" for column in SEARCH_COLUMNS)
+        return f"INSERT INTO StoreSearch(StoreSearch, rowid, {columns}) VALUES ('delete', {prefix}.StoreID, {values});"
+
+    connection.execute(f"CREATE TRIGGER StoreSearch_insert AFTER INSERT ON StoreData BEGIN {insert('NEW')} END")
+    connection.execute(f"CREATE TRIGGER StoreSearch_delete AFTER DELETE ON StoreData BEGIN {delete('OLD')} END")
+    # Nur Änderungen an den durchsuchten Spalten betreffen den Index
+    connection.execute(f"""
+        CREATE TRIGGER StoreSearch_update AFTER UPDATE OF {columns} ON StoreData
+        BEGIN {delete('OLD')} {insert('NEW')} END
+    """)
+
+
+def build_store_search(db_path):
+    """Baut den Suchindex StoreSearch vollständig neu auf und legt die Trigger für die Fortschreibung an."""
+    connection = sqlite3.connect(db_path)
+    try:
+        with connection:  # Eine Transaktion: Index und Trigger passen immer zusammen
+            connection.execute("DROP TABLE IF EXISTS StoreSearch")
+            # prefix: zusätzliche Indizes für Präfixe mit 1 bis 3 Zeichen, damit kurze Eingaben schnell bleiben
+            connection.execute(f"""
+                CREATE VIRTUAL TABLE StoreSearch USING fts5(
+                    {", ".join(SEARCH_COLUMNS)},
+                    content='StoreData', content_rowid='StoreID', prefix='1 2 3'
+                )
+            """)
+            connection.execute("INSERT INTO StoreSearch(StoreSearch) VALUES ('rebuild')")
+            create_triggers(connection)
+        count = connection.execute("SELECT COUNT(*) FROM StoreSearch_docsize").fetchone()[0]
+    finally:
+        connection.close()
+    print(f" Suchindex für {count} Stores in 'StoreSearch' gespeichert.")
+
+
+def check_store_search(connection):
+    """
+    Prüft über connection (nur lesend), ob StoreSearch aktuell ist: Index und Trigger vorhanden und Anzahl der
+    indizierten Stores stimmig (sonst z. B. Änderungen ohne Trigger).
+    """
+    triggers = {row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+    try:
+        count = connection.execute("SELECT COUNT(*) FROM StoreSearch_docsize").fetchone()[0]
+    except sqlite3.OperationalError:
+        return False
+    expected = connection.execute("SELECT COUNT(*) FROM StoreData").fetchone()[0]
+    return set(TRIGGERS) <= triggers and count == expected
+
+
+def ensure_store_search(db_path):
+    """Baut StoreSearch auf, falls der Index fehlt oder veraltet ist (siehe check_store_search)."""
+    connection = sqlite3.connect(db_path)
+    try:
+        current = check_store_search(connection)
+    finally:
+        connection.close()
+
+    if not current:
+        build_store_search(db_path)
+
+
+def search_query(text, limit=SEARCH_LIMIT, include=(), indexed=True):
+    """
+    SQL-Abfrage und Parameter für die Store-Suche: die ersten limit Stores (nach StoreID), deren StoreID,
+    StoreLocation oder StoreCategory mit allen Wörtern aus text beginnen. Ohne Suchtext werden die ersten Stores
+    geliefert. Die StoreIDs aus include (z. B. die aktuelle Auswahl eines Dropdowns) sind immer enthalten.
+    Mit indexed=False (StoreSearch fehlt oder ist veraltet) wird StoreData per LIKE durchsucht, mit denselben
+    Treffern, aber ohne Index.
+    """
+    columns = ", ".join(SEARCH_COLUMNS)
+    include = [int(store) for store in include]
+    # Jedes Wort wird als Präfix in Anführungszeichen gesucht, damit Sonderzeichen keine FTS5-Syntax bilden.
+    # "Store" steht vor jeder StoreID im Label der Dropdowns ("Store 5 (Palo Alto, Electronics)") und wird
+    # übergangen, sodass "Store 5" wie "5" sucht.
+    words = [word for word in re.findall(r"\w+", text or "") if word.lower() != LABEL_PREFIX]
+    if words and indexed:
+        match = " ".join(f'"{word}"*' for word in words)
+        # FTS5 liefert die Treffer nach rowid (= StoreID) sortiert, das LIMIT beendet die Suche daher frühzeitig
+        query = f"SELECT {columns} FROM StoreSearch WHERE StoreSearch MATCH ? ORDER BY rowid LIMIT ?"
+        params = [match, limit]
+    elif words:
+        # Wie bei FTS5: Präfix eines beliebigen Worts der Spalte (Wortanfang am Spaltenanfang oder nach Leerzeichen)
+        condition = " OR ".join(f"CAST({column} AS TEXT) LIKE ? ESCAPE '\\' "
+                                f"OR CAST({column} AS TEXT) LIKE ? ESCAPE '\\'" for column in SEARCH_COLUMNS)
+        query = (f"SELECT {columns} FROM StoreData WHERE {' AND '.join(f'({condition})' for _ in words)} "
+                 f"ORDER BY StoreID LIMIT ?")
+        params = []
+        for word in words:
+            pattern = word.replace("_", "\\_")  # \w+ enthält außer "_" keine LIKE-Platzhalter
+            params += [f"{pattern}%", f"% {pattern}%"] * len(SEARCH_COLUMNS)
+        params.append(limit)
+    else:
+        query = f"SELECT {columns} FROM StoreData ORDER BY StoreID LIMIT ?"
+        params = [limit]
+
+    if include:
+        selected = f"SELECT {columns} FROM StoreData WHERE StoreID IN ({', '.join('?' * len(include))})"
+        query = f"{selected} UNION SELECT * FROM ({query}) ORDER BY StoreID"
+        params = include + params
+    return query, params
+
+
+if __name__ == "__main__":
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Baut den Suchindex der Stores neu auf.")
+    parser.add_argument("--db", default=os.path.join(script_dir, DB_PATH))
+    parser.add_argument("--search", metavar="TEXT", help="Suchtext, dessen Treffer anschließend ausgegeben werden")
+    args = parser.parse_args()
+
+    build_store_search(args.db)
+    if args.search is not None:
+        connection = sqlite3.connect(args.db)
+        try:
+            for row in connection.execute(*search_query(args.search)):
+                print(row)
+        finally:
+            connection.close()
@@ -0,0 +1,156 @@
+"""
+Suffiziente Statistiken der Tabelle StoreData.
+
+StoreDataMoments enthält die Kreuzprodukt-Matrix M = Z'Z mit Z = [1, X - Shift] über alle numerischen Spalten
+von StoreData (obere Dreiecksmatrix, eine Zeile pro Spaltenpaar). Daraus ergeben sich Anzahl (M[0, 0]),
+Summen (M[0, j]) und Kreuzprodukte (M[i, j]) - genug, um Mittelwerte, Kovarianzen, die Korrelationsmatrix und
+lineare Regressionen zu berechnen, ohne StoreData erneut zu lesen.
+
+Die Matrix wird einmal vollständig berechnet und danach von Triggern bei jedem INSERT, UPDATE und DELETE
+inkrementell fortgeschrieben. Die Verschiebung (Shift, Spaltenmittelwerte beim Aufbau) verhindert
+Auslöschungseffekte bei großen Werten. Zeilen mit fehlenden Werten in einer numerischen Spalte werden
+nicht berücksichtigt.
+"""
+import argparse
+import sqlite3
+import numpy as np
+import pandas as pd
+import os
+
+# Datenbankpfad (relativ zum Ordner scripts/, wie in DB_Load.py)
+DB_PATH = "Database.db"
+
+# Spalten der Tabelle StoreDataMoments
+TABLE_COLUMNS = ["RowPosition", "ColumnPosition", "RowName", "ColumnName", "RowShift", "ColumnShift", "Value"]
+
+# Name der Eins-Spalte (Position 0) der Kreuzprodukt-Matrix
+CONSTANT = "1"
+
+# Trigger, die StoreDataMoments bei jeder Änderung von StoreData fortschreiben
+TRIGGERS = ["StoreDataMoments_insert", "StoreDataMoments_delete",
+            "StoreDataMoments_update_old", "StoreDataMoments_update_new"]
+
+
+def get_numeric_columns(connection):
+    """Liefert die numerischen Spalten von StoreData (INTEGER/REAL) in Tabellenreihenfolge."""
+    return [row[1] for row in connection.execute("PRAGMA table_info(StoreData)")
+            if row[2].upper() in ("INTEGER", "REAL")]
+
+
+def row_value(prefix, columns, position_column):
+    """SQL-Ausdruck für den (verschobenen) Wert der Matrix-Spalte an position_column in der Zeile NEW/OLD."""
+    cases = " ".join(f"WHEN {position} THEN {prefix}.{column}" for position, column in enumerate(columns, start=1))
+    return f"(CASE {position_column} WHEN 0 THEN 1 {cases} END)"
+
+
+def create_triggers(connection, columns):
+    """Erstellt die Trigger, die StoreDataMoments bei Änderungen an StoreData fortschreiben."""
+    for trigger in TRIGGERS:
+        connection.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+
+    def update(prefix, sign):
+        # Addiert (bzw. subtrahiert) das äußere Produkt der Zeile prefix in einem einzigen UPDATE
+        return f"""
+            UPDATE StoreDataMoments SET Value = Value {sign}
+                ({row_value(prefix, columns, "RowPosition")} - RowShift) *
+                ({row_value(prefix, columns, "ColumnPosition")} - ColumnShift);
+        """
+
+    def complete(prefix):
+        return " AND ".join(f"{prefix}.{column} IS NOT NULL" for column in columns)
+
+    connection.execute(f"""
+        CREATE TRIGGER StoreDataMoments_insert AFTER INSERT ON StoreData WHEN {complete("NEW")}
+        BEGIN {update("NEW", "+")} END
+    """)
+    connection.execute(f"""
+        CREATE TRIGGER StoreDataMoments_delete AFTER DELETE ON StoreData WHEN {complete("OLD")}
+        BEGIN {update("OLD", "-")} END
+    """)
+    connection.execute(f"""
+        CREATE TRIGGER StoreDataMoments_update_old AFTER UPDATE ON StoreData WHEN {complete("OLD")}
+        BEGIN {update("OLD", "-")} END
+    """)
+    connection.execute(f"""
+        CREATE TRIGGER StoreDataMoments_update_new AFTER UPDATE ON StoreData WHEN {complete("NEW")}
+        BEGIN {update("NEW", "+")} END
+    """)
+
+
+def build_store_statistics(db_path):
+    """Berechnet StoreDataMoments vollständig neu und legt die Trigger für die Fortschreibung an."""
+    connection = sqlite3.connect(db_path)
+    try:
+        columns = get_numeric_columns(connection)
+        values = pd.read_sql_query(f"SELECT {', '.join(columns)} FROM StoreData", connection)
+        values = values.dropna().to_numpy(dtype=float)
+
+        shift = np.concatenate([[0.0], values.mean(axis=0) if len(values) else np.zeros(len(columns))])
+        z = np.column_stack([np.ones(len(values)), values - shift[1:]])
+        moments = z.T @ z
+        names = [CONSTANT] + columns
+
+        rows = [(i, j, names[i], names[j], shift[i], shift[j], moments[i, j])
+                for i in range(len(names)) for j in range(i, len(names))]
+
+        with connection:  # Eine Transaktion: Tabelle und Trigger passen immer zusammen
+            connection.execute("DROP TABLE IF EXISTS StoreDataMoments")
+            connection.execute("""
+            CREATE TABLE StoreDataMoments (
+                RowPosition INTEGER NOT NULL,     -- Position in der Matrix (0 = Eins-Spalte)
+                ColumnPosition INTEGER NOT NULL,
+                RowName TEXT NOT NULL,
+                ColumnName TEXT NOT NULL,
+                RowShift REAL NOT NULL,           -- Verschiebung der Spalte (Mittelwert beim Aufbau)
+                ColumnShift REAL NOT NULL,
+                Value REAL NOT NULL,              -- Summe der Produkte (RowName - RowShift) * (ColumnName - ColumnShift)
+                PRIMARY KEY (RowPosition, ColumnPosition)
+            ) WITHOUT ROWID
+            """)
+            connection.executemany(
+                f"INSERT INTO StoreDataMoments VALUES ({', '.join('?' * len(TABLE_COLUMNS))})", rows)
+            create_triggers(connection, columns)
+    finally:
+        connection.close()
+    print(f" Suffiziente Statistiken für {len(columns)} Spalten und {len(values)} Stores in 'StoreDataMoments' gespeichert.")
+
+
+def check_store_statistics(connection):
+    """
+    Prüft über connection (nur lesend), ob StoreDataMoments aktuell ist: Tabelle und Trigger vorhanden, Spalten
+    von StoreData unverändert und Anzahl der Zeilen stimmig (sonst z. B. Änderungen ohne Trigger).
+    """
+    columns = get_numeric_columns(connection)
+    triggers = {row[0] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+    try:
+        names = [row[0] for row in connection.execute(
+            "SELECT ColumnName FROM StoreDataMoments WHERE RowPosition = 0 ORDER BY ColumnPosition")]
+        count = connection.execute(
+            "SELECT Value FROM StoreDataMoments WHERE RowPosition = 0 AND ColumnPosition = 0").fetchone()
+    except sqlite3.OperationalError:
+        return False
+    complete = " AND ".join(f"{column} IS NOT NULL" for column in columns)
+    expected = connection.execute(f"SELECT COUNT(*) FROM StoreData WHERE {complete}").fetchone()[0]
+    return names == [CONSTANT] + columns and set(TRIGGERS) <= triggers and count is not None \
+        and round(count[0]) == expected
+
+
+def ensure_store_statistics(db_path):
+    """Baut StoreDataMoments auf, falls die Tabelle fehlt oder veraltet ist (siehe check_store_statistics)."""
+    connection = sqlite3.connect(db_path)
+    try:
+        current = check_store_statistics(connection)
+    finally:
+        connection.close()
+
+    if not current:
+        build_store_statistics(db_path)
+
+
+if __name__ == "__main__":
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Berechnet die suffizienten Statistiken von StoreData neu.")
+    parser.add_argument("--db", default=os.path.join(script_dir, DB_PATH))
+    args = parser.parse_args()
+
+    build_store_statistics(args.db)
@@ -0,0 +1,63 @@
+"""
+Tests für die Store-Suche der Dropdowns (scripts/store_search.py): Die Labels der Dropdowns ("Store 5 (Palo Alto,
+Electronics)") müssen sich wieder suchen lassen, und die Suche ohne Index (StoreData per LIKE) muss dieselben
+Treffer liefern wie der Suchindex StoreSearch.
+
+Aufruf (aus dem Projektordner):
+    python -m pytest -q
+"""
+import os
+import shutil
+import sqlite3
+import sys
+
+import pandas as pd
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# scripts als Paket aus dem Projektordner importieren, wie im Dashboard
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from scripts.store_search import build_store_search, search_query  # noqa: E402
+
+# Suchtexte, für die Index und LIKE-Suche übereinstimmen müssen
+SEARCHES = ["", "5", "Store 5", "store 12", "Store", "san gro", "Palo Alto Electronics", "elec 1", "x_y", "Store 5 ("]
+
+
+@pytest.fixture
+def connection(tmp_path):
+    """Verbindung zu einer Kopie der Datenbank mit frisch aufgebautem Suchindex StoreSearch."""
+    path = str(tmp_path / "Database.db")
+    shutil.copy(os.path.join(ROOT_DIR, "scripts", "Database.db"), path)
+    build_store_search(path)
+    connection = sqlite3.connect(path)
+    yield connection
+    connection.close()
+
+
+def search(connection, text, include=(), indexed=True):
+    query, params = search_query(text, include=include, indexed=indexed)
+    return pd.read_sql_query(query, connection, params=params)
+
+
+def label(row):
+    """Label eines Stores wie in den Dropdowns (RecommendationsTab, VergleichsfunktionTab)."""
+    return f"Store {row.StoreID} ({row.StoreLocation}, {row.StoreCategory})"
+
+
+@pytest.mark.parametrize("indexed", [True, False])
+def test_search_by_label(connection, indexed):
+    assert search(connection, "Store 5", indexed=indexed)["StoreID"].iloc[0] == 5
+    assert search(connection, "store 12", indexed=indexed)["StoreID"].iloc[0] == 12
+
+    store = search(connection, "5", indexed=indexed).iloc[0]
+    assert search(connection, label(store), indexed=indexed)["StoreID"].iloc[0] == 5
+
+
+@pytest.mark.parametrize("text", SEARCHES)
+@pytest.mark.parametrize("include", [(), (7, 300)])
+def test_like_search_matches_index(connection, text, include):
+    pd.testing.assert_frame_equal(search(connection, text, include, indexed=False),
+                                  search(connection, text, include, indexed=True))
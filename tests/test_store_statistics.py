@@ -0,0 +1,132 @@
+"""
+Tests für die per Trigger fortgeschriebenen Statistiken (scripts/store_statistics.py): Nach dem Aufbau und nach
+INSERT, UPDATE, DELETE und dem Setzen fehlender Werte müssen Korrelationen und Regressionen aus StoreDataMoments
+mit einer Neuberechnung aus den Rohdaten übereinstimmen.
+
+Aufruf (aus dem Projektordner):
+    python -m pytest -q
+"""
+import os
+import shutil
+import sqlite3
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DASHBOARD_DIR = os.path.join(ROOT_DIR, "Dashboard")
+
+# Importe wie im Dashboard: analytics/views aus Dashboard/, scripts als Paket aus dem Projektordner
+for path in (ROOT_DIR, DASHBOARD_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from analytics.regression_engine import RegressionEngine  # noqa: E402
+from scripts.store_statistics import build_store_statistics, check_store_statistics, get_numeric_columns  # noqa: E402
+from views.key_influencers_tab import INFLUENCE_MODELS  # noqa: E402
+
+# Änderungen an StoreData, nach denen die Statistiken weiterhin stimmen müssen
+CHANGES = {
+    "insert": [
+        """INSERT INTO StoreData (ProductVariety, MarketingSpend, CustomerFootfall, StoreSize, EmployeeEfficiency,
+               StoreAge, CompetitorDistance, PromotionsCount, EconomicIndicator, StoreLocation, StoreCategory,
+               MonthlySalesRevenue)
+           VALUES (1000, 20, 3000, 900, 75.5, 12, 8, 4, 101.5, 'Los Angeles', 'Grocery', 450.0)""",
+        # Unvollständige Zeile: wird von StoreDataMoments nicht berücksichtigt
+        "INSERT INTO StoreData (StoreLocation, StoreCategory, MonthlySalesRevenue) VALUES ('Fresno', 'Clothing', 1)",
+    ],
+    "update": [
+        "UPDATE StoreData SET MonthlySalesRevenue = MonthlySalesRevenue * 2, StoreAge = StoreAge + 1 "
+        "WHERE StoreID <= 50",
+        "UPDATE StoreData SET MarketingSpend = 0 WHERE StoreID = 100",
+    ],
+    "delete": [
+        "DELETE FROM StoreData WHERE StoreID % 7 = 0",
+    ],
+    "null-update": [
+        "UPDATE StoreData SET CustomerFootfall = NULL WHERE StoreID BETWEEN 10 AND 20",
+        "UPDATE StoreData SET EconomicIndicator = NULL WHERE StoreID = 30",
+        "UPDATE StoreData SET CustomerFootfall = 2500 WHERE StoreID = 15",  # Zeile wird wieder vollständig
+    ],
+}
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """Kopie der Datenbank mit frisch aufgebauter Tabelle StoreDataMoments."""
+    path = str(tmp_path / "Database.db")
+    shutil.copy(os.path.join(ROOT_DIR, "scripts", "Database.db"), path)
+    build_store_statistics(path)
+    return path
+
+
+def read_tables(db_path):
+    """Liest StoreData (nur vollständige Zeilen, wie StoreDataMoments) und StoreDataMoments."""
+    connection = sqlite3.connect(db_path)
+    try:
+        columns = get_numeric_columns(connection)
+        df = pd.read_sql_query("SELECT * FROM StoreData", connection)
+        moments = pd.read_sql_query("SELECT * FROM StoreDataMoments", connection)
+        assert check_store_statistics(connection)
+    finally:
+        connection.close()
+    return df.dropna(subset=columns), columns, moments
+
+
+def fit_lstsq(df, target, features):
+    """Referenz: OLS mit Achsenabschnitt auf standardisierten Features (Populations-Standardabweichung)."""
+    x = df[features].to_numpy(dtype=float)
+    y = df[target].to_numpy(dtype=float)
+    x = (x - x.mean(axis=0)) / x.std(axis=0)
+    design = np.column_stack([np.ones(len(x)), x])
+    solution, *_ = np.linalg.lstsq(design, y, rcond=None)
+    residuals = y - design @ solution
+    r2 = 1 - residuals @ residuals / ((y - y.mean()) @ (y - y.mean()))
+    return solution[1:], solution[0], r2
+
+
+def assert_matches_raw_data(db_path):
+    df, columns, moments = read_tables(db_path)
+    engine = RegressionEngine.from_moments_table(moments)
+
+    assert engine.n == len(df)
+    pd.testing.assert_frame_equal(engine.correlation(columns), df[columns].corr(), rtol=1e-8, atol=1e-10)
+
+    for name, result in engine.fit_many(INFLUENCE_MODELS).items():
+        model = INFLUENCE_MODELS[name]
+        coefficients, intercept, r2 = fit_lstsq(df, model["target"], model["features"])
+        np.testing.assert_allclose(result["coefficients"], coefficients, rtol=1e-6, atol=1e-8, err_msg=name)
+        np.testing.assert_allclose(result["intercept"], intercept, rtol=1e-8, err_msg=name)
+        np.testing.assert_allclose(result["r2"], r2, rtol=1e-8, err_msg=name)
+
+
+def test_build_matches_raw_data(db_path):
+    assert_matches_raw_data(db_path)
+
+
+@pytest.mark.parametrize("change", CHANGES)
+def test_triggers_follow_changes(db_path, change):
+    connection = sqlite3.connect(db_path)
+    try:
+        with connection:
+            for statement in CHANGES[change]:
+                connection.execute(statement)
+    finally:
+        connection.close()
+
+    assert_matches_raw_data(db_path)
+
+
+def test_all_changes_combined(db_path):
+    connection = sqlite3.connect(db_path)
+    try:
+        for statements in CHANGES.values():
+            with connection:
+                for statement in statements:
+                    connection.execute(statement)
+    finally:
+        connection.close()
+
+    assert_matches_raw_data(db_path)
@@ -0,0 +1,77 @@
+"""
+Tests für die Trendlinien der Streudiagramme (Dashboard/analytics/trendlines.py): Die OLS-Trendlinie muss wie
+px.scatter(trendline="ols") auf allen Zeilen mit vorhandenem x, y und color beruhen - fehlende Werte in anderen
+Spalten dürfen sie nicht verändern - und alle Trendlinien müssen dieselben Zeilen verwenden.
+
+Aufruf (aus dem Projektordner):
+    python -m pytest -q
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DASHBOARD_DIR = os.path.join(ROOT_DIR, "Dashboard")
+
+# Importe wie im Dashboard: analytics aus Dashboard/
+if DASHBOARD_DIR not in sys.path:
+    sys.path.insert(0, DASHBOARD_DIR)
+
+from analytics.trendlines import TRENDLINE_MODES, compute_trendline_curves  # noqa: E402
+
+
+@pytest.fixture
+def df():
+    """Zufällige Stores mit fehlenden Werten in x, y, color und in einer unbeteiligten Spalte."""
+    rng = np.random.default_rng(0)
+    n = 500
+    df = pd.DataFrame({
+        "MarketingSpend": rng.uniform(0, 100, n),
+        "StoreAge": rng.uniform(0, 30, n),
+        "StoreCategory": rng.choice(["Clothing", "Electronics", "Grocery"], n),
+    })
+    df["MonthlySalesRevenue"] = 3 * df["MarketingSpend"] + rng.normal(0, 20, n)
+    df.loc[rng.choice(n, 100, replace=False), "StoreAge"] = np.nan  # unbeteiligte Spalte
+    df.loc[rng.choice(n, 10, replace=False), "MarketingSpend"] = np.nan
+    df.loc[rng.choice(n, 10, replace=False), "MonthlySalesRevenue"] = np.nan
+    df.loc[rng.choice(n, 10, replace=False), "StoreCategory"] = None
+    return df
+
+
+@pytest.mark.parametrize("color", [None, "StoreCategory"])
+def test_ols_uses_rows_with_x_y_and_color(df, color):
+    curves = compute_trendline_curves(df, "MarketingSpend", "MonthlySalesRevenue", color, "ols")
+    rows = df.dropna(subset=["MarketingSpend", "MonthlySalesRevenue"] + ([color] if color else []))
+    groups = rows.groupby(color) if color else [("", rows)]
+
+    assert len(curves) == len(groups)
+    for group, data in groups:
+        slope, intercept = np.polyfit(data["MarketingSpend"], data["MonthlySalesRevenue"], 1)
+        np.testing.assert_allclose(curves[group]["slope"], slope, rtol=1e-9)
+        np.testing.assert_allclose(curves[group]["intercept"], intercept, rtol=1e-9)
+        r = np.corrcoef(data["MarketingSpend"], data["MonthlySalesRevenue"])[0, 1]
+        np.testing.assert_allclose(curves[group]["r2"], r ** 2, rtol=1e-9)
+        np.testing.assert_allclose(curves[group]["x"], [data["MarketingSpend"].min(), data["MarketingSpend"].max()])
+
+
+def test_unrelated_missing_values_do_not_change_ols(df):
+    complete = df.assign(StoreAge=df["StoreAge"].fillna(0))
+    curves = compute_trendline_curves(df, "MarketingSpend", "MonthlySalesRevenue", "StoreCategory", "ols")
+    expected = compute_trendline_curves(complete, "MarketingSpend", "MonthlySalesRevenue", "StoreCategory", "ols")
+
+    for group, curve in expected.items():
+        np.testing.assert_allclose(curves[group]["slope"], curve["slope"], rtol=1e-12)
+        np.testing.assert_allclose(curves[group]["intercept"], curve["intercept"], rtol=1e-12)
+
+
+def test_modes_fit_the_same_rows(df):
+    curves = {mode: compute_trendline_curves(df, "MarketingSpend", "MonthlySalesRevenue", "StoreCategory", mode)
+              for mode in TRENDLINE_MODES}
+
+    for mode in ("huber", "theil-sen"):
+        assert curves[mode].keys() == curves["ols"].keys()
+        for group, curve in curves["ols"].items():
+            np.testing.assert_allclose(curves[mode][group]["x"], curve["x"], err_msg=mode)